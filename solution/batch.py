@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from multiprocessing import Pool
+
+from columnar import ColumnarDataset, is_columnar
+from converter import PostfixConverter, TimeoutError
+from loader import iter_records
+
+LANGS = ('en', 'ko')
+
+# One converter per worker process, so its result cache is shared by all the jobs of that worker
+_converter = None
+_mode = 'exec'
+_store = None # store.ResultStore shared by all the workers, if any
+
+
+def _init_worker(mode='exec', timeout=10, cache_size=1024, store_path=None):
+    global _converter, _mode, _store
+    _converter = PostfixConverter(cache_size=cache_size, timeout=timeout)
+    _mode = mode
+    if _store is not None:
+        _store.close()
+        _store = None
+    if store_path is not None:
+        from store import ResultStore
+        _store = ResultStore(store_path)
+
+
+def convert_job(job):
+    # job: (id, lang, postfix expression) -> result record
+    key, lang, postfix_eq = job
+    if _converter is None:
+        _init_worker()
+    if _store is not None:
+        stored = _store.get(postfix_eq, _mode)
+        if stored is not None:
+            return {'id': key, 'lang': lang, 'answer': stored['answer'], 'code': stored['code'],
+                    'status': stored['status'], 'elapsed': stored['elapsed'], 'stored': True}
+    answer, code = None, None
+    start = time.perf_counter()
+    try:
+        answer, code = _converter.convert(postfix_eq, mode=_mode)
+        status = 'ok'
+    except TimeoutError:
+        status = 'timeout'
+    except Exception as e:
+        status = 'error: {}: {}'.format(type(e).__name__, e)
+    elapsed = time.perf_counter() - start
+    if _store is not None:
+        _store.put(postfix_eq, answer, code, status, elapsed, _mode)
+    return {'id': key, 'lang': lang, 'answer': answer, 'code': code, 'status': status, 'elapsed': elapsed}
+
+
+def iter_jobs(dataset, langs=LANGS):
+    # dataset: {id: record} in the dataset/test.json format, or (id, record) pairs such as loader.iter_records()
+    records = dataset.items() if isinstance(dataset, dict) else dataset
+    for key, record in records:
+        for lang in langs:
+            postfix_eq = record.get('solution_abst_' + lang)
+            if postfix_eq is not None:
+                yield key, lang, postfix_eq
+
+
+def convert_dataset(dataset, langs=LANGS, workers=None, chunksize=16, mode='exec', timeout=10, store=None,
+                    sandbox=False, memory=1 << 30):
+    # Convert every solution_abst_* of the dataset, yielding result records in dataset order
+    return convert_jobs(iter_jobs(dataset, langs), workers, chunksize, mode, timeout, store, sandbox, memory)
+
+
+def convert_jobs(jobs, workers=None, chunksize=16, mode='exec', timeout=10, store=None, sandbox=False,
+                 memory=1 << 30):
+    # Convert (id, lang, postfix expression) jobs, yielding result records in job order
+    # store: path of a result store (see store.py); stored results are returned without converting
+    # (marked 'stored': True, with the time of the original conversion), and new ones are added
+    # sandbox: run the conversions in sandbox.SandboxPool workers, limited to timeout seconds of CPU time and
+    # memory bytes each; a conversion past a limit ends its worker instead of timing out in it
+    workers = workers or os.cpu_count() or 1
+    if sandbox:
+        yield from _convert_sandboxed(jobs, workers, chunksize, mode, timeout, store, memory)
+        return
+    if workers == 1:
+        _init_worker(mode, timeout, store_path=store)
+        yield from map(convert_job, jobs)
+        return
+    # Pool.imap reads its input from a thread of its own, as fast as it can. Each job is handed over only after
+    # a slot is free, and a slot is freed by every result yielded, so at most `ahead` jobs are read ahead.
+    ahead = workers * chunksize * 8
+    slots = threading.Semaphore(ahead)
+    stopped = threading.Event()
+
+    def feed():
+        for job in jobs:
+            slots.acquire()
+            if stopped.is_set():
+                return
+            yield job
+
+    with Pool(workers, initializer=_init_worker, initargs=(mode, timeout, 1024, store)) as pool:
+        try:
+            for result in pool.imap(convert_job, feed(), chunksize=chunksize):
+                slots.release()
+                yield result
+        finally:
+            # Lets a feed() waiting for a slot end, so the pool can shut down
+            stopped.set()
+            slots.release(ahead)
+
+
+def _convert_sandboxed(jobs, workers, chunksize, mode, timeout, store, memory):
+    # convert_jobs() over a SandboxPool; the store, if any, is looked up and filled here rather than in the workers
+    from sandbox import SandboxPool
+    if store is not None:
+        from store import ResultStore
+        store = ResultStore(store)
+    pending = deque() # (id, lang, expression, stored result or None) of the jobs read, in order
+
+    def expressions():
+        # The expressions to convert; None for the stored ones, which the pool passes through in order
+        for key, lang, postfix_eq in jobs:
+            hit = store.get(postfix_eq, mode) if store is not None else None
+            pending.append((key, lang, postfix_eq, hit))
+            yield postfix_eq if hit is None else None
+
+    try:
+        with SandboxPool(workers, mode, cpu_time=timeout, memory=memory, chunksize=chunksize) as pool:
+            for result in pool.imap(expressions()):
+                key, lang, postfix_eq, hit = pending.popleft()
+                if hit is not None:
+                    yield {'id': key, 'lang': lang, **hit, 'stored': True}
+                    continue
+                if store is not None:
+                    store.put(postfix_eq, result['answer'], result['code'], result['status'], result['elapsed'],
+                              mode)
+                yield {'id': key, 'lang': lang, **result}
+    finally:
+        if store is not None:
+            store.close()
+
+
+def convert_file(input_path, output_path, langs=LANGS, workers=None, chunksize=16, mode='exec', timeout=10,
+                 categories=None, store=None, sandbox=False, memory=1 << 30):
+    # Convert a dataset file (JSON, or the columnar format of columnar.py) and write one JSON line per (id, lang);
+    # returns status counts. The file is streamed, so conversion starts with the first record and memory does
+    # not grow with the file.
+    # categories: convert only the records of these categories
+    fields = ['solution_abst_' + lang for lang in langs]
+    columns = ColumnarDataset(input_path) if is_columnar(input_path) else None
+    if columns is not None:
+        records = columns.records([name for name in fields if name in columns.fields], categories)
+    else:
+        records = iter_records(input_path, fields=fields, categories=categories)
+    counts = Counter()
+    try:
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for result in convert_dataset(records, langs, workers, chunksize, mode, timeout, store, sandbox,
+                                          memory):
+                counts[result['status'].split(':')[0]] += 1
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if columns is not None:
+            columns.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert the solution_abst_* expressions of a DMath dataset file.')
+    parser.add_argument('input', help='dataset file: JSON ({id: record}) or columnar (see columnar.py)')
+    parser.add_argument('output', help='output JSONL file')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=16, help='jobs sent to a worker at a time')
+    parser.add_argument('--langs', nargs='+', default=list(LANGS), choices=LANGS)
+    parser.add_argument('--mode', default='exec', choices=('exec', 'eager'))
+    parser.add_argument('--timeout', type=float, default=10, help='time budget per conversion in seconds')
+    parser.add_argument('--categories', nargs='+', default=None, help='convert only these categories')
+    parser.add_argument('--store', default=None, help='result store file (see store.py), created if missing')
+    parser.add_argument('--sandbox', action='store_true',
+                        help='run the conversions in sandboxed workers (see sandbox.py), --timeout being CPU time')
+    parser.add_argument('--memory', type=int, default=1024, help='memory per sandboxed conversion in MB')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = convert_file(args.input, args.output, args.langs, args.workers, args.chunksize, args.mode,
+                          args.timeout, args.categories, args.store, args.sandbox, args.memory << 20)
+    print('{} conversions in {:.1f}s: {}'.format(sum(counts.values()), time.perf_counter() - start, dict(counts)),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from collections import defaultdict
+
+from batch import LANGS, iter_jobs
+from converter import PostfixConverter, TimeoutError
+
+# Latency statistics kept for every group; the regression check compares them between two runs
+STATS = ('p50', 'p95', 'p99')
+
+
+def percentile(sorted_values, q):
+    # q-th percentile (0-100) of an ascending list, interpolated between the closest ranks
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def operators_of(postfix_eq):
+    return sorted(set(token for token in postfix_eq.split() if token.startswith('[OP_')))
+
+
+def time_job(converter, postfix_eq, mode, repeat):
+    # (status, seconds): the fastest of `repeat` conversions, since slower runs only add noise from the machine.
+    # The garbage collector is paused while timing, as timeit does.
+    best = None
+    status = 'ok'
+    for _ in range(repeat):
+        gc.disable()
+        start = time.perf_counter()
+        try:
+            converter.convert(postfix_eq, mode=mode)
+        except TimeoutError:
+            status = 'timeout'
+        except Exception as e:
+            status = 'error: {}'.format(type(e).__name__)
+        finally:
+            elapsed = time.perf_counter() - start
+            gc.enable()
+        best = elapsed if best is None else min(best, elapsed)
+        if status != 'ok': # a failure takes as long every time
+            break
+    return status, best
+
+
+def summarize(records):
+    # Throughput, latency percentiles (milliseconds) and status counts of a group of timed records
+    latencies = sorted(record['elapsed'] for record in records)
+    total = sum(latencies)
+    summary = {
+        'count': len(records),
+        'total_s': round(total, 6),
+        'throughput_per_s': round(len(records) / total, 2) if total else None,
+        'mean_ms': round(total / len(records) * 1000, 4),
+    }
+    for stat in STATS:
+        summary[stat + '_ms'] = round(percentile(latencies, int(stat[1:])) * 1000, 4)
+    summary['max_ms'] = round(latencies[-1] * 1000, 4)
+    summary['timeouts'] = sum(1 for record in records if record['status'] == 'timeout')
+    summary['errors'] = sum(1 for record in records if record['status'].startswith('error'))
+    return summary
+
+
+def run_benchmark(dataset, langs=LANGS, mode='exec', timeout=10, repeat=1, slowest=20, converter_options=None):
+    # Convert every solution_abst_* of the dataset once per repeat with a converter whose cache is disabled,
+    # and return the report: overall, per category and per operator figures, and the slowest problems
+    converter_options = dict(converter_options or {})
+    converter = PostfixConverter(cache_size=0, timeout=timeout, **converter_options)
+    records = []
+    for key, lang, postfix_eq in iter_jobs(dataset, langs):
+        status, elapsed = time_job(converter, postfix_eq, mode, repeat)
+        records.append({'id': key, 'lang': lang, 'category': dataset[key].get('category', ''),
+                        'operators': operators_of(postfix_eq), 'status': status, 'elapsed': elapsed})
+
+    by_category = defaultdict(list)
+    by_operator = defaultdict(list)
+    for record in records:
+        by_category[record['category']].append(record)
+        for operator in record['operators']:
+            by_operator[operator].append(record)
+
+    slowest_records = sorted(records, key=lambda record: record['elapsed'], reverse=True)[:slowest]
+    return {
+        'settings': {'mode': mode, 'timeout': timeout, 'repeat': repeat, 'langs': list(langs),
+                     'converter': converter_options},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'overall': summarize(records),
+        'by_category': {name: summarize(group) for name, group in sorted(by_category.items())},
+        'by_operator': {name: summarize(group) for name, group in sorted(by_operator.items())},
+        'slowest': [{'id': record['id'], 'lang': record['lang'], 'category': record['category'],
+                     'status': record['status'], 'elapsed_ms': round(record['elapsed'] * 1000, 4)}
+                    for record in slowest_records],
+    }
+
+
+def compare_reports(baseline, current, threshold=0.25, min_ms=0.1, min_tail=5):
+    # Groups whose p50/p95/p99 grew by more than `threshold` (0.25 = 25%) from baseline to current, and groups
+    # with more timeouts or errors. A percentile is only compared when at least min_tail problems of the group
+    # lie above it (p99 needs 500 problems), and latencies under min_ms in both runs are ignored: both are
+    # mostly noise of the machine.
+    regressions = []
+    groups = [('overall', '', baseline['overall'], current['overall'])]
+    for section in ('by_category', 'by_operator'):
+        for name, summary in current[section].items():
+            if name in baseline[section]:
+                groups.append((section, name, baseline[section][name], summary))
+    for section, name, old, new in groups:
+        for stat in STATS:
+            before, after = old[stat + '_ms'], new[stat + '_ms']
+            if min(old['count'], new['count']) * (100 - int(stat[1:])) / 100 < min_tail:
+                continue
+            if max(before, after) >= min_ms and after > before * (1 + threshold):
+                regressions.append({'section': section, 'group': name, 'stat': stat, 'baseline_ms': before,
+                                    'current_ms': after, 'change': round(after / before - 1, 4) if before else None})
+        for count in ('timeouts', 'errors'):
+            if new[count] > old[count]:
+                regressions.append({'section': section, 'group': name, 'stat': count, 'baseline': old[count],
+                                    'current': new[count]})
+    return regressions
+
+
+def format_report(report):
+    # Human-readable summary of a report
+    lines = []
+
+    def row(name, summary):
+        lines.append('{:<36} {:>6} {:>10} {:>10} {:>10} {:>10} {:>5} {:>5}'.format(
+            name, summary['count'], summary['throughput_per_s'] or '-', summary['p50_ms'], summary['p95_ms'],
+            summary['p99_ms'], summary['timeouts'], summary['errors']))
+
+    header = '{:<36} {:>6} {:>10} {:>10} {:>10} {:>10} {:>5} {:>5}'.format(
+        '', 'count', 'conv/s', 'p50 ms', 'p95 ms', 'p99 ms', 'tmout', 'error')
+    lines.append(header)
+    row('overall', report['overall'])
+    for title, section in (('category', 'by_category'), ('operator', 'by_operator')):
+        lines.append('')
+        lines.append('by ' + title)
+        for name, summary in report[section].items():
+            row(name, summary)
+    lines.append('')
+    lines.append('slowest')
+    for record in report['slowest']:
+        lines.append('  {id} {lang} {category}: {elapsed_ms} ms ({status})'.format(**record))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark PostfixConverter.convert on a DMath dataset file.')
+    parser.add_argument('input', nargs='?', default='../dataset/test.json', help='dataset JSON file ({id: record})')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--compare', help='baseline report JSON file; regressions are listed, exit status 1')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown counted as a regression')
+    parser.add_argument('--langs', nargs='+', default=list(LANGS), choices=LANGS)
+    parser.add_argument('--mode', default='exec', choices=('exec', 'eager'))
+    parser.add_argument('--timeout', type=float, default=10, help='time budget per conversion in seconds')
+    parser.add_argument('--repeat', type=int, default=1, help='conversions per problem; the fastest is kept')
+    parser.add_argument('--slowest', type=int, default=20, help='number of slowest problems listed')
+    parser.add_argument('--optimize', action='store_true', help='PostfixConverter(optimize=True)')
+    parser.add_argument('--backend', default='python', choices=('python', 'numpy'))
+    parser.add_argument('--arithmetic', default='float', choices=('float', 'exact'))
+    args = parser.parse_args()
+
+    with open(args.input, encoding='utf-8') as f:
+        dataset = json.load(f)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    report = run_benchmark(dataset, args.langs, args.mode, args.timeout, args.repeat, args.slowest,
+                           {'optimize': args.optimize, 'backend': args.backend, 'arithmetic': args.arithmetic})
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(report, out, ensure_ascii=False, indent=1)
+
+    if baseline is not None:
+        regressions = compare_reports(baseline, report, args.threshold)
+        print('', file=sys.stderr)
+        print('{} regressions against {}'.format(len(regressions), args.compare), file=sys.stderr)
+        for regression in regressions:
+            print('  ' + json.dumps(regression, ensure_ascii=False), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
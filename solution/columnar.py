@@ -0,0 +1,260 @@
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+
+from loader import iter_records
+
+# Columnar binary form of a dataset file ({id: record}), read through mmap:
+#   magic b'DMATHCOL', version (u32), header length (u32), header (JSON), sections aligned to 8 bytes
+# The header gives the number of records and, for the ids and for each field, the positions of its sections:
+#   offsets - count+1 little-endian u64, where the text of row i is data[offsets[i]:offsets[i+1]]
+#   data    - the UTF-8 texts of all rows, one after the other
+#   nulls   - one bit per row, set where the record has no such field (only when some record lacks it)
+# and 'id_order': the rows as u32, sorted by the bytes of their id, to find a record by id with a binary search.
+# Opening a file reads only the header, and columns are views of the mapped file. Processes that open the same
+# file share one copy of it in the page cache.
+
+MAGIC = b'DMATHCOL'
+VERSION = 1
+_PREFIX = struct.Struct('<8sII')
+_LITTLE = sys.byteorder == 'little'
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _u64s(values):
+    numbers = array('Q', values)
+    if not _LITTLE:
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _u32s(values):
+    numbers = array('I', values)
+    if not _LITTLE:
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def write_columnar(records, path, fields=None):
+    # Writes (id, record) pairs (a dict's items() or loader.iter_records()) to path; returns the number of records.
+    # fields: the fields to keep, in this order; None keeps every field, in order of first appearance
+    ids = []
+    columns = {name: [] for name in fields} if fields is not None else {}
+    for row, (key, record) in enumerate(records):
+        ids.append(str(key).encode('utf-8'))
+        if fields is None:
+            for name in record:
+                if name not in columns:
+                    columns[name] = [None] * row
+        for name, values in columns.items():
+            value = record.get(name)
+            values.append(None if value is None else str(value).encode('utf-8'))
+    count = len(ids)
+
+    sections = [] # (relative offset, bytes)
+    end = 0
+
+    def add(blob):
+        nonlocal end
+        offset = end
+        sections.append((offset, blob))
+        end = _align(offset + len(blob))
+        return offset
+
+    def add_column(values):
+        offsets = [0]
+        for value in values:
+            offsets.append(offsets[-1] + (len(value) if value is not None else 0))
+        data = b''.join(value for value in values if value is not None)
+        entry = {'offsets': add(_u64s(offsets)), 'data': add(data), 'nulls': None}
+        if any(value is None for value in values):
+            bits = bytearray((count + 7) // 8)
+            for row, value in enumerate(values):
+                if value is None:
+                    bits[row >> 3] |= 1 << (row & 7)
+            entry['nulls'] = add(bytes(bits))
+        return entry
+
+    header = {'count': count, 'id': add_column(ids),
+              'columns': {name: add_column(values) for name, values in columns.items()},
+              'id_order': add(_u32s(sorted(range(count), key=ids.__getitem__)))}
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    base = _align(_PREFIX.size + len(header_bytes))
+    with open(path, 'wb') as out:
+        out.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes)))
+        out.write(header_bytes)
+        position = _PREFIX.size + len(header_bytes)
+        for offset, blob in sections:
+            out.write(b'\0' * (base + offset - position))
+            out.write(blob)
+            position = base + offset + len(blob)
+    return count
+
+
+def is_columnar(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class Column():
+    # One field of every record, read from the mapped file: column[row] is the text (None where the record has
+    # no such field), column.raw(row) the UTF-8 bytes as a memoryview of the file, without a copy
+    def __init__(self, view, entry, count):
+        self.count = count
+        offsets = view[entry['offsets']:entry['offsets'] + 8 * (count + 1)]
+        if _LITTLE:
+            self.offsets = offsets.cast('Q')
+        else: # big-endian host: the offsets are copied once and swapped
+            self.offsets = array('Q', offsets.tobytes())
+            self.offsets.byteswap()
+        self.data = view[entry['data']:entry['data'] + self.offsets[count]]
+        self.nulls = view[entry['nulls']:entry['nulls'] + (count + 7) // 8] if entry['nulls'] is not None else None
+
+    def __len__(self):
+        return self.count
+
+    def is_null(self, row):
+        return self.nulls is not None and bool(self.nulls[row >> 3] & (1 << (row & 7)))
+
+    def raw(self, row):
+        return self.data[self.offsets[row]:self.offsets[row + 1]]
+
+    def __getitem__(self, row):
+        if not -self.count <= row < self.count:
+            raise IndexError('row {} out of range'.format(row))
+        if row < 0:
+            row += self.count
+        if self.is_null(row):
+            return None
+        return str(self.data[self.offsets[row]:self.offsets[row + 1]], 'utf-8')
+
+    def __iter__(self):
+        for row in range(self.count):
+            yield self[row]
+
+    def release(self):
+        for view in (self.offsets, self.data, self.nulls):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+class ColumnarDataset():
+    # Read-only view of a file written by write_columnar()
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # empty file
+            self.file.close()
+            raise ValueError('{} is not a columnar dataset file'.format(path))
+        magic, version, header_length = b'', 0, 0
+        if len(self.map) >= _PREFIX.size:
+            magic, version, header_length = _PREFIX.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError('{} is not a columnar dataset file of version {}'.format(path, VERSION))
+        header = json.loads(self.map[_PREFIX.size:_PREFIX.size + header_length].decode('utf-8'))
+        self.view = memoryview(self.map)[_align(_PREFIX.size + header_length):]
+        self.count = header['count']
+        self.header = header
+        self.ids = Column(self.view, header['id'], self.count)
+        self._columns = {}
+        order = self.view[header['id_order']:header['id_order'] + 4 * self.count]
+        if _LITTLE:
+            self.id_order = order.cast('I')
+        else:
+            self.id_order = array('I', order.tobytes())
+            self.id_order.byteswap()
+
+    @property
+    def fields(self):
+        return list(self.header['columns'])
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        # The column of a field; KeyError if the file has no such field
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = Column(self.view, self.header['columns'][name], self.count)
+        return column
+
+    def row(self, key):
+        # Row number of a record id; KeyError if there is none
+        target = str(key).encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.ids.raw(self.id_order[middle]).tobytes() < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.ids.raw(self.id_order[low]) == target:
+            return self.id_order[low]
+        raise KeyError(key)
+
+    def record(self, row, fields=None):
+        # The record of a row as a dict, with only the given fields if any (fields the record lacks are left out)
+        record = {}
+        for name in (self.fields if fields is None else fields):
+            value = self.column(name)[row]
+            if value is not None:
+                record[name] = value
+        return record
+
+    def get(self, key, fields=None):
+        return self.record(self.row(key), fields)
+
+    def records(self, fields=None, categories=None):
+        # (id, record) pairs in file order, like loader.iter_records()
+        if categories is not None:
+            categories = set(categories)
+            category = self.column('category')
+        for row in range(self.count):
+            if categories is None or category[row] in categories:
+                yield self.ids[row], self.record(row, fields)
+
+    def close(self):
+        # Views still held by the caller keep the mapping alive until they are released
+        for column in [getattr(self, 'ids', None)] + list(getattr(self, '_columns', {}).values()):
+            if column is not None:
+                column.release()
+        self._columns = {}
+        for view in ('id_order', 'view'):
+            if isinstance(getattr(self, view, None), memoryview):
+                getattr(self, view).release()
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a DMath dataset file in the columnar binary format.')
+    parser.add_argument('input', help='dataset JSON file ({id: record})')
+    parser.add_argument('output', help='columnar file to write')
+    parser.add_argument('--fields', nargs='+', default=None, help='fields to keep (default: all)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = write_columnar(iter_records(args.input, fields=args.fields), args.output, args.fields)
+    print('{} records written in {:.2f}s'.format(count, time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
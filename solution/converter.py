@@ -1,119 +1,354 @@
 import itertools
 import math
+from collections import OrderedDict
+from fractions import Fraction
 from string import ascii_lowercase, ascii_uppercase
 
+from contextlib import contextmanager
 from functools import wraps
+import ast
 import errno
+import inspect
+import multiprocessing
 import os
 import signal
+import threading
+import time
+
+try:
+    import numpy as np # optional: only needed for PostfixConverter(backend='numpy')
+except ImportError:
+    np = None
+
+import lazy
+import optimizer
+import ordering
+import rational
+import solvers
 
 class TimeoutError(Exception):
     pass
 
+@contextmanager
+def alarm(seconds, error_message=os.strerror(errno.ETIME)):
+    # SIGALRM based time limit with sub-second resolution. Only usable from the main thread.
+    def _handle_timeout(signum, frame):
+        raise TimeoutError(error_message)
+
+    previous = signal.signal(signal.SIGALRM, _handle_timeout)
+    # Keep firing after the deadline in case a bare except in a solver loop swallowed the first one
+    signal.setitimer(signal.ITIMER_REAL, seconds, 0.01)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
 def timeout(seconds=10, error_message=os.strerror(errno.ETIME)):
     def decorator(func):
-        def _handle_timeout(signum, frame):
-            raise TimeoutError(error_message)
-
         def wrapper(*args, **kwargs):
-            signal.signal(signal.SIGALRM, _handle_timeout)
-            signal.alarm(seconds)
-            try:
-                result = func(*args, **kwargs)
-            finally:
-                signal.alarm(0)
-            return result
+            with alarm(seconds, error_message):
+                return func(*args, **kwargs)
 
         return wraps(func)(wrapper)
 
     return decorator
 
+class Deadline: # cooperative deadline, checked inside long-running loops
+    check_every = 256 # items between two checks in iterate()
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self):
+        if self.expires is not None and time.monotonic() > self.expires:
+            raise TimeoutError('conversion exceeded its {}s deadline'.format(self.seconds))
+
+    def iterate(self, iterable):
+        # The items of iterable, checking the deadline before the first one and every check_every after it.
+        # The items are still taken one at a time, when the loop asks for them.
+        if self.expires is None:
+            return iterable
+        return itertools.chain.from_iterable(self._runs(iter(iterable)))
+
+    def _runs(self, iterator):
+        for first in iterator: # taken only once the previous run is used up
+            self.check()
+            yield itertools.chain((first,), itertools.islice(iterator, self.check_every - 1))
+
+# The generated code runs with the globals of this module, shared by all threads. The loops of code compiled by
+# compile_with_deadline() find the deadline of their conversion in this thread's _running.deadline.
+_running = threading.local()
+
+def _deadline_iter(iterable):
+    return _running.deadline.iterate(iterable)
+
+def _deadline_check():
+    _running.deadline.check()
+
+def _deadline_call(function, args, location):
+    call = ast.Call(ast.Name(function, ast.Load()), args, [])
+    ast.copy_location(call.func, location)
+    return ast.copy_location(call, location)
+
+def compile_with_deadline(code_string):
+    # Compiles the generated code so that every loop checks the deadline: for loops and comprehensions iterate
+    # through _deadline_iter(), and while loops call _deadline_check() before each pass. Only the compiled code
+    # has the checks; the code returned to the caller stays as it was.
+    tree = ast.parse(code_string)
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.For, ast.comprehension)):
+            node.iter = _deadline_call('_deadline_iter', [node.iter], node.iter)
+        elif isinstance(node, ast.While):
+            node.body.insert(0, ast.copy_location(ast.Expr(_deadline_call('_deadline_check', [], node.test)),
+                                                  node.test))
+    return compile(tree, '<postfix>', 'exec')
+
+def _convert_in_child(conn, postfix_eq, mode, verify, operators, optimize, arithmetic):
+    try:
+        converter = PostfixConverter(cache_size=0, timeout=None, optimize=optimize, arithmetic=arithmetic)
+        converter.operators = operators # including those registered on the parent converter only
+        result, code_string = converter.convert(postfix_eq, mode, verify)
+        conn.send(('ok', result, code_string, converter.candidates_evaluated))
+    except BaseException as e:
+        try:
+            conn.send(('error', e, None, 0))
+        except Exception:
+            conn.send(('error', RuntimeError(repr(e)), None, 0))
+    finally:
+        conn.close()
+
+# Code emitted for [OP_DIGIT_UNK_SOLVER]: the equation is turned into one function of its unknown digits
+# (place values instead of string substitution), then every digit assignment is tried.
+DIGIT_UNK_SOLVER_CODE = """ans_dict = dict()
+{eq} = {eq}.replace('×','*')
+{eq} = {eq}.replace('x','*')
+{eq} = {eq}.replace('÷','/')
+variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])
+for v in set({eq}):
+    if v in variable_candi:
+        ans_dict[v] = []
+term_list = []
+op_list = []
+temp_c = ''
+for tc in {eq}:
+    if tc not in '+-*/=><().':
+        temp_c += tc
+    else:
+        op_list.append(tc)
+        term_list.append(temp_c)
+        temp_c = ''
+term_list.append(temp_c)
+candi_digits = dict()
+for v in ans_dict:
+    candi_digits[v] = range(10)
+lead_zero = False
+new_eq = ''
+for i in range(len(term_list)):
+    term = term_list[i]
+    if len(term) > 1 and term[0] in ans_dict:
+        candi_digits[term[0]] = range(1, 10)
+    if len(term) > 1 and term[0] == '0':
+        lead_zero = True
+    term_eq = ''
+    for j in range(len(term)):
+        term_eq += '+' + term[j] + '*' + str(10**(len(term)-1-j))
+    new_eq += '(' + term_eq[1:] + ')'
+    if i < len(op_list):
+        new_eq += op_list[i]
+new_eq=new_eq.replace('=', '==')
+new_eq=new_eq.replace('>==', '>=')
+new_eq=new_eq.replace('<==', '<=')
+try:
+    eq_func = eval('lambda ' + ', '.join(ans_dict) + ': ' + new_eq)
+except SyntaxError:
+    eq_func = None
+if eq_func is not None and not lead_zero:
+    for c in itertools.product(*candi_digits.values()):
+        try:
+            eval_result = eq_func(*c)
+        except:
+            eval_result = False
+        if eval_result:
+            for i, k in enumerate(ans_dict):
+                ans_dict[k].append(c[i])
+"""
+
+# [OP_LIST_COND_MAX_MIN] and [OP_LIST_COND_BIG_SMALL] run the same engines in the generated code
+ORDERING_CODE = inspect.getsource(ordering.order_by_conditions)
+ORDER_PAIR_CODE = inspect.getsource(ordering.order_pair_by_conditions)
+# [OP_ROUND] of the exact arithmetic mode runs the same helper in the generated code
+ROUND_HALF_UP_CODE = inspect.getsource(rational.round_half_up)
+# and the operators of the exact mode that write numbers as text call this one there
+DECIMAL_TEXT_CODE = inspect.getsource(rational.decimal_text)
+
 class StacknNames: # class comprises 2 stacks
-    def __init__(self):
+    def __init__(self, on_materialize=None):
         self.content_stack = [] # stack for saving values
         self.name_stack = [] # stack for saving the vairable names
-    def pop(self):
+        self.on_materialize = on_materialize # called with (lazy list, name) before a lazy list is materialized
+    def pop(self, stream=False):
+        # stream: the caller only scans the item, so a lazy list is handed over as it is
         if len(self.content_stack) < 1:
             return None
-        return self.content_stack.pop(), self.name_stack.pop()
+        item, name = self.content_stack.pop(), self.name_stack.pop()
+        if not stream and isinstance(item, lazy.LazyList):
+            if self.on_materialize is not None:
+                self.on_materialize(item, name)
+            item = item.materialize()
+        return item, name
 
     def push(self, item, new_name):
         self.content_stack.append(item)
         self.name_stack.append(new_name) # New item is always saved with new variable names
 
+    def peek(self, depth=1):
+        # (item, name) `depth` places from the top, without taking it off or materializing it
+        if len(self.content_stack) < depth:
+            return None
+        return self.content_stack[-depth], self.name_stack[-depth]
+
     def size(self):
         return len(self.content_stack)
 
 
+class NameSequence: # variable names for the generated code, handed out in order without an upper bound
+    # prefix + each character of `first`, then prefix + two lowercase letters (aa, ab, ..., zz), then three, ...
+    def __init__(self, prefix, first):
+        self.prefix = prefix
+        self.first = first
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        n = self.count
+        self.count += 1
+        if n < len(self.first):
+            return self.prefix + self.first[n]
+        n -= len(self.first)
+        width = 2
+        while n >= 26**width:
+            n -= 26**width
+            width += 1
+        letters = []
+        for _ in range(width):
+            n, d = divmod(n, 26)
+            letters.append(ascii_lowercase[d])
+        return self.prefix + ''.join(reversed(letters))
+
+
+class Operator():
+    # A postfix operator token and how it is processed
+    # inputs/outputs: kinds of the values it pops and pushes, bottom of the stack first;
+    #                 'scalar', 'list' or 'any' (scalar or list, depending on the values)
+    # symbol: the Python operator or function it stands for, if any
+    # Simple operators give evaluate(*inputs) -> output value (a tuple for several outputs) and
+    # emit(output names, input names) -> generated code; their list inputs go back on the list stack afterwards,
+    # like those of the built-in list operators.
+    # Operators that need more control give handler(converter, operator, deadline), which works on the
+    # converter's stacks directly; a handler may return an answer to end the conversion early.
+    def __init__(self, name, inputs, outputs, symbol='', evaluate=None, emit=None, handler=None):
+        if handler is None and (evaluate is None or emit is None):
+            raise ValueError('operator {} needs a handler, or both evaluate and emit'.format(name))
+        self.name = name
+        self.arity = len(inputs)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.symbol = symbol
+        self.evaluate = evaluate
+        self.emit = emit
+        self.handler = handler
+
+    def __repr__(self):
+        return 'Operator({!r}, inputs={}, outputs={})'.format(self.name, self.inputs, self.outputs)
+
+
 class PostfixConverter():
-    def __init__(self):
-        # operator_dic = {operator:['what it does', '# of input', 'type of operator', '# of operand created', '# of lists created']}
-        self.operator_dic = {
-            '[OP_ADD]':['+', 2, 'infix', 1, 0],                         
-            '[OP_SUB]':['-', 2, 'infix', 1, 0], 
-            '[OP_DIV]':['/', 2, 'infix', 1, 0],        
-            '[OP_MUL]':['*', 2, 'infix', 1, 0],              
-            '[OP_FDIV]':['//', 2, 'infix', 1, 0],     
-            '[OP_MOD]':['%', 2, 'infix', 1, 0],  
-            '[OP_POW]':['**', 2, 'infix', 1, 0],
-            '[OP_CEIL]':['int', 2, 'function', 1, 0],
-            '[OP_FLOOR]':['int', 2, 'function', 1, 0],
-            '[OP_ROUND]':['round', 2, 'function', 1, 0],
-            '[OP_ABS]':['abs', 1, 'function', 1, 0],
-            '[OP_COMB]':['math.comb', 2, 'function', 1, 0],
-            '[OP_PERM]':['math.perm', 2, 'function', 1, 0],
-            '[OP_GCD]': ['math.gcd', 2, 'function'],
-            '[OP_LCM]': ['', 2, 'function'],
-            '[OP_LIST_SOL]':['',0,'list', 1, 0],
-            '[OP_LIST_EOL]':['',0,'list', 99, 1],
-            '[OP_LIST_ARANGE]':['', 3, 'list_function'],
-            '[OP_LIST_ODD]':['', 2, 'list_function'],
-            '[OP_LIST_EVEN]':['', 2, 'list_function'],
-            '[OP_LIST_POP]':['',0,'list', 0 , -1],
-            '[OP_LIST_GET_PERM]':['', 2, 'list_function'],
-            '[OP_LIST_GET_PRODUCT]':['', 2, 'list_function'],
-            '[OP_GEN_POSSIBLE_LIST]':['',1,'function_special'],
-            '[OP_LIST_MAX]':['max',2,'list_function'],
-            '[OP_LIST_MIN]':['min',2,'list_function'],
-            '[OP_LIST_SUM]':['sum',1,'list_function'],
-            '[OP_LIST_LEN]':['len',1,'list_function'],
-            '[OP_LIST_GET]':['', 2, 'list_function'],
-            '[OP_LIST_INDEX]':['', 2, 'list_function'],
-            '[OP_LIST_FIND_NUM]':['',2,'list_function'],
-            '[OP_LIST_MORE]':['', 2, 'list_function'],
-            '[OP_LIST_LESS]':['', 2, 'list_function'],
-            '[OP_LIST_MORE_EQUAL]':['', 2, 'list_function'],
-            '[OP_LIST_LESS_EQUAL]':['', 2, 'list_function'],
-            '[OP_SET_UNION]':['', 2, 'list_function'],
-            '[OP_SET_DIFFERENCE]':['', 2, 'list_function'],
-            '[OP_SET_INTERSECT]':['', 2, 'list_function'],
-            '[OP_LIST_DIVISIBLE]':['',2,'list_function'],
-            '[OP_LIST_DIVIDE_AND_REMAIN]':['',3,'list_function',0,1],
-            '[OP_LIST_GET_DIVISOR]': ['', 1, 'list_function'],
-            '[OP_LIST_COND_MAX_MIN]':['comp',2,'list_function'],
-            '[OP_LIST2NUM]':['',1,'list_function'],
-            '[OP_NUM2LIST]':['', 1, 'list_function'],
-            '[OP_LIST_NUM2SUM]':['',1,'list_function',0,1],
-            '[OP_LIST_SEARCH_FIXED_DIGIT]':['',3,'list_function',0,1],
-            '[OP_DIGIT_UNK_SOLVER]':['',2,'function_special',1, 0],
-            '[OP_LIST_FIND_UNK]':['',3,'list_function'],
-            '[OP_NUM_UNK_SOLVER]':['',2,'function_special',1, 0],
-            '[OP_LIST_MEAN]':['average',1,'list_function'],
-        }
-
-        self.operand_names = ['var_'+c for c in ascii_lowercase] + ['var_'+c for c in ascii_uppercase] + ['var_'+c for c in '0123456789']
-        for c in ascii_lowercase:
-            for d in ascii_lowercase:
-                self.operand_names.append(f'var_{c}{d}')
-        self.list_names = ['list_'+c for c in ascii_lowercase]
+    def __init__(self, cache_size=1024, timeout=10, deadline='cooperative', optimize=False, backend='python',
+                 arithmetic='float', sinks=None):
+        # timeout: default time budget of a conversion in seconds (None: unlimited)
+        # deadline: how the time budget is enforced
+        #   'cooperative' - deadline checks inside the solver loops and in every loop of the generated code as it
+        #                   is run; works from any thread and does not use signals
+        #   'signal'      - SIGALRM timer around the whole conversion; main thread only
+        #   'process'     - run the conversion in a child process that is killed at the deadline;
+        #                   also stops hangs inside C calls, at the cost of a process start per conversion
+        # optimize: run the generated code through optimizer.optimize() (constant folding, inlining, dead stores)
+        #           before it is run and returned; shorter and faster, but less readable
+        # backend: 'python' - list operators loop over Python lists
+        #          'numpy'  - range, filter and mean list operators work on NumPy arrays (see numpy_backend.py)
+        # arithmetic: 'float' - numbers are floats, fractions are evaluated from their text
+        #             'exact' - numbers are ints and fractions.Fraction, with no float error and no eval();
+        #                       only the final answer is rounded to two decimals (see rational.py)
+        # sinks: instrumentation sinks; each conversion's timings per phase and per operator are passed to
+        #        their record() (see instrument.py). None (default) leaves convert() uninstrumented.
+        if deadline not in ('cooperative', 'signal', 'process'):
+            raise ValueError("deadline must be 'cooperative', 'signal' or 'process', got {!r}".format(deadline))
+        if backend not in ('python', 'numpy'):
+            raise ValueError("backend must be 'python' or 'numpy', got {!r}".format(backend))
+        if backend == 'numpy' and np is None:
+            raise ImportError("backend='numpy' needs NumPy")
+        if arithmetic not in ('float', 'exact'):
+            raise ValueError("arithmetic must be 'float' or 'exact', got {!r}".format(arithmetic))
+        self.timeout = timeout
+        self.deadline_strategy = deadline
+        self.optimize = optimize
+        self.arithmetic = arithmetic
+        # LRU cache: (postfix string, mode) -> (generated code, answer); the mode is part of the key because
+        # the two modes can give different answers (e.g. exec and eager rounding differently)
+        # cache_size=0 disables the cache
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        # LRU cache of the same size: (generated code, answer name) -> (code as run, optimized if asked, and its
+        # code objects), see _prepare_code()
+        self.code_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+        self.operators = dict(OPERATORS) # token -> Operator
+        if arithmetic == 'exact':
+            self.operators.update(EXACT_OPERATORS)
+        if backend == 'numpy':
+            import numpy_backend
+            self.operators.update(numpy_backend.OPERATORS)
+        self.probe = None # instrument.Probe while there are sinks
+        for sink in sinks or ():
+            self.add_sink(sink)
+        self.reset()
+
+    def reset(self):
+        # Per-call state, rebuilt at the start of every conversion
+        self.operand_names = NameSequence('var_', ascii_lowercase + ascii_uppercase + '0123456789')
+        self.list_names = NameSequence('list_', ascii_lowercase)
 
         self.operand_stack = StacknNames()
-        self.list_stack = StacknNames()
+        self.list_stack = StacknNames(on_materialize=self.emit_list)
         self.code_string = ''
+        self.deadline = Deadline()
+        self.candidates_evaluated = 0 # candidates tried by the unknown solvers
 
         # convert number to int type if possible, or make it as float type
         self.intifint = lambda x: int(x) if int(x) == self.to_float(x) else self.to_float(x)
     
+    def emit_list(self, item, name):
+        # A lazy list is about to be used as a real list: the generated code builds it too
+        self.code_string += item.materialize_code(name)
+        item.code = None
+
+    def stream_code(self, item, name):
+        # Expression for iterating over a list in the generated code, without building a lazy list
+        if isinstance(item, lazy.LazyList) and item.code is not None:
+            return '({})'.format(item.code)
+        return name
+
     def to_float(self, frac_str): # Process the fractional input string
         try:
             return float(frac_str)
@@ -135,6 +370,33 @@ class PostfixConverter():
         except ValueError:
             return False
 
+    def format_answer(self, result, name):
+        # Normalize the answer to the dataset form and build the final print line of the code
+        if np is not None and isinstance(result, np.generic): # NumPy backend: back to a Python number
+            result = result.item()
+        if isinstance(result, Fraction) and result.denominator != 1: # exact mode: rounded half up without float error
+            cents = rational.two_decimals(result)
+            check = 'math.floor({} * 100 + Fraction(1, 2))'.format(name)
+            if cents % 100 == 0:
+                return cents // 100, 'print({} // 100)'.format(check)
+            return '{:.2f}'.format(cents / 100), "print('{{:.2f}}'.format({} / 100))".format(check)
+        try:
+            if int(result) != self.to_float(result): # float
+                result = '{:.2f}'.format(round(result+1e-10, 2))
+                if str(result)[-3:] == ".00":
+                    result = int(result[:-3])
+                    print_line = "print(int(eval('{:.2f}'.format(round(%s+1e-10,2)))))"%name
+                else:
+                    print_line = "print('{:.2f}'.format(round(%s+1e-10,2)))"% name
+            else: # int
+                result = int(result)
+                print_line = 'print(int({}))'.format(name)
+        except: # string
+            name = name.replace('(', '')
+            name = name.replace(')', '')
+            print_line = 'print({})'.format(name)
+        return result, print_line
+
     def is_fraction(self, value):
         try:
             float(value)
@@ -143,216 +405,407 @@ class PostfixConverter():
             return True
 
     # convert function
-    @timeout(10)
-    def convert(self, postfix_eq):
+    def convert(self, postfix_eq, mode='exec', verify=False, timeout=None):
         # Core function: Generate code given postfix equation
-        self.__init__()
-        operand_operator_list = postfix_eq.split()
-        for n, i in enumerate(operand_operator_list):
-            if i in self.operator_dic: # if operator
-                operator_name = i
-                operator_info = self.operator_dic[i]
-                
-                # list exceptional functions - init
-                if operator_info[2] == 'list':
-                    if i == '[OP_LIST_SOL]':
-                        self.operand_stack.push('SOL', 'SOL')
-                    elif i == '[OP_LIST_EOL]':
-                        new_list = []
-                        list_name = self.list_names.pop(0)
-                        self.code_string += '{}= []\n'.format(list_name)
-                        while True:
-                            element, var_name = self.operand_stack.pop()
-                            if element == 'SOL':
-                                new_list.reverse()
-                                self.code_string += '{}.reverse()\n'.format(list_name)
-                                self.list_stack.push(new_list, list_name) # Keep the stack of lists seperate
-                                break
-                            if '/' in str(element):
-                                element = eval(str(element))
-                            new_list.append(element)
-                            self.code_string += 'if "/" in str({var_name}):\n    {var_name} = eval(str({var_name}))\n{list_name}.append({var_name})\n'.format(list_name=list_name, var_name=var_name)
-                    
-                    elif i == '[OP_LIST_POP]':
-                        self.list_stack.pop()
-                    else:
-                        print("not defined")
-                    
-                # Operators in infix form: + - * / // % **
-                elif operator_info[2] == 'infix':
-                    b, b_name = self.operand_stack.pop()
-                    a, a_name = self.operand_stack.pop()
-
-                    var_name = self.operand_names.pop(0)
-                    self.code_string += '{var} = {a} {operator} {b}\n'.format(var = var_name, a=a_name, operator=operator_info[0], b=b_name)
-                    intermediate_eq = "{}".format(str(a) + operator_info[0] +str(b))
-                    intermediate = eval(intermediate_eq)
-                    self.operand_stack.push(intermediate, var_name)
-
-                # function: math.perm(num1, num2) etc.
-                elif operator_info[2] == 'function':
-                    var_name = self.operand_names.pop(0)
-                    if operator_info[1]==1:
-                        a, a_name = self.operand_stack.pop()
-                        intermediate_eq = str(operator_info[0]+'('+str(a)+')')
-                        intermediate = eval(intermediate_eq)
-                        self.code_string += '{} = {}({})\n'.format(var_name, operator_info[0], a_name)
-
-                    elif operator_info[1]==2:
-                        if operator_name == '[OP_GCD]':
-                            num1, num1_name = self.operand_stack.pop()
-                            num2, num2_name = self.operand_stack.pop()
-                            num1, num2 = int(num1), int(num2)
-
-                            intermediate = math.gcd(num1, num2) 
-                            self.code_string += '{new_var} = math.gcd(int({var1}), int({var2}))\n'.format(new_var=var_name, var1=num1_name, var2=num2_name)
-
-                        elif operator_name == '[OP_LCM]':
-                            num1, num1_name = self.operand_stack.pop()
-                            num2, num2_name = self.operand_stack.pop()
-                            num1, num2 = int(num1), int(num2)
-
-                            intermediate = num1 * num2 / math.gcd(num1, num2)
-                            self.code_string += '{new_var} = {var1} * {var2} / math.gcd(int({var1}), int({var2}))\n'.format(new_var=var_name, var1=num1_name, var2=num2_name)
-
-                        elif operator_name in ['[OP_CEIL]', '[OP_FLOOR]']:
-                            b, b_name = self.operand_stack.pop()
-                            b = int(b)
-                            a, a_name = self.operand_stack.pop()
-                            if operator_name == '[OP_CEIL]':
-                                try:
-                                    # rounding intergers
-                                    int(a)
-                                    intermediate_eq = 'int((({a}+9*10**({b}-2))//(10**({b}-1)))*10**({b}-1))\n'.format(a=a_name, b=b_name)
-                                    intermediate = eval('int((({a}+9*10**({b}-2))//(10**({b}-1)))*10**({b}-1))\n'.format(a=a, b=b))
-                                    self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
-                                except:
-                                    # int(float) -> floor / int(float+1) -> ceil
-                                    intermediate_eq = 'int({a}*10**{b}+1)/10**{b}\n'.format(a=a_name, b=b_name)
-                                    intermediate = eval('int({a}*10**{b}+1)/10**{b}\n'.format(a=a, b=b))
-                                    self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
-                            else: # [OP_FLOOR]
-                                try:
-                                    int(a)
-                                    intermediate_eq = 'int(({a}//(10**({b}-1)))*10**({b}-1))\n'.format(a=a_name, b=b_name)
-                                    intermediate = eval('int(({a}//(10**({b}-1)))*10**({b}-1))\n'.format(a=a, b=b))
-                                    self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
-                                except:
-                                    intermediate_eq = 'int({a}*10**{b})/10**{b}\n'.format(a=a_name, b=b_name)
-                                    intermediate = eval('int({a}*10**{b})/10**{b}\n'.format(a=a, b=b))
-                                    self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
-                        elif operator_name == '[OP_ROUND]':
-                            b, b_name = self.operand_stack.pop()
-                            b = int(b)
-                            a, a_name = self.operand_stack.pop()
-                            try:
-                                int(str(a))
-                                round_tgt = int(a//10**(b-2))%10
-                                if round_tgt >= 5:
-                                    intermediate = int(((a+9*10**(b-2))//(10**(b-1)))*10**(b-1))
-                                else:
-                                    intermediate = int((a//(10**(b-1)))*10**(b-1))
-                                self.code_string += "round_tgt = int({a}//10**({b}-2)%10)\n\
+        # mode: 'exec'  - the answer is taken from running the generated code (default)
+        #       'eager' - the answer is taken from the values computed while generating the code,
+        #                 and the generated code is not run
+        # verify: run both paths and raise AssertionError if their answers differ (for CI)
+        # timeout: time budget in seconds for this call, overriding the converter's default
+        if mode not in ('exec', 'eager'):
+            raise ValueError("mode must be 'exec' or 'eager', got {!r}".format(mode))
+        if self.probe is not None:
+            return self.probe.observe(self._convert_cached, postfix_eq, mode, verify, timeout)
+        return self._convert_cached(postfix_eq, mode, verify, timeout)
+
+    def _convert_cached(self, postfix_eq, mode, verify, timeout):
+        use_cache = self.cache_size > 0 and not verify
+        if use_cache:
+            key = (postfix_eq, mode)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.cache_hits += 1
+                self.code_string = cached[0]
+                self.candidates_evaluated = 0 # nothing was solved for this call
+                return cached[1], cached[0]
+            self.cache_misses += 1
+
+        seconds = self.timeout if timeout is None else timeout
+        code_object = None
+        if seconds is None or self.deadline_strategy == 'cooperative':
+            result, code_object = self._convert(postfix_eq, mode, verify, Deadline(seconds))
+        elif self.deadline_strategy == 'signal':
+            with alarm(seconds):
+                result, code_object = self._convert(postfix_eq, mode, verify, Deadline())
+        else:
+            result = self._convert_in_process(postfix_eq, mode, verify, seconds)
+
+        if use_cache and code_object is not False:
+            self.cache[key] = (self.code_string, result)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+                self.cache_evictions += 1
+
+        return result, self.code_string
+
+    def _convert_in_process(self, postfix_eq, mode, verify, seconds):
+        self.reset() # what _convert() does in this process; the child's counts are copied back below
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_convert_in_child,
+                                          args=(child_conn, postfix_eq, mode, verify, self.operators, self.optimize,
+                                                self.arithmetic),
+                                          daemon=True)
+        process.start()
+        child_conn.close()
+        try:
+            if not parent_conn.poll(seconds):
+                raise TimeoutError('conversion exceeded its {}s deadline'.format(seconds))
+            status, result, code_string, candidates_evaluated = parent_conn.recv()
+        except EOFError:
+            raise RuntimeError('conversion process exited with code {}'.format(process.exitcode))
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            parent_conn.close()
+        if status == 'error':
+            raise result
+        self.code_string = code_string
+        self.candidates_evaluated = candidates_evaluated
+        return result
+
+    def _convert(self, postfix_eq, mode, verify, deadline):
+        # Returns (answer, compiled code object); the code object is None if the code was not run,
+        # and False if the conversion ended early and must not be cached
+        self.reset()
+        self.deadline = deadline
+        probe = self.probe
+        operators = self.operators
+        if probe is not None:
+            operators = probe.table(operators)
+            probe.mark('setup')
+        tokens = postfix_eq.split()
+        if probe is not None:
+            probe.mark('tokenize')
+        for i in tokens:
+            deadline.check()
+            operator = operators.get(i)
+            if operator is not None: # if operator
+                if operator.handler is None:
+                    self._apply(operator)
+                else:
+                    answer = operator.handler(self, operator, deadline)
+                    if answer is not None: # the operator gave up, e.g. "Memory issue"
+                        if probe is not None:
+                            probe.mark('operands')
+                        return answer, False
+                continue
+
+            # if operand - scalar value
+            var_name = next(self.operand_names)
+
+            number = rational.parse_number(i) if self.arithmetic == 'exact' else None
+            if number is not None: # int or Fraction
+                i = number
+                self.code_string += '{} = {!r}\n'.format(var_name, i)
+            elif self.is_number(i):
+                i = self.to_float(i)
+                if i == int(i):
+                    i = int(i)
+                self.code_string += '{} = {}\n'.format(var_name, i)
+                #if self.is_fraction(i):
+                #    self.code_string += '{var} = round({var}+1e-10, 2)\n'.format(var=var_name)
+                #    i = round(self.to_float(i)+1e-10, 2)
+            else:
+                self.code_string += "{} = '{}'\n".format(var_name, i)
+
+            self.operand_stack.push(i, var_name)
+
+
+        if probe is not None:
+            probe.mark('operands')
+        result, name = self.operand_stack.pop()
+        deadline.check()
+        code_object = self._prepare_code(name, mode == 'exec' or verify, deadline.expires is not None, probe)
+        if mode == 'exec' or verify:
+            loc = {}
+            _running.deadline = deadline
+            exec(code_object, globals(), loc)
+            exec_result = loc[name]
+            if verify:
+                eager_answer, _ = self.format_answer(result, name)
+                exec_answer, _ = self.format_answer(exec_result, name)
+                assert eager_answer == exec_answer, \
+                    f"eager answer {eager_answer!r} != exec answer {exec_answer!r} for {postfix_eq!r}"
+            if mode == 'exec':
+                result = exec_result
+            if probe is not None:
+                probe.mark('exec')
+
+        str(result) # Raise Time out error for error hanlding
+
+        result, print_line = self.format_answer(result, name)
+        self.code_string += print_line
+        if probe is not None:
+            probe.mark('format')
+
+        return result, code_object
+
+    def _prepare_code(self, name, run, checked, probe):
+        # Optimizes the generated code if asked, and returns its code object if it is to be run (else None);
+        # checked: compiled with the deadline checks. Both are kept in an LRU cache keyed on the generated code, so
+        # an expression converted again after a result cache miss (the other mode, verify=True, evicted) is
+        # optimized and compiled once.
+        key = (self.code_string, name)
+        entry = self.code_cache.get(key) if self.cache_size > 0 else None
+        if entry is None:
+            code_string = optimizer.optimize(self.code_string, name) if self.optimize else self.code_string
+            entry = (code_string, {}) # checked -> code object
+            if self.cache_size > 0:
+                self.code_cache[key] = entry
+                if len(self.code_cache) > self.cache_size:
+                    self.code_cache.popitem(last=False)
+        else:
+            self.code_cache.move_to_end(key)
+        self.code_string = entry[0]
+        if probe is not None and self.optimize:
+            probe.mark('optimize')
+        if not run:
+            return None
+        code_object = entry[1].get(checked)
+        if code_object is None:
+            if checked:
+                code_object = compile_with_deadline(self.code_string)
+            else:
+                code_object = compile(self.code_string, '<postfix>', 'exec')
+            entry[1][checked] = code_object
+        if probe is not None:
+            probe.mark('compile')
+        return code_object
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses, 'evictions': self.cache_evictions,
+                'size': len(self.cache), 'maxsize': self.cache_size}
+
+    def cache_clear(self):
+        self.cache.clear()
+        self.code_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+    def add_sink(self, sink):
+        # Start passing instrumentation events to sink.record(event); see instrument.py
+        if self.probe is None:
+            import instrument
+            self.probe = instrument.Probe(self, [])
+        self.probe.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        # Stop passing events to sink; without sinks, convert() is no longer instrumented
+        if self.probe is not None:
+            self.probe.sinks.remove(sink)
+            if not self.probe.sinks:
+                self.probe = None
+
+    def register_operator(self, operator):
+        # Add or replace an operator for this converter only; see register_operator() for all converters
+        self.operators[operator.name] = operator
+        self.cache_clear()
+        return operator
+
+    def _apply(self, operator):
+        # Pops the inputs of a simple operator, evaluates it, emits its code and pushes the outputs
+        values = []
+        names = []
+        for kind in reversed(operator.inputs):
+            value, name = (self.list_stack if kind == 'list' else self.operand_stack).pop()
+            values.append(value)
+            names.append(name)
+        values.reverse()
+        names.reverse()
+        outputs = operator.evaluate(*values)
+        if len(operator.outputs) == 1:
+            outputs = (outputs,)
+        output_names = [next(self.list_names if kind == 'list' else self.operand_names) for kind in operator.outputs]
+        self.code_string += operator.emit(output_names, names)
+        for kind, value, name in zip(operator.inputs, values, names):
+            if kind == 'list':
+                self.list_stack.push(value, name)
+        for kind, value, name in zip(operator.outputs, outputs, output_names):
+            (self.list_stack if kind == 'list' else self.operand_stack).push(value, name)
+
+    def _pop_list_and_scalar(self, stream=False):
+        # (list, list name, number, number name) for the operators taking a list and a number
+        temp_list, temp_lname = self.list_stack.pop(stream=stream)
+        a, a_name = self.operand_stack.pop()
+        if isinstance(a, Fraction): # exact mode, kept as it is to be found in lists of Fractions
+            return temp_list, temp_lname, a, a_name
+        try:
+            a = self.to_float(a)
+            a = self.intifint(a)
+        except:
+            pass
+        return temp_list, temp_lname, a, a_name
+
+    # Operator handlers: handler(self, operator, deadline)
+
+    def _op_list_sol(self, operator, deadline):
+        self.operand_stack.push('SOL', 'SOL')
+
+    def _op_list_eol(self, operator, deadline):
+        new_list = []
+        list_name = next(self.list_names)
+        self.code_string += '{}= []\n'.format(list_name)
+        while True:
+            element, var_name = self.operand_stack.pop()
+            if element == 'SOL':
+                new_list.reverse()
+                self.code_string += '{}.reverse()\n'.format(list_name)
+                self.list_stack.push(new_list, list_name) # Keep the stack of lists seperate
+                break
+            if '/' in str(element):
+                element = eval(str(element))
+            new_list.append(element)
+            self.code_string += 'if "/" in str({var_name}):\n    {var_name} = eval(str({var_name}))\n{list_name}.append({var_name})\n'.format(list_name=list_name, var_name=var_name)
+
+    def _op_list_pop(self, operator, deadline):
+        self.list_stack.pop(stream=True)
+
+    def _op_gcd(self, operator, deadline):
+        var_name = next(self.operand_names)
+        num1, num1_name = self.operand_stack.pop()
+        num2, num2_name = self.operand_stack.pop()
+        num1, num2 = int(num1), int(num2)
+
+        intermediate = math.gcd(num1, num2) 
+        self.code_string += '{new_var} = math.gcd(int({var1}), int({var2}))\n'.format(new_var=var_name, var1=num1_name, var2=num2_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_lcm(self, operator, deadline):
+        var_name = next(self.operand_names)
+        num1, num1_name = self.operand_stack.pop()
+        num2, num2_name = self.operand_stack.pop()
+        num1, num2 = int(num1), int(num2)
+
+        intermediate = num1 * num2 / math.gcd(num1, num2)
+        self.code_string += '{new_var} = {var1} * {var2} / math.gcd(int({var1}), int({var2}))\n'.format(new_var=var_name, var1=num1_name, var2=num2_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_ceil(self, operator, deadline):
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        b = int(b)
+        a, a_name = self.operand_stack.pop()
+        try:
+            # rounding intergers
+            int(a)
+            intermediate_eq = 'int((({a}+9*10**({b}-2))//(10**({b}-1)))*10**({b}-1))\n'.format(a=a_name, b=b_name)
+            intermediate = eval('int((({a}+9*10**({b}-2))//(10**({b}-1)))*10**({b}-1))\n'.format(a=a, b=b))
+            self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
+        except:
+            # int(float) -> floor / int(float+1) -> ceil
+            intermediate_eq = 'int({a}*10**{b}+1)/10**{b}\n'.format(a=a_name, b=b_name)
+            intermediate = eval('int({a}*10**{b}+1)/10**{b}\n'.format(a=a, b=b))
+            self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_floor(self, operator, deadline):
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        b = int(b)
+        a, a_name = self.operand_stack.pop()
+        try:
+            int(a)
+            intermediate_eq = 'int(({a}//(10**({b}-1)))*10**({b}-1))\n'.format(a=a_name, b=b_name)
+            intermediate = eval('int(({a}//(10**({b}-1)))*10**({b}-1))\n'.format(a=a, b=b))
+            self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
+        except:
+            intermediate_eq = 'int({a}*10**{b})/10**{b}\n'.format(a=a_name, b=b_name)
+            intermediate = eval('int({a}*10**{b})/10**{b}\n'.format(a=a, b=b))
+            self.code_string += '{var}={eq}\n'.format(var=var_name, eq=intermediate_eq)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_round(self, operator, deadline):
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        b = int(b)
+        a, a_name = self.operand_stack.pop()
+        try:
+            int(str(a))
+            round_tgt = int(a//10**(b-2))%10
+            if round_tgt >= 5:
+                intermediate = int(((a+9*10**(b-2))//(10**(b-1)))*10**(b-1))
+            else:
+                intermediate = int((a//(10**(b-1)))*10**(b-1))
+            self.code_string += "round_tgt = int({a}//10**({b}-2)%10)\n\
 if round_tgt >= 5:\n\
     {intermediate} = int((({a}+9*10**({b}-2))//(10**({b}-1)))*10**({b}-1))\n\
 else:\n\
     {intermediate} = int(({a}//(10**({b}-1)))*10**({b}-1))".format(a=a, b=b, intermediate=var_name)
-                            except:
-                                a = self.to_float(a)
-                                intermediate = round(a+1e-10, b) # Add epsilon to get the correct value. 1.7325 -> round(1.7325, 3) -> 1.732 / round(1.7325000001, 3) -> 1.733
-                                self.code_string += '{var} = round(float({a})+1e-10, {b})\n'.format(var=var_name, a=a_name, b=b_name)
-
-                        elif operator_name == '[OP_COMB]':
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            intermediate = 1
-                            a = int(a)
-                            b = int(b)
-                            for i, elem in enumerate(range(b)):
-                                intermediate = intermediate * (a-i)
-                            for i, elem in enumerate(range(b)):
-                                intermediate = intermediate / (i+1)
-                            self.code_string += '{new_var} = 1\n\
+        except:
+            a = self.to_float(a)
+            intermediate = round(a+1e-10, b) # Add epsilon to get the correct value. 1.7325 -> round(1.7325, 3) -> 1.732 / round(1.7325000001, 3) -> 1.733
+            self.code_string += '{var} = round(float({a})+1e-10, {b})\n'.format(var=var_name, a=a_name, b=b_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_comb(self, operator, deadline):
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        intermediate = 1
+        a = int(a)
+        b = int(b)
+        for i, elem in enumerate(range(b)):
+            intermediate = intermediate * (a-i)
+        for i, elem in enumerate(range(b)):
+            intermediate = intermediate / (i+1)
+        self.code_string += '{new_var} = 1\n\
 {a} = int({a})\n\
 {b} = int({b})\n\
 for i, elem in enumerate(range({b})):\n\
     {new_var} = {new_var} * ({a}-i)\n\
 for i, elem in enumerate(range({b})):\n\
     {new_var} = {new_var} / (i+1)\n'.format(new_var=var_name, a=a_name, b=b_name)
-                        elif operator_name == '[OP_PERM]':
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            intermediate = 1
-                            a = int(a)
-                            b = int(b)
-                            for i, elem in enumerate(range(b)):
-                                intermediate = intermediate * (a-i)
-                            self.code_string += '{new_var} = 1\n\
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_perm(self, operator, deadline):
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        intermediate = 1
+        a = int(a)
+        b = int(b)
+        for i, elem in enumerate(range(b)):
+            intermediate = intermediate * (a-i)
+        self.code_string += '{new_var} = 1\n\
 {a} = int({a})\n\
 {b} = int({b})\n\
 for i, elem in enumerate(range({b})):\n\
     {new_var} = {new_var} * ({a}-i)\n'.format(new_var=var_name, a=a_name, b=b_name)
-                        else: # currently unused parts. Available above Python 3.8 version.
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            intermediate_eq = str(operator_info[0])+'('+a_name+','+b_name+')'
-                            intermediate = eval(intermediate_eq)
-                            self.code_string += '{var} = {intermediate}\n'.format(var=var_name, intermediate=intermediate_eq)
-                    else:
-                        print("not defined")
-                    self.operand_stack.push(intermediate, var_name)
-                elif operator_info[2] == 'function_special':
-                    if operator_name == '[OP_DIGIT_UNK_SOLVER]':
-                        x, x_name = self.operand_stack.pop()
-                        eq, eq_name = self.operand_stack.pop()
-                        eq = str(eq)
-                        eq = eq.replace('×','*')
-                        eq = eq.replace('x','*')
-                        eq = eq.replace('÷','/')
-                        ans_dict = dict()
-                        variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])
-                        ans_dict = {v:[] for v in set(eq) & variable_candi}
-                        candi = list(itertools.product('0123456789', repeat=len(ans_dict)))
-                        for c in candi:
-                            temp = eq
-                            for i, (k, _) in enumerate(ans_dict.items()):
-                                temp = temp.replace(k, str(c[i]))
-                            term_list = []
-                            op_list = []
-                            temp_c = ''
-                            for tc in temp:
-                                if tc not in '+-*/=><().':
-                                    temp_c += tc
-                                else:
-                                    op_list.append(tc)
-                                    term_list.append(temp_c)
-                                    temp_c = ''
-                            term_list.append(temp_c)
-                            new_eq = ''
-                            for i in range(len(op_list)):
-                                new_eq += str(int(term_list[i]))+op_list[i]
-                            new_eq += str(int(term_list[-1]))
-                            if len(new_eq) == len(eq):
-                                new_eq=new_eq.replace('=', '==')
-                                new_eq=new_eq.replace('>==', '>=')
-                                new_eq=new_eq.replace('<==', '<=')
-                                eval_result = False
-                                try:
-                                    eval_result = eval(new_eq)
-                                except:
-                                    pass
-                                if eval_result:
-                                    for i, (k, _) in enumerate(ans_dict.items()):
-                                        ans_dict[k].append(int(c[i]))
-
-                        intermediate = list(set(ans_dict[x]))
-                        if len(intermediate) == 1:
-                            intermediate = intermediate[0]
-
-                        if isinstance(intermediate, list):
-                            new_list_name = self.list_names.pop(0)
-                            self.list_stack.push(intermediate, new_list_name)
-                            self.code_string += "ans_dict = dict()\n\
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_digit_unk_solver(self, operator, deadline):
+        x, x_name = self.operand_stack.pop()
+        eq, eq_name = self.operand_stack.pop()
+        eq = solvers.normalize_equation(eq)
+        compiled = solvers.compile_digit_equation(eq)
+        if compiled is None:
+            ans_dict = solvers.solve_digit_legacy(eq, deadline)
+        else:
+            ans_dict = solvers.solve_compiled(*compiled, deadline=deadline)
+
+        intermediate = list(set(ans_dict[x]))
+        if len(intermediate) == 1:
+            intermediate = intermediate[0]
+
+        if isinstance(intermediate, list):
+            new_list_name = next(self.list_names)
+            self.list_stack.push(intermediate, new_list_name)
+            if compiled is None:
+                self.code_string += "ans_dict = dict()\n\
 {eq} = {eq}.replace('×','*')\n\
 {eq} = {eq}.replace('x','*')\n\
 {eq} = {eq}.replace('÷','/')\n\
@@ -393,10 +846,14 @@ for c in candi:\n\
             for i, (k, _) in enumerate(ans_dict.items()):\n\
                 ans_dict[k].append(int(c[i]))\n\
 {intermediate} = list(set(ans_dict[{x}]))\n".format(intermediate=new_list_name, eq=eq_name, x=x_name)
-                        else:
-                            new_var_name = self.operand_names.pop(0)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.code_string += "ans_dict = dict()\n\
+            else:
+                self.code_string += DIGIT_UNK_SOLVER_CODE.format(eq=eq_name)
+                self.code_string += "{} = list(set(ans_dict[{}]))\n".format(new_list_name, x_name)
+        else:
+            new_var_name = next(self.operand_names)
+            self.operand_stack.push(intermediate, new_var_name)
+            if compiled is None:
+                self.code_string += "ans_dict = dict()\n\
 {eq} = {eq}.replace('×','*')\n\
 {eq} = {eq}.replace('x','*')\n\
 {eq} = {eq}.replace('÷','/')\n\
@@ -437,71 +894,34 @@ for c in candi:\n\
             for i, (k, _) in enumerate(ans_dict.items()):\n\
                 ans_dict[k] = int(c[i])\n\
 {intermediate} = ans_dict[{x}]\n".format(intermediate=new_var_name, eq=eq_name, x=x_name)
-                    elif operator_name == '[OP_NUM_UNK_SOLVER]':
-                        x, x_name = self.operand_stack.pop()
-                        eq, eq_name = self.operand_stack.pop()
-                        eq = str(eq)
-                        eq = eq.replace('×','*')
-                        eq = eq.replace('x','*')
-                        eq = eq.replace('÷','/')
-                        ans_dict = dict()
-                        variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])
-                        ans_dict = {v:[] for v in set(eq) & variable_candi}
-                        candidate_num = [i for i in range(51)]
-                        candi = list(itertools.product(candidate_num, repeat=len(ans_dict)))
-                        for c in candi:
-                            temp = eq
-                            for i, (k, _) in enumerate(ans_dict.items()):
-                                temp = temp.replace(k, str(c[i]))
-                            term_list = []
-                            op_list = []
-                            temp_c = ''
-                            for tc in temp:
-                                if tc not in '+-*/=><().':
-                                    temp_c += tc
-                                else:
-                                    op_list.append(tc)
-                                    term_list.append(temp_c)
-                                    temp_c = ''
-                            term_list.append(temp_c)
-                            new_eq = ''
-                            for i in range(len(op_list)):
-                                if term_list[i] == '':
-                                    new_eq += str(term_list[i])+op_list[i]
-                                else:
-                                    new_eq += str(int(term_list[i]))+op_list[i]
-                            new_eq += str(int(term_list[-1]))
-                            new_eq=new_eq.replace('=', '==')
-                            new_eq=new_eq.replace('>==', '>=')
-                            new_eq=new_eq.replace('<==', '<=')
-                            eval_result = False
-                            try:
-                                if '=' in new_eq and '>' not in new_eq and '<' not in new_eq:
-                                    new_eq=new_eq.replace('==','=')
-                                    new_eq=new_eq.replace('>','')
-                                    new_eq=new_eq.replace('<','')
-                                    new_eq=new_eq.split('=')
-                                    for i in range(len(new_eq)-1):
-                                        eval_result = math.isclose(eval(new_eq[i]), eval(new_eq[i+1]))
-                                        if not eval_result:
-                                            break
-                                else:
-                                    eval_result = eval(new_eq)
-                            except:
-                                eval_result = False
-                                pass
-                            if eval_result:
-                                for i, (k, _) in enumerate(ans_dict.items()):
-                                    ans_dict[k].append(int(c[i]))
-
-                        intermediate = list(set(ans_dict[x]))
-                        if len(intermediate) == 1:
-                            intermediate = intermediate[0]
-
-                        if isinstance(intermediate, list):
-                            new_list_name = self.list_names.pop(0)
-                            self.list_stack.push(intermediate, new_list_name)
-                            self.code_string += "ans_dict = dict()\n\
+            else:
+                self.code_string += DIGIT_UNK_SOLVER_CODE.format(eq=eq_name)
+                self.code_string += "{} = ans_dict[{}][-1]\n".format(new_var_name, x_name)
+
+    def _op_num_unk_solver(self, operator, deadline):
+        x, x_name = self.operand_stack.pop()
+        eq, eq_name = self.operand_stack.pop()
+        eq = solvers.normalize_equation(eq)
+        compiled = solvers.compile_num_equation(eq)
+        if compiled is None:
+            ans_dict, evaluated = solvers.solve_num_legacy(eq, deadline)
+            domains = {v: solvers.NUM_CANDIDATES for v in ans_dict}
+        else:
+            ans_dict, evaluated = solvers.solve_num_compiled(*compiled, deadline=deadline)
+            domains = compiled[1]
+        self.candidates_evaluated += evaluated
+        # The generated code only enumerates the candidates left after bound propagation
+        domain_code = '{' + ', '.join("'{}': {}".format(v, 'range(51)' if len(d) == 51 else list(d))
+                                      for v, d in sorted(domains.items())) + '}'
+
+        intermediate = list(set(ans_dict[x]))
+        if len(intermediate) == 1:
+            intermediate = intermediate[0]
+
+        if isinstance(intermediate, list):
+            new_list_name = next(self.list_names)
+            self.list_stack.push(intermediate, new_list_name)
+            self.code_string += "ans_dict = dict()\n\
 {eq} = {eq}.replace('×','*')\n\
 {eq} = {eq}.replace('x','*')\n\
 {eq} = {eq}.replace('÷','/')\n\
@@ -509,8 +929,8 @@ variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L'
 for v in set({eq}):\n\
     if v in variable_candi:\n\
         ans_dict[v] = []\n\
-candidate_num = [i for i in range(51)]\n\
-candi = list(itertools.product(candidate_num, repeat=len(ans_dict)))\n\
+candidate_num = {domains}\n\
+candi = list(itertools.product(*map(candidate_num.get, ans_dict)))\n\
 for c in candi:\n\
     temp = {eq}\n\
     for i, (k, _) in enumerate(ans_dict.items()):\n\
@@ -555,11 +975,11 @@ for c in candi:\n\
     if eval_result:\n\
         for i, (k, _) in enumerate(ans_dict.items()):\n\
             ans_dict[k].append(int(c[i]))\n\
-{intermediate} = list(set(ans_dict[{x}]))\n".format(intermediate=new_list_name, eq=eq_name, x=x_name)
-                        else:
-                            new_var_name = self.operand_names.pop(0)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.code_string += "ans_dict = dict()\n\
+{intermediate} = list(set(ans_dict[{x}]))\n".format(intermediate=new_list_name, eq=eq_name, x=x_name, domains=domain_code)
+        else:
+            new_var_name = next(self.operand_names)
+            self.operand_stack.push(intermediate, new_var_name)
+            self.code_string += "ans_dict = dict()\n\
 {eq} = {eq}.replace('×','*')\n\
 {eq} = {eq}.replace('x','*')\n\
 {eq} = {eq}.replace('÷','/')\n\
@@ -567,8 +987,8 @@ variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L'
 for v in set({eq}):\n\
     if v in variable_candi:\n\
         ans_dict[v] = 0\n\
-candidate_num = [i for i in range(51)]\n\
-candi = list(itertools.product(candidate_num, repeat=len(ans_dict)))\n\
+candidate_num = {domains}\n\
+candi = list(itertools.product(*map(candidate_num.get, ans_dict)))\n\
 for c in candi:\n\
     temp = {eq}\n\
     for i, (k, _) in enumerate(ans_dict.items()):\n\
@@ -613,107 +1033,136 @@ for c in candi:\n\
     if eval_result:\n\
         for i, (k, _) in enumerate(ans_dict.items()):\n\
             ans_dict[k] = int(c[i])\n\
-{intermediate} = ans_dict[{x}]\n".format(intermediate=new_var_name, eq=eq_name, x=x_name)
-                    elif operator_name == '[OP_GEN_POSSIBLE_LIST]':
-                        unk, unk_name = self.operand_stack.pop()
-                        unk = str(unk)
-                        ans_dict = dict()
-                        variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])
-                        ans_dict = {v:0 for v in set(unk) & variable_candi}
-                        candi = list(itertools.product('0123456789', repeat=len(ans_dict)))
-                        intermediate_list = []
-                        for c in candi:
-                            temp = unk
-                            for i, (k, _) in enumerate(ans_dict.items()):
-                                temp = temp.replace(k, str(c[i]))
-                            if len(unk) == len(str(int(temp))):
-                                new_elem = int(temp)
-                                intermediate_list.append(new_elem)
-                        
-                        new_list_name = self.list_names.pop(0)
-                        self.operand_stack.push(unk, unk_name)
-                        self.list_stack.push(intermediate_list, new_list_name)
-                        self.code_string += "ans_dict = dict()\n\
-{unk} = str({unk})\n\
-{intermediate_list} = []\n\
+{intermediate} = ans_dict[{x}]\n".format(intermediate=new_var_name, eq=eq_name, x=x_name, domains=domain_code)
+
+    def _op_gen_possible_list(self, operator, deadline):
+        unk, unk_name = self.operand_stack.pop()
+        unk = str(unk)
+        intermediate_list = lazy.DigitCandidates.from_pattern(unk)
+        if intermediate_list is None: # characters other than digits and capital letters
+            ans_dict = dict()
+            variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])
+            ans_dict = {v:0 for v in set(unk) & variable_candi}
+            candi = list(itertools.product('0123456789', repeat=len(ans_dict)))
+            intermediate_list = []
+            for c in candi:
+                deadline.check()
+                temp = unk
+                for i, (k, _) in enumerate(ans_dict.items()):
+                    temp = temp.replace(k, str(c[i]))
+                if len(unk) == len(str(int(temp))):
+                    new_elem = int(temp)
+                    intermediate_list.append(new_elem)
+
+        new_list_name = next(self.list_names)
+        self.operand_stack.push(unk, unk_name)
+        self.list_stack.push(intermediate_list, new_list_name)
+        # Each distinct character adds place * digit; taking the characters in order of first
+        # appearance yields the candidates in ascending order
+        self.code_string += "{unk} = str({unk})\n\
+{intermediate_list} = [0]\n\
 variable_candi = set(['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z'])\n\
-for v in set({unk}):\n\
+for v in dict.fromkeys({unk}):\n\
+    place = 0\n\
+    for i in range(len({unk})):\n\
+        if {unk}[i] == v:\n\
+            place = place + 10**(len({unk})-1-i)\n\
     if v in variable_candi:\n\
-        ans_dict[v] = 0\n\
-candi = list(itertools.product('0123456789', repeat=len(ans_dict)))\n\
-for c in candi:\n\
-    temp = {unk}\n\
-    for i, (k, _) in enumerate(ans_dict.items()):\n\
-        temp = temp.replace(k, str(c[i]))\n\
-    if len({unk}) == len(str(int(temp))):\n\
-        new_elem = int(temp)\n\
-        {intermediate_list}.append(new_elem)\n".format(unk=unk_name, intermediate_list=new_list_name)
-
-                elif operator_info[2] == 'list_function':
-                    if operator_info[1]==1: # input: list / output: scalar
-                        if operator_name == '[OP_LIST_MEAN]':
-                            temp_list, temp_lname = self.list_stack.pop()
-                            temp_list = [self.to_float(i) for i in temp_list]
-                            intermediate = sum(temp_list) / len(temp_list)
-                            new_var_name = self.operand_names.pop(0)
-                            self.code_string += '{temp_list} = [float(i) for i in {temp_list}]\n\
+        candi = range(10)\n\
+    else:\n\
+        candi = range(int(v), int(v)+1)\n\
+    if v == {unk}[0] and len({unk}) > 1:\n\
+        candi = range(max(candi.start, 1), candi.stop)\n\
+    temp = []\n\
+    for elem in {intermediate_list}:\n\
+        for c in candi:\n\
+            temp.append(elem + place*c)\n\
+    {intermediate_list} = temp\n".format(unk=unk_name, intermediate_list=new_list_name)
+
+    def _op_list_mean(self, operator, deadline):
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_var_name = next(self.operand_names)
+        if isinstance(temp_list, lazy.Arrangements): # elements are floats already
+            intermediate = sum(temp_list) / len(temp_list)
+            if temp_list.code is None:
+                self.code_string += '{new_var_name} = sum({temp_list})/len({temp_list})\n'.format(new_var_name=new_var_name, temp_list=temp_lname)
+            else:
+                self.code_string += '{new_var_name} = sum({stream})/sum(1 for i in {stream})\n'.format(new_var_name=new_var_name, stream=self.stream_code(temp_list, temp_lname))
+        else:
+            if isinstance(temp_list, lazy.LazyList):
+                self.emit_list(temp_list, temp_lname)
+            temp_list = [self.to_float(i) for i in temp_list]
+            intermediate = sum(temp_list) / len(temp_list)
+            self.code_string += '{temp_list} = [float(i) for i in {temp_list}]\n\
 {new_var_name} = sum({temp_list})/len({temp_list})\n'.format(new_var_name=new_var_name, temp_list=temp_lname)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.list_stack.push(temp_list, temp_lname)
-                        elif operator_name == '[OP_LIST_SUM]':
-                            temp_list, temp_lname = self.list_stack.pop()
-                            temp_list = [self.to_float(i) for i in temp_list]
-                            intermediate = sum(temp_list)
-                            new_var_name = self.operand_names.pop(0)
-                            self.code_string += '{temp_list} = [float(i) for i in {temp_list}]\n\
+        self.operand_stack.push(intermediate, new_var_name)
+        self.list_stack.push(temp_list, temp_lname)
+
+    def _op_list_sum(self, operator, deadline):
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_var_name = next(self.operand_names)
+        if isinstance(temp_list, lazy.Arrangements): # elements are floats already
+            intermediate = sum(temp_list)
+            self.code_string += '{} = sum({})\n'.format(new_var_name, self.stream_code(temp_list, temp_lname))
+        else:
+            if isinstance(temp_list, lazy.LazyList):
+                self.emit_list(temp_list, temp_lname)
+            temp_list = [self.to_float(i) for i in temp_list]
+            intermediate = sum(temp_list)
+            self.code_string += '{temp_list} = [float(i) for i in {temp_list}]\n\
 {new_var_name} = sum({temp_list})\n'.format(new_var_name=new_var_name, temp_list=temp_lname)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.list_stack.push(temp_list, temp_lname)
-                        elif operator_name == '[OP_LIST2NUM]':
-                            temp_list, temp_lname = self.list_stack.pop()
-                            new_var_name = self.operand_names.pop(0)
-                            intermediate = ''
-                            for i in temp_list:
-                                i = str(i)
-                                intermediate = intermediate + i
-                            self.code_string += '{new_var_name}=""\n\
+        self.operand_stack.push(intermediate, new_var_name)
+        self.list_stack.push(temp_list, temp_lname)
+
+    def _op_list2num(self, operator, deadline, text=str):
+        # text: how an element is written, in the generated code too (by its __name__)
+        temp_list, temp_lname = self.list_stack.pop()
+        new_var_name = next(self.operand_names)
+        intermediate = ''
+        for i in temp_list:
+            i = text(i)
+            intermediate = intermediate + i
+        self.code_string += '{new_var_name}=""\n\
 for i in {temp_list}:\n\
-    i = str(i)\n\
-    {new_var_name} = {new_var_name} + i\n'.format(new_var_name = new_var_name, temp_list = temp_lname)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.list_stack.push(temp_list,temp_lname)
-                        elif operator_name == '[OP_NUM2LIST]':
-                            a, a_name = self.operand_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            intermediate_list = []
-                            a = int(a)
-                            while a//10 > 0:
-                                intermediate_list.append(a%10)
-                                a = a//10
-                            intermediate_list.append(a%10)
-                            intermediate_list = intermediate_list[::-1]
-                            self.code_string += '{new_list_name} = []\n\
+    i = {text}(i)\n\
+    {new_var_name} = {new_var_name} + i\n'.format(new_var_name = new_var_name, temp_list = temp_lname,
+                                                   text=text.__name__)
+        self.operand_stack.push(intermediate, new_var_name)
+        self.list_stack.push(temp_list,temp_lname)
+
+    def _op_num2list(self, operator, deadline):
+        a, a_name = self.operand_stack.pop()
+        new_list_name = next(self.list_names)
+        intermediate_list = []
+        a = int(a)
+        while a//10 > 0:
+            intermediate_list.append(a%10)
+            a = a//10
+        intermediate_list.append(a%10)
+        intermediate_list = intermediate_list[::-1]
+        self.code_string += '{new_list_name} = []\n\
 {a} = int({a})\n\
 while {a}//10 > 0:\n\
     {new_list_name}.append({a}%10)\n\
     {a} = {a}//10\n\
 {new_list_name}.append({a}%10)\n\
 {new_list_name} = {new_list_name}[::-1]\n'.format(a=a_name, new_list_name=new_list_name)
-                            self.list_stack.push(intermediate_list, new_list_name)
-                        elif operator_name == '[OP_LIST_NUM2SUM]':
-                            temp_list, temp_lname = self.list_stack.pop()
-                            a_name = self.operand_names.pop(0)
-                            new_list_name = self.list_names.pop(0)
-                            intermediate_list = []
-                            for i in temp_list:
-                                element = 0
-                                i = int(i)
-                                while i//10 > 0:
-                                    element = element + i%10
-                                    i = i//10
-                                element = element + i%10
-                                intermediate_list.append(element)
-                            self.code_string += "{intermediate_list}=[]\n\
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_num2sum(self, operator, deadline):
+        temp_list, temp_lname = self.list_stack.pop()
+        a_name = next(self.operand_names)
+        new_list_name = next(self.list_names)
+        intermediate_list = []
+        for i in temp_list:
+            element = 0
+            i = int(i)
+            while i//10 > 0:
+                element = element + i%10
+                i = i//10
+            element = element + i%10
+            intermediate_list.append(element)
+        self.code_string += "{intermediate_list}=[]\n\
 for i in {temp_list}:\n\
     {a_name} = 0\n\
     i = int(i)\n\
@@ -722,419 +1171,370 @@ for i in {temp_list}:\n\
         i = i//10\n\
     {a_name} = {a_name} + i%10\n\
     {intermediate_list}.append({a_name})\n".format(intermediate_list=new_list_name, temp_list=temp_lname, a_name=a_name)
-                            self.list_stack.push(intermediate_list, new_list_name)
-                        elif operator_name == '[OP_LIST_GET_DIVISOR]':
-                            num, num_name = self.operand_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            num = int(num)
-                            intermediate_list = []
-                            num_sqrt = int(math.sqrt(num))
-                            for i in range(1, num_sqrt+1):
-                                if num % i == 0:
-                                    intermediate_list.append(i)
-                                    intermediate_list.append(int(num/i))
-                            new_list = sorted(set(intermediate_list))
-                            self.list_stack.push(new_list, new_list_name)
-                            self.code_string += "{intermediate_list} = []\n\
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_get_divisor(self, operator, deadline):
+        num, num_name = self.operand_stack.pop()
+        new_list_name = next(self.list_names)
+        num = int(num)
+        intermediate_list = []
+        num_sqrt = int(math.sqrt(num))
+        for i in deadline.iterate(range(1, num_sqrt+1)):
+            if num % i == 0:
+                intermediate_list.append(i)
+                intermediate_list.append(int(num/i))
+        new_list = sorted(set(intermediate_list))
+        self.list_stack.push(new_list, new_list_name)
+        self.code_string += "{intermediate_list} = []\n\
 num_sqrt = int(math.sqrt({num_name}))\n\
 for i in range(1, num_sqrt+1):\n\
     if {num_name} % i == 0:\n\
         {intermediate_list}.append(i)\n\
         {intermediate_list}.append(int({num_name}/i))\n\
 {intermediate_list} = sorted(set({intermediate_list}))\n".format(num_name=num_name, intermediate_list=new_list_name)
-                        else: # [OP_LIST_LEN]
-                            temp_list, temp_lname = self.list_stack.pop()
-                            intermediate_eq = operator_info[0]+'('+str(temp_list)+')'
-                            intermediate = eval(intermediate_eq)
-                            new_var_name = self.operand_names.pop(0)
-                            self.code_string += '{} = {}({})\n'.format(new_var_name, operator_info[0], temp_lname)
-                            self.operand_stack.push(intermediate, new_var_name)
-                            self.list_stack.push(temp_list, temp_lname)
-                    elif operator_info[1]==2:
-                        if operator_name in ['[OP_LIST_MAX]', '[OP_LIST_MIN]', '[OP_LIST_GET]', '[OP_LIST_INDEX]', '[OP_LIST_MORE]', '[OP_LIST_LESS]', '[OP_LIST_MORE_EQUAL]', '[OP_LIST_LESS_EQUAL]', \
-                                             '[OP_LIST_GET_PERM]', '[OP_LIST_GET_PRODUCT]']:# input: list, scalar / output: scalar, list
-                            temp_list, temp_lname = self.list_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            try:
-                                a = self.to_float(a)
-                                a = self.intifint(a)
-                            except:
-                                pass
-                            if operator_name == '[OP_LIST_GET]': # input: list, scalar / output: scalar
-                                # print('[OP_LIST_GET]', temp_list)
-                                intermediate = temp_list[a-1]
-                                new_var_name = self.operand_names.pop(0)
-                                self.code_string += '{} = {}[{}-1]\n'.format(new_var_name, temp_lname, a_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.operand_stack.push(intermediate, new_var_name)
-                            elif operator_name == '[OP_LIST_INDEX]': # input: list, scalar / output: scalar
-                                if isinstance(a, int):
-                                    try:
-                                        try:
-                                            intermediate = temp_list.index(str(a))+1
-                                        except:
-                                            intermediate = temp_list.index(str(float(a)))+1
-                                    except:
-                                        try:
-                                            intermediate = temp_list.index(int(a))+1
-                                        except:
-                                            intermediate = temp_list.index(float(a))+1
-                                
-                                elif isinstance(a, float):
-                                    try:
-                                        intermediate = temp_list.index(str(a))+1
-                                    except:
-                                        intermediate = temp_list.index(float(a))+1
-                                
-                                else:
-                                    intermediate = temp_list.index(str(a))+1
-
-                                new_var_name = self.operand_names.pop(0)
-                                self.code_string += '{} = {}.index({})+1\n'.format(new_var_name, temp_lname, a_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.operand_stack.push(intermediate, new_var_name)
-                            elif operator_name in ['[OP_LIST_MORE]', '[OP_LIST_LESS]', '[OP_LIST_MORE_EQUAL]', '[OP_LIST_LESS_EQUAL]']:
-                                new_list_name = self.list_names.pop(0)
-                                if operator_name == '[OP_LIST_MORE]':
-                                    intermediate_list = [i for i in temp_list if self.intifint(self.to_float(i)) > a]
-                                    self.code_string += '{new_list} = []\n\
-for i in {temp}:\n\
-    if i > {a}:\n\
-        {new_list}.append(i)\n'.format(new_list=new_list_name, temp=temp_lname, a=a_name)
-                                elif operator_name == '[OP_LIST_LESS]':
-                                    intermediate_list = [i for i in temp_list if self.intifint(self.to_float(i)) < a]
-                                    # self.code_string += '{} = [i for i in {} if i < {}]\n'.format(new_list_name, temp_lname, a_name)
-                                    self.code_string += '{new_list} = []\n\
-for i in {temp}:\n\
-    if i < {a}:\n\
-        {new_list}.append(i)\n'.format(new_list=new_list_name, temp=temp_lname, a=a_name)
-                                elif operator_name == '[OP_LIST_MORE_EQUAL]':
-                                    intermediate_list = [i for i in temp_list if self.intifint(self.to_float(i)) >= a]
-                                    # self.code_string += '{} = [i for i in {} if i >= {}]\n'.format(new_list_name, temp_lname, a_name)
-                                    self.code_string += '{new_list} = []\n\
-for i in {temp}:\n\
-    if i >= {a}:\n\
-        {new_list}.append(i)\n'.format(new_list=new_list_name, temp=temp_lname, a=a_name)
-                                elif operator_name == '[OP_LIST_LESS_EQUAL]':
-                                    intermediate_list = [i for i in temp_list if self.intifint(self.to_float(i)) <= a]
-                                    # self.code_string += '{} = [i for i in {} if i <= {}]\n'.format(new_list_name, temp_lname, a_name)
-                                    self.code_string += '{new_list} = []\n\
+
+    def _op_list_len(self, operator, deadline):
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_var_name = next(self.operand_names)
+        if isinstance(temp_list, lazy.LazyList):
+            intermediate = len(temp_list)
+        else:
+            intermediate_eq = operator.symbol+'('+str(temp_list)+')'
+            intermediate = eval(intermediate_eq)
+        if self.stream_code(temp_list, temp_lname) != temp_lname:
+            self.code_string += '{} = sum(1 for i in {})\n'.format(new_var_name, self.stream_code(temp_list, temp_lname))
+        else:
+            self.code_string += '{} = {}({})\n'.format(new_var_name, operator.symbol, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+        self.list_stack.push(temp_list, temp_lname)
+
+    def _op_list_get(self, operator, deadline):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=False)
+        # print('[OP_LIST_GET]', temp_list)
+        intermediate = temp_list[a-1]
+        new_var_name = next(self.operand_names)
+        self.code_string += '{} = {}[{}-1]\n'.format(new_var_name, temp_lname, a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+
+    def _op_list_index(self, operator, deadline):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=False)
+        if isinstance(a, int):
+            try:
+                try:
+                    intermediate = temp_list.index(str(a))+1
+                except:
+                    intermediate = temp_list.index(str(float(a)))+1
+            except:
+                try:
+                    intermediate = temp_list.index(int(a))+1
+                except:
+                    intermediate = temp_list.index(float(a))+1
+
+        elif isinstance(a, float):
+            try:
+                intermediate = temp_list.index(str(a))+1
+            except:
+                intermediate = temp_list.index(float(a))+1
+
+        elif isinstance(a, Fraction): # exact mode
+            intermediate = temp_list.index(a)+1
+
+        else:
+            intermediate = temp_list.index(str(a))+1
+
+        new_var_name = next(self.operand_names)
+        self.code_string += '{} = {}.index({})+1\n'.format(new_var_name, temp_lname, a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+
+    def _op_list_compare(self, operator, deadline):
+        # [OP_LIST_MORE], [OP_LIST_LESS], [OP_LIST_MORE_EQUAL], [OP_LIST_LESS_EQUAL]: the elements for which
+        # operator.evaluate(element, a) holds, i.e. element > a etc.
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=True)
+        new_list_name = next(self.list_names)
+        intermediate_list = [i for i in deadline.iterate(temp_list)
+                             if operator.evaluate(self.intifint(self.to_float(i)), a)]
+        self.code_string += '{new_list} = []\n\
 for i in {temp}:\n\
-    if i <= {a}:\n\
-        {new_list}.append(i)\n'.format(new_list=new_list_name, temp=temp_lname, a=a_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.list_stack.push(intermediate_list, new_list_name)
-                            elif operator_name == '[OP_LIST_MAX]':
-                                zizigo = temp_list.copy()
-                                # for i in range(len(zizigo)):
-                                #     zizigo[i] = float(zizigo[i])
-                                zizigo.sort()
-                                intermediate = zizigo[-a]
-                                new_var_name = self.operand_names.pop(0)
-                                new_list_name = self.list_names.pop(0)
-                                self.code_string += '{new_list}={temp_list}.copy()\n{new_list}.sort()\n{intermediate} = {new_list}[-{a}]\n'.format(new_list=new_list_name,temp_list=temp_lname,intermediate=new_var_name,a=a_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.operand_stack.push(intermediate, new_var_name)
-                            elif operator_name == '[OP_LIST_MIN]':
-                                zizigo = temp_list.copy()
-                                # for i in range(len(zizigo)):
-                                #     zizigo[i] = float(zizigo[i])
-                                zizigo.sort()
-                                intermediate = temp_list[a-1]
-                                new_var_name = self.operand_names.pop(0)
-                                new_list_name = self.list_names.pop(0)
-                                self.code_string += '{new_list}={temp_list}.copy()\n{new_list}.sort()\n{intermediate} = {new_list}[{a}-1]\n'.format(new_list=new_list_name,temp_list=temp_lname,intermediate=new_var_name,a=a_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.operand_stack.push(intermediate, new_var_name)
-                            elif operator_name == '[OP_LIST_GET_PERM]':
-                                intermediate_list = [str(i) for i in temp_list]
-                                if len(intermediate_list) > 10 or int(a) > 10:
-                                    print("Memory issue")
-                                    return -1, self.code_string
-                                new_list_name = self.list_names.pop(0)
-                                intermediate_list = list(itertools.permutations(intermediate_list, a))
-                                intermediate_list = [''.join(num_list) for num_list in intermediate_list]
-                                intermediate_list = [str_num for str_num in intermediate_list if str_num[0] != '0']
-                                self.code_string += "{intermediate_list} = [str(i) for i in {temp_list}]\n\
+    if i {symbol} {a}:\n\
+        {new_list}.append(i)\n'.format(new_list=new_list_name, temp=self.stream_code(temp_list, temp_lname), symbol=operator.symbol, a=a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_max(self, operator, deadline):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=True)
+        if isinstance(temp_list, lazy.LazyList) and a != 1:
+            self.emit_list(temp_list, temp_lname) # the generated code sorts a copy
+        if isinstance(temp_list, lazy.LazyList):
+            intermediate = temp_list.sorted_item(-a)
+        else:
+            zizigo = temp_list.copy()
+            # for i in range(len(zizigo)):
+            #     zizigo[i] = float(zizigo[i])
+            zizigo.sort()
+            intermediate = zizigo[-a]
+        new_var_name = next(self.operand_names)
+        new_list_name = next(self.list_names)
+        if self.stream_code(temp_list, temp_lname) != temp_lname:
+            self.code_string += '{} = max({})\n'.format(new_var_name, self.stream_code(temp_list, temp_lname))
+        else:
+            self.code_string += '{new_list}={temp_list}.copy()\n{new_list}.sort()\n{intermediate} = {new_list}[-{a}]\n'.format(new_list=new_list_name,temp_list=temp_lname,intermediate=new_var_name,a=a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+
+    def _op_list_min(self, operator, deadline):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=True)
+        if isinstance(temp_list, lazy.LazyList) and a != 1:
+            self.emit_list(temp_list, temp_lname) # the generated code sorts a copy
+        if isinstance(temp_list, lazy.LazyList):
+            intermediate = temp_list.sorted_item(a-1)
+        else:
+            zizigo = temp_list.copy()
+            # for i in range(len(zizigo)):
+            #     zizigo[i] = float(zizigo[i])
+            zizigo.sort()
+            intermediate = zizigo[a-1]
+        new_var_name = next(self.operand_names)
+        new_list_name = next(self.list_names)
+        if self.stream_code(temp_list, temp_lname) != temp_lname:
+            self.code_string += '{} = min({})\n'.format(new_var_name, self.stream_code(temp_list, temp_lname))
+        else:
+            self.code_string += '{new_list}={temp_list}.copy()\n{new_list}.sort()\n{intermediate} = {new_list}[{a}-1]\n'.format(new_list=new_list_name,temp_list=temp_lname,intermediate=new_var_name,a=a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+
+    def _op_list_get_perm(self, operator, deadline, text=str):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=False)
+        intermediate_list = [text(i) for i in temp_list]
+        if len(intermediate_list) > 10 or int(a) > 10:
+            print("Memory issue")
+            return -1
+        new_list_name = next(self.list_names)
+        arrangements = lazy.Arrangements.from_cards(intermediate_list, a)
+        if arrangements is not None: # digit cards: numbers generated on demand
+            if len(arrangements) == 0:
+                raise IndexError('list index out of range')
+            self.code_string += "{} = list(map({}, {}))\n".format(new_list_name, text.__name__, temp_lname)
+            arrangements.code = "float(''.join(p)) for p in itertools.permutations({}, {}) if p[0][0] != '0'"\
+                                        .format(new_list_name, a_name)
+            intermediate_list = arrangements
+        else:
+            intermediate_list = list(deadline.iterate(itertools.permutations(intermediate_list, a)))
+            intermediate_list = [''.join(num_list) for num_list in deadline.iterate(intermediate_list)]
+            intermediate_list = [str_num for str_num in intermediate_list if str_num[0] != '0']
+            self.code_string += "{intermediate_list} = list(map({text}, {temp_list}))\n\
 {intermediate_list} = list(itertools.permutations({intermediate_list}, {a}))\n\
 {intermediate_list} = [''.join(num_list) for num_list in {intermediate_list}]\n\
-{intermediate_list} = [str_num for str_num in {intermediate_list} if str_num[0] != '0']\n".format(intermediate_list=new_list_name, temp_list=temp_lname, a=a_name)
-                                if self.is_number(intermediate_list[0]):
-                                    intermediate_list = [self.to_float(i) for i in intermediate_list]
-                                    self.code_string += "{intermediate_list} = [float(i) for i in {intermediate_list}]\n".format(intermediate_list = new_list_name)
-                                
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.list_stack.push(intermediate_list, new_list_name)
-                            elif operator_name == '[OP_LIST_GET_PRODUCT]':
-                                intermediate_list = [str(i) for i in temp_list]
-                                if len(intermediate_list) > 10 or int(a) > 6:
-                                    print("Memory issue")
-                                    return -1, self.code_string
-                                intermediate_list = list(itertools.product(intermediate_list, repeat=a))
-                                intermediate_list = [''.join(num_list) for num_list in intermediate_list]
-                                intermediate_list = [str_num for str_num in intermediate_list if str_num[0] != '0']
-                                new_list_name = self.list_names.pop(0)
-                                self.code_string += "{intermediate_list} = [str(i) for i in {temp_list}]\n\
+{intermediate_list} = [str_num for str_num in {intermediate_list} if str_num[0] != '0']\n".format(intermediate_list=new_list_name, temp_list=temp_lname, a=a_name, text=text.__name__)
+            if self.is_number(intermediate_list[0]):
+                intermediate_list = [self.to_float(i) for i in intermediate_list]
+                self.code_string += "{intermediate_list} = [float(i) for i in {intermediate_list}]\n".format(intermediate_list = new_list_name)
+
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_get_product(self, operator, deadline, text=str):
+        temp_list, temp_lname, a, a_name = self._pop_list_and_scalar(stream=False)
+        intermediate_list = [text(i) for i in temp_list]
+        if len(intermediate_list) > 10 or int(a) > 6:
+            print("Memory issue")
+            return -1
+        arrangements = lazy.Arrangements.from_cards(intermediate_list, a, repeat=True)
+        if arrangements is not None: # digit cards: numbers generated on demand
+            if len(arrangements) == 0:
+                raise IndexError('list index out of range')
+            new_list_name = next(self.list_names)
+            self.code_string += "{} = list(map({}, {}))\n".format(new_list_name, text.__name__, temp_lname)
+            arrangements.code = "float(''.join(p)) for p in itertools.product({}, repeat={}) if p[0][0] != '0'"\
+                                        .format(new_list_name, a_name)
+            intermediate_list = arrangements
+        else:
+            intermediate_list = list(deadline.iterate(itertools.product(intermediate_list, repeat=a)))
+            intermediate_list = [''.join(num_list) for num_list in deadline.iterate(intermediate_list)]
+            intermediate_list = [str_num for str_num in intermediate_list if str_num[0] != '0']
+            new_list_name = next(self.list_names)
+            self.code_string += "{intermediate_list} = list(map({text}, {temp_list}))\n\
 {intermediate_list} = list(itertools.product({intermediate_list}, repeat={a}))\n\
 {intermediate_list} = [''.join(num_list) for num_list in {intermediate_list}]\n\
-{intermediate_list} = [str_num for str_num in {intermediate_list} if str_num[0] != '0']\n".format(intermediate_list=new_list_name, temp_list=temp_lname, a=a_name)
-                                if self.is_number(intermediate_list[0]):
-                                  intermediate_list = [self.to_float(i) for i in intermediate_list]
-                                  self.code_string += "{intermediate_list} = [float(i) for i in {intermediate_list}]\n".format(intermediate_list = new_list_name)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.list_stack.push(intermediate_list, new_list_name)
-                                
-                            else:
-                                pass
-                            
-                        elif operator_name in ['[OP_SET_UNION]', '[OP_SET_INTERSECT]', '[OP_SET_DIFFERENCE]', '[OP_LIST_COND_MAX_MIN]']:# input: list, list / output: list
-                            b_list, b_lname = self.list_stack.pop()
-                            a_list, a_lname = self.list_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            if operator_name == '[OP_SET_UNION]':
-                                intermediate_list = list(set(a_list) | set(b_list))
-                                self.code_string += '{} = list(set({}) | set({}))\n'.format(new_list_name, a_lname, b_lname)
-                            elif operator_name == '[OP_SET_INTERSECT]':
-                                intermediate_list = list(set(a_list) & set(b_list))
-                                self.code_string += '{} = list(set({}) & set({}))\n'.format(new_list_name, a_lname, b_lname)
-                            elif operator_name == '[OP_SET_DIFFERENCE]':
-                                intermediate_list = list(set(a_list) - set(b_list))
-                                self.code_string += '{} = list(set({}) - set({}))\n'.format(new_list_name, a_lname, b_lname)
-                            elif operator_name == '[OP_LIST_COND_MAX_MIN]':
-                                # a_list: List of items
-                                # b_list: List of conditions -> multiple of 3
-                                items_name_list = a_list.copy()
-
-                                # Process conditions
-                                # conditions: list[str], List of string conditions which is evaluated using `eval()` later
-                                # If an operand is a string, it must be wrapped with { }
-                                # ex) ["{A} < {B}", "{B} == 3", "{C} > {A}"]
-                                conditions = []
-                                condition_list = b_list.copy()
-                                temp_stack = []  # Temporary stack for processing postfix conditions
-                                for index_, cond_ in enumerate(map(str, condition_list)):
-                                    try:
-                                        if cond_ in ("<", ">", "="):
-                                            # Operator
-                                            operand_right = temp_stack.pop()
-                                            operand_left = temp_stack.pop()
-
-                                            if cond_ == "=":
-                                                # Convert a single equal sign to double equal sign
-                                                cond_ = "=="
-
-                                            conditions.append(f"{operand_left} {cond_} {operand_right}")
-
-                                        else:
-                                            # Operand
-                                            if not cond_.isdigit():
-                                                # Wrap string operands with braces
-                                                cond_ = "{" + cond_ + "}"
-
-                                            temp_stack.append(cond_)
-
-                                    except IndexError as e:
-                                        # Expected an item from temp_stack, but temp_stack is empty
-                                        raise AssertionError(f"error while processing {cond_} at {index_}:"
-                                                             f"expected an operand from stack") from e
-
-                                # temp_stack should be empty
-                                assert len(temp_stack) == 0, f"temp_stack({temp_stack}) is not empty" \
-                                                             f"after processing all condition inputs"
-
-                                # Calculate combinations
-                                condition_found = False
-                                item_name_index_dict = {}
-                                for perm in itertools.permutations(range(1, len(items_name_list) + 1)):
-                                    item_name_index_dict = dict(
-                                            zip(items_name_list, perm))  # ex) {"A": 2, "B": 1, "C": 3}
-
-                                    # Format strings from `conditions`
-                                    # ex) "{A} < {B}" -> "3 < 2"
-                                    formatted_conditions = [condition.format_map(item_name_index_dict) for condition in
-                                                            conditions]
-                                    if all(map(eval, formatted_conditions)):
-                                        # All conditions met
-                                        condition_found = True
-                                        break
-
-                                assert condition_found, f"no combination found"
-
-                                # Sort result
-                                intermediate_list = list(item_name_index_dict.keys())
-                                intermediate_list.sort(key=item_name_index_dict.get, reverse=True)
-
-                                del item_name_index_dict
-
-                                self.code_string += \
-                                    f"global item_name_index_dict\n" \
-                                    f"items_name_list = {a_lname}.copy()\n" \
-                                    "conditions = []\n" \
-                                    f"condition_list = {b_lname}.copy()\n" \
-                                    "temp_stack = []\n" \
-                                    "for index_, cond_ in enumerate(map(str, condition_list)):\n" \
-                                    "    if cond_ in (\"<\", \">\", \"=\"):\n" \
-                                    "        operand_right = temp_stack.pop()\n" \
-                                    "        operand_left = temp_stack.pop()\n" \
-                                    "        if cond_ == \"=\":\n" \
-                                    "            cond_ = \"==\"\n" \
-                                    "        conditions.append(f\"{operand_left} {cond_} {operand_right}\")\n" \
-                                    "    else:\n" \
-                                    "        if not cond_.isdigit():\n" \
-                                    "            cond_ = \"{\" + cond_ + \"}\"\n" \
-                                    "        temp_stack.append(cond_)\n" \
-                                    "item_name_index_dict = {}\n" \
-                                    "for perm in itertools.permutations(range(1, len(items_name_list) + 1)):\n" \
-                                    "    item_name_index_dict = dict(zip(items_name_list, perm))\n" \
-                                    "    formatted_conditions = \\\n" \
-                                    "        [condition.format_map(item_name_index_dict) for condition in conditions]\n" \
-                                    "    if all(map(eval, formatted_conditions)):\n" \
-                                    "        break\n" \
-                                    f"{new_list_name} = list(item_name_index_dict.keys())\n" \
-                                    f"{new_list_name}.sort(key=item_name_index_dict.get, reverse=True)\n"
-
-                            self.list_stack.push(a_list, a_lname)
-                            self.list_stack.push(b_list, b_lname)
-                            self.list_stack.push(intermediate_list, new_list_name)
-
-                        elif operator_name == '[OP_LIST_DIVISIBLE]': # Return a new list which contains the numbers that are divisible by a in temp_list
-                            a, a_name = self.operand_stack.pop()
-                            temp_list, temp_lname = self.list_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            intermediate_list = []
-                            a = int(a)
-                            for i in temp_list:
-                                i =int(i)
-                                if i % a == 0:
-                                    intermediate_list.append(i)
-                            self.code_string += "{intermediate_list} = []\n\
+{intermediate_list} = [str_num for str_num in {intermediate_list} if str_num[0] != '0']\n".format(intermediate_list=new_list_name, temp_list=temp_lname, a=a_name, text=text.__name__)
+            if self.is_number(intermediate_list[0]):
+              intermediate_list = [self.to_float(i) for i in intermediate_list]
+              self.code_string += "{intermediate_list} = [float(i) for i in {intermediate_list}]\n".format(intermediate_list = new_list_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_cond_max_min(self, operator, deadline):
+        b_list, b_lname = self.list_stack.pop()
+        a_list, a_lname = self.list_stack.pop()
+        new_list_name = next(self.list_names)
+        # a_list: List of items
+        # b_list: List of conditions in postfix -> multiple of 3, ex) ['A', 'B', '<', 'B', '3', '=']
+        intermediate_list = ordering.order_by_conditions(a_list, b_list)
+        if 'def order_by_conditions(' not in self.code_string:
+            self.code_string += ORDERING_CODE
+        self.code_string += '{} = order_by_conditions({}, {})\n'.format(new_list_name, a_lname, b_lname)
+        self.list_stack.push(a_list, a_lname)
+        self.list_stack.push(b_list, b_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_divisible(self, operator, deadline):
+        a, a_name = self.operand_stack.pop()
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_list_name = next(self.list_names)
+        intermediate_list = []
+        a = int(a)
+        for i in deadline.iterate(temp_list):
+            i =int(i)
+            if i % a == 0:
+                intermediate_list.append(i)
+        self.code_string += "{intermediate_list} = []\n\
 {a} = int({a})\n\
 for i in {temp_list}:\n\
     i = int(i)\n\
     if i % {a} == 0:\n\
-        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, temp_list=temp_lname)
-                            self.list_stack.push(temp_list, temp_lname)
-                            self.list_stack.push(intermediate_list, new_list_name)
-
-                        elif operator_name == '[OP_LIST_FIND_NUM]':
-                            a, a_name = self.operand_stack.pop()
-                            temp_list, temp_lname = self.list_stack.pop()
-                            new_var_name = self.operand_names.pop(0)
-                            intermediate = 0
-                            a = int(a)
-                            for i in temp_list:
-                                i = int(i)
-                                if i == a:
-                                    intermediate = intermediate + 1
-                            self.code_string += '{intermediate} = 0\n\
+        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, temp_list=self.stream_code(temp_list, temp_lname))
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_find_num(self, operator, deadline):
+        a, a_name = self.operand_stack.pop()
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_var_name = next(self.operand_names)
+        intermediate = 0
+        a = int(a)
+        for i in deadline.iterate(temp_list):
+            i = int(i)
+            if i == a:
+                intermediate = intermediate + 1
+        self.code_string += '{intermediate} = 0\n\
 {a} = int({a})\n\
 for i in {temp_list}:\n\
     i = int(i)\n\
     if i == {a}:\n\
-        {intermediate} = {intermediate} + 1\n'.format(intermediate=new_var_name, temp_list=temp_lname, a=a_name)
-                            self.list_stack.push(temp_list, temp_lname)
-                            self.operand_stack.push(intermediate, new_var_name)
-                        elif operator_name in ['[OP_LIST_ODD]', '[OP_LIST_EVEN]']:
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            b = self.intifint(b)
-                            a = self.intifint(a)
-                            intermediate_list = []
-                            self.code_string += "{intermediate_list} = []\n".format(intermediate_list=new_list_name)
-                            if operator_name == '[OP_LIST_ODD]':
-                                if a%2==0:
-                                    for i in range(a+1, b+1, 2):
-                                        intermediate_list.append(i)
-                                else:
-                                    for i in range(a, b+1, 2):
-                                        intermediate_list.append(i)
-                                self.code_string += "if {a}%2==0:\n".format(a=a_name)
-                            elif operator_name == '[OP_LIST_EVEN]':
-                                if a%2!=0:
-                                    for i in range(a+1, b+1, 2):
-                                        intermediate_list.append(i)
-                                else:
-                                    for i in range(a, b+1, 2):
-                                        intermediate_list.append(i)
-                                self.code_string += "if {a}%2!=0:\n".format(a=a_name)
-
-                            self.code_string += "    for i in range({a}+1, {b}+1, 2):\n\
+        {intermediate} = {intermediate} + 1\n'.format(intermediate=new_var_name, temp_list=self.stream_code(temp_list, temp_lname), a=a_name)
+        self.list_stack.push(temp_list, temp_lname)
+        self.operand_stack.push(intermediate, new_var_name)
+
+    def _op_list_odd(self, operator, deadline):
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        new_list_name = next(self.list_names)
+        b = self.intifint(b)
+        a = self.intifint(a)
+        intermediate_list = []
+        self.code_string += "{intermediate_list} = []\n".format(intermediate_list=new_list_name)
+        if a%2==0:
+            for i in deadline.iterate(range(a+1, b+1, 2)):
+                intermediate_list.append(i)
+        else:
+            for i in deadline.iterate(range(a, b+1, 2)):
+                intermediate_list.append(i)
+        self.code_string += "if {a}%2==0:\n".format(a=a_name)
+
+        self.code_string += "    for i in range({a}+1, {b}+1, 2):\n\
+        {intermediate_list}.append(i)\n\
+else:\n\
+    for i in range({a}, {b}+1, 2):\n\
+        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name)
+
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_even(self, operator, deadline):
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        new_list_name = next(self.list_names)
+        b = self.intifint(b)
+        a = self.intifint(a)
+        intermediate_list = []
+        self.code_string += "{intermediate_list} = []\n".format(intermediate_list=new_list_name)
+        if a%2!=0:
+            for i in deadline.iterate(range(a+1, b+1, 2)):
+                intermediate_list.append(i)
+        else:
+            for i in deadline.iterate(range(a, b+1, 2)):
+                intermediate_list.append(i)
+        self.code_string += "if {a}%2!=0:\n".format(a=a_name)
+
+        self.code_string += "    for i in range({a}+1, {b}+1, 2):\n\
         {intermediate_list}.append(i)\n\
 else:\n\
     for i in range({a}, {b}+1, 2):\n\
         {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name)
 
-                            self.list_stack.push(intermediate_list, new_list_name)
-
-                    elif operator_info[1]==3:
-                        if operator_name == '[OP_LIST_ARANGE]':
-                            c, c_name = self.operand_stack.pop()
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            c = self.intifint(c)
-                            b = self.intifint(b)
-                            a = self.intifint(a)
-                            list_name = self.list_names.pop(0)
-                            intermediate_list = [i for i in range(a, b + 1, c)]
-                            self.code_string += '{} = [i for i in range({}, {} + 1, {})]\n'.format(list_name, a_name, b_name, c_name)
-                            self.list_stack.push(intermediate_list, list_name)
-                        elif operator_name == '[OP_LIST_FIND_UNK]':
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            temp_list, temp_lname = self.list_stack.pop()
-                            a = str(a)
-                            b = str(b)
-                            unk_idx = a.index(b)
-                            intermediate = []
-                            for elem in temp_list:
-                                elem = str(elem)
-                                intermediate.append(int(elem[unk_idx]))
-                            intermediate = list(set(intermediate))
-                            if len(intermediate) == 1:
-                                intermediate = intermediate[0]
-
-                            if isinstance(intermediate, list):
-                                new_list_name = self.list_names.pop(0)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.list_stack.push(intermediate, new_list_name)
-                                self.code_string += '{a} = str({a})\n\
-{b} = str({b})\n\
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_arange(self, operator, deadline):
+        c, c_name = self.operand_stack.pop()
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        c = self.intifint(c)
+        b = self.intifint(b)
+        a = self.intifint(a)
+        list_name = next(self.list_names)
+        intermediate_list = list(deadline.iterate(range(a, b + 1, c)))
+        self.code_string += '{} = [i for i in range({}, {} + 1, {})]\n'.format(list_name, a_name, b_name, c_name)
+        self.list_stack.push(intermediate_list, list_name)
+
+    def _op_list_find_unk(self, operator, deadline, text=str):
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        temp_list, temp_lname = self.list_stack.pop()
+        a = text(a)
+        b = text(b)
+        unk_idx = a.index(b)
+        intermediate = []
+        for elem in temp_list:
+            elem = text(elem)
+            intermediate.append(int(elem[unk_idx]))
+        intermediate = list(set(intermediate))
+        if len(intermediate) == 1:
+            intermediate = intermediate[0]
+
+        if isinstance(intermediate, list):
+            new_list_name = next(self.list_names)
+            self.list_stack.push(temp_list, temp_lname)
+            self.list_stack.push(intermediate, new_list_name)
+            self.code_string += '{a} = {text}({a})\n\
+{b} = {text}({b})\n\
 unk_idx = {a}.index({b})\n\
 {intermediate_list} = []\n\
 for elem in {temp_list}:\n\
-    elem = str(elem)\n\
+    elem = {text}(elem)\n\
     {intermediate_list}.append(int(elem[unk_idx]))\n\
-{intermediate_list} = list(set({intermediate_list}))\n'.format(a=a_name, b=b_name, intermediate_list=new_list_name, temp_list=temp_lname)
-                            else:
-                                new_var_name = self.operand_names.pop(0)
-                                self.list_stack.push(temp_list, temp_lname)
-                                self.operand_stack.push(intermediate, new_var_name)
-                                self.code_string += '{a} = str({a})\n\
-{b} = str({b})\n\
+{intermediate_list} = list(set({intermediate_list}))\n'.format(a=a_name, b=b_name, intermediate_list=new_list_name, temp_list=temp_lname,
+                                                            text=text.__name__)
+        else:
+            new_var_name = next(self.operand_names)
+            self.list_stack.push(temp_list, temp_lname)
+            self.operand_stack.push(intermediate, new_var_name)
+            self.code_string += '{a} = {text}({a})\n\
+{b} = {text}({b})\n\
 unk_idx = {a}.index({b})\n\
 {intermediate} = 0\n\
 for elem in {temp_list}:\n\
-    elem = str(elem)\n\
-    {intermediate} = int(elem[unk_idx])\n'.format(a=a_name, b=b_name, intermediate=new_var_name, temp_list=temp_lname)
-                        elif operator_name == '[OP_LIST_DIVIDE_AND_REMAIN]':
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            b = self.intifint(b)
-                            a = self.intifint(a)
-                            temp_list, temp_lname = self.list_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            intermediate_list = []
-                            a = int(a)
-                            b = int(b)
-                            if b < 0:
-                                b = b + a
-                            for i in temp_list:
-                                i = int(i)
-                                if i%a == b:
-                                    intermediate_list.append(i)
-                            #print('intermediate_list', intermediate_list)
-                            self.code_string += "{intermediate_list} = [] \n\
+    elem = {text}(elem)\n\
+    {intermediate} = int(elem[unk_idx])\n'.format(a=a_name, b=b_name, intermediate=new_var_name, temp_list=temp_lname,
+                                                  text=text.__name__)
+
+    def _op_list_divide_and_remain(self, operator, deadline):
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        b = self.intifint(b)
+        a = self.intifint(a)
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_list_name = next(self.list_names)
+        intermediate_list = []
+        a = int(a)
+        b = int(b)
+        if b < 0:
+            b = b + a
+        for i in deadline.iterate(temp_list):
+            i = int(i)
+            if i%a == b:
+                intermediate_list.append(i)
+        #print('intermediate_list', intermediate_list)
+        self.code_string += "{intermediate_list} = [] \n\
 {a} = int({a})\n\
 {b} = int({b})\n\
 if {b} < 0:\n\
@@ -1142,258 +1542,250 @@ if {b} < 0:\n\
 for i in {temp_list}:\n\
     i = int(i)\n\
     if i%{a} == {b}:\n\
-        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name, temp_list=temp_lname)
-                            self.list_stack.push(temp_list, temp_lname)
-                            self.list_stack.push(intermediate_list, new_list_name)
-                        elif operator_name == '[OP_LIST_SEARCH_FIXED_DIGIT]':
-                            b, b_name = self.operand_stack.pop()
-                            a, a_name = self.operand_stack.pop()
-                            b = self.intifint(b)
-                            a = self.intifint(a)
-                            temp_list, temp_lname = self.list_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-                            intermediate_list = []
-                            a = int(a)
-                            b = int(b)
-                            for i in temp_list:
-                                i = int(i)
-                                if (i // a) % 10 == b:
-                                    intermediate_list.append(i)
-                            self.code_string += "{intermediate_list} = [] \n\
+        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name, temp_list=self.stream_code(temp_list, temp_lname))
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_search_fixed_digit(self, operator, deadline):
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        b = self.intifint(b)
+        a = self.intifint(a)
+        temp_list, temp_lname = self.list_stack.pop(stream=True)
+        new_list_name = next(self.list_names)
+        intermediate_list = []
+        a = int(a)
+        b = int(b)
+        for i in deadline.iterate(temp_list):
+            i = int(i)
+            if (i // a) % 10 == b:
+                intermediate_list.append(i)
+        self.code_string += "{intermediate_list} = [] \n\
 {a} = int({a})\n\
 {b} = int({b})\n\
 for i in {temp_list}:\n\
     i = int(i)\n\
     if (i//{a})%10 == {b}:\n\
-        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name, temp_list=temp_lname)
-                            self.list_stack.push(temp_list, temp_lname)
-                            self.list_stack.push(intermediate_list, new_list_name)
-                        elif operator_name == '[OP_LIST_COND_BIG_SMALL]':
-                            target_list, target_name = self.list_stack.pop()
-                            condition_list, condition_name = self.list_stack.pop()
-                            entity_list, entity_name = self.list_stack.pop()
-                            new_list_name = self.list_names.pop(0)
-
-                            from queue import Queue
-
-                            input_dict = {i: cnt for cnt, i in enumerate(entity_list)}
-
-                            adj_mat = [[0 for _ in range(len(entity_list))] for _ in range(len(entity_list))]
-                            is_visited = [[0 for _ in range(len(entity_list))] for _ in range(len(entity_list))]
-
-                            que = Queue()
-
-                            iterate_num = len(condition_list)//3
-
-                            for i in range(iterate_num):
-                                operand_1 = condition_list[i*3]
-                                operand_2 = condition_list[i*3 + 1]
-
-                                operand_1_id = input_dict[operand_1]
-                                operand_2_id = input_dict[operand_2]
-                                
-                                operator = condition_list[i*3+2]
-
-                                if operator == '>':
-                                    adj_mat[operand_1_id][operand_2_id] = 1
-                                    is_visited[operand_1_id][operand_2_id] = 1
-                                    que.put((operand_1_id, operand_2_id))
-
-                                    adj_mat[operand_2_id][operand_1_id] = -1
-                                    is_visited[operand_2_id][operand_1_id] = 1
-                                    que.put((operand_2_id, operand_1_id))
-                                    
-                                elif operator == '<':
-                                    adj_mat[operand_1_id, operand_2_id] = -1
-                                    is_visited[operand_1_id][operand_2_id] = 1
-                                    que.put((operand_1_id, operand_2_id))
-
-                                    adj_mat[operand_2_id, operand_1_id] = 1
-                                    is_visited[operand_2_id][operand_1_id] = 1
-                                    que.put((operand_2_id, operand_1_id))
-
-                            while not que.empty():
-                                operand_1, operand_2 = que.get()
-
-                                if adj_mat[operand_1][operand_2] == 1:
-                                    for i in range(0, len(entity_list)):
-                                        if (adj_mat[operand_1][i] == -1) and (not is_visited[operand_2][i]):
-                                            adj_mat[operand_2][i] = -1
-                                            adj_mat[i][operand_2] = 1
-                                            is_visited[operand_2][i] = 1
-                                            is_visited[i][operand_2] = 1
-                                            que.put((operand_2, i))
-                                            que.put((i, operand_2))
-                                    
-                                    for i in range(0, len(entity_list)):
-                                        if (adj_mat[operand_2][i] == 1) and (not is_visited[operand_1][i]):
-                                            adj_mat[operand_1][i] = 1
-                                            adj_mat[i][operand_1] = -1
-                                            is_visited[operand_1][i] = 1
-                                            is_visited[i][operand_1] = 1
-                                            que.put((operand_1, i))
-                                            que.put((i, operand_1))
-
-                                if adj_mat[operand_1][operand_2] == -1:
-                                    for i in range(0, len(entity_list)):
-                                        if (adj_mat[operand_1][i] == 1) and (not is_visited[i][operand_2]):
-                                            adj_mat[i][operand_2] = -1
-                                            adj_mat[operand_2][i] = 1
-                                            is_visited[i][operand_2] = 1
-                                            is_visited[operand_2][i] = 1
-                                            que.put((i, operand_2))
-                                            que.put((operand_2, i))
-                                    
-                                    for i in range(0, len(entity_list)):
-                                        if (adj_mat[operand_2][i] == -1) and (not is_visited[operand_1][i]):
-                                            adj_mat[operand_1][i] = -1
-                                            adj_mat[i][operand_1] = 1
-                                            is_visited[i][operand_1] = 1
-                                            is_visited[operand_1][i] = 1
-                                            que.put(operand_1, i)
-                                            que.put(i, operand_1)
-
-                            operand_1 = target_list[0]
-                            operand_2 = target_list[1]
-
-                            operand_1_id = input_dict[operand_1]
-                            operand_2_id = input_dict[operand_2]
-
-                            if adj_mat[operand_1_id][operand_2_id] == -1:
-                                intermediate_list = [operand_2, operand_1]
-                            else:
-                                intermediate_list = [operand_1, operand_2]
-
-                            self.list_stack.push(intermediate_list, new_list_name)
-
-                            self.code_string += "from queue import Queue\n\
-input_dict = dict()\n\
-for cnt, i in enumerate({entity_list}):\n\
-    input_dict[i] = cnt\n\
-adj_mat = []\n\
-for _ in range(len({entity_list})):\n\
-    temp_list = []\n\
-    for _ in range(len({entity_list})):\n\
-        temp_list.append(0)\n\
-    adj_mat.append(temp_list)\n\
-is_visited = []\n\
-for _ in range(len({entity_list})):\n\
-    temp_list = []\n\
-    for _ in range(len({entity_list})):\n\
-        temp_list.append(0)\n\
-    is_visited.append(temp_list)\n\
-que = Queue()\n\
-iterate_num = len({condition})//3\n\
-for i in range(iterate_num):\n\
-    operand_1 = {condition}[i*3]\n\
-    operand_2 = {condition}[i*3 + 1]\n\
-    operand_1_id = input_dict[operand_1]\n\
-    operand_2_id = input_dict[operand_2]\n\
-    operator = {condition}[i*3+2]\n\
-    if operator == '>':\n\
-        adj_mat[operand_1_id][operand_2_id] = 1\n\
-        is_visited[operand_1_id][operand_2_id] = 1\n\
-        que.put((operand_1_id, operand_2_id))\n\
-        adj_mat[operand_2_id][operand_1_id] = -1\n\
-        is_visited[operand_2_id][operand_1_id] = 1\n\
-        que.put((operand_2_id, operand_1_id))\n\
-    elif operator == '<':\n\
-        adj_mat[operand_1_id, operand_2_id] = -1\n\
-        is_visited[operand_1_id][operand_2_id] = 1\n\
-        que.put((operand_1_id, operand_2_id))\n\
-        adj_mat[operand_2_id, operand_1_id] = 1\n\
-        is_visited[operand_2_id][operand_1_id] = 1\n\
-        que.put((operand_2_id, operand_1_id))\n\
-while not que.empty():\n\
-    operand_1, operand_2 = que.get()\n\
-    if adj_mat[operand_1][operand_2] == 1:\n\
-        for i in range(0, len({entity_list})):\n\
-            if (adj_mat[operand_1][i] == -1) and (not is_visited[operand_2][i]):\n\
-                adj_mat[operand_2][i] = -1\n\
-                adj_mat[i][operand_2] = 1\n\
-                is_visited[operand_2][i] = 1\n\
-                is_visited[i][operand_2] = 1\n\
-                que.put((operand_2, i))\n\
-                que.put((i, operand_2))\n\
-        for i in range(0, len({entity_list})):\n\
-            if (adj_mat[operand_2][i] == 1) and (not is_visited[operand_1][i]):\n\
-                adj_mat[operand_1][i] = 1\n\
-                adj_mat[i][operand_1] = -1\n\
-                is_visited[operand_1][i] = 1\n\
-                is_visited[i][operand_1] = 1\n\
-                que.put((operand_1, i))\n\
-                que.put((i, operand_1))\n\
-    if adj_mat[operand_1][operand_2] == -1:\n\
-        for i in range(0, len({entity_list})):\n\
-            if (adj_mat[operand_1][i] == 1) and (not is_visited[i][operand_2]):\n\
-                adj_mat[i][operand_2] = -1\n\
-                adj_mat[operand_2][i] = 1\n\
-                is_visited[i][operand_2] = 1\n\
-                is_visited[operand_2][i] = 1\n\
-                que.put((i, operand_2))\n\
-                que.put((operand_2, i))\n\
-        for i in range(0, len({entity_list})):\n\
-            if (adj_mat[operand_2][i] == -1) and (not is_visited[operand_1][i]):\n\
-                adj_mat[operand_1][i] = -1\n\
-                adj_mat[i][operand_1] = 1\n\
-                is_visited[i][operand_1] = 1\n\
-                is_visited[operand_1][i] = 1\n\
-                que.put(operand_1, i)\n\
-                que.put(i, operand_1)\n\
-operand_1 = {target}[0]\n\
-operand_2 = {target}[1]\n\
-operand_1_id = input_dict[operand_1]\n\
-operand_2_id = input_dict[operand_2]\n\
-if adj_mat[operand_1_id][operand_2_id] == -1:\n\
-    {intermediate_list} = [operand_2, operand_1]\n\
-else:\n\
-    {intermediate_list}  = [operand_2, operand_1]\n".format(entity_list=entity_name, target=target_name, condition=condition_name, intermediate_list=new_list_name)
-                    else:
-                        print("not defined")
-                    
-            else: # if operand - scalar value
-                # var_name = self.operand_names.pop(0)
-                # self.operand_stack.push(i, var_name)
-
-                var_name = self.operand_names.pop(0)
-
-                if self.is_number(i):
-                    i = self.to_float(i)
-                    if i == int(i):
-                        i = int(i)
-                    self.code_string += '{} = {}\n'.format(var_name, i)
-                    #if self.is_fraction(i):
-                    #    self.code_string += '{var} = round({var}+1e-10, 2)\n'.format(var=var_name)
-                    #    i = round(self.to_float(i)+1e-10, 2)
-                else:
-                    self.code_string += "{} = '{}'\n".format(var_name, i)
-                
-                self.operand_stack.push(i, var_name)
-
-
-        result, name = self.operand_stack.pop()
-        loc = {}
-        # print(self.code_string)
-        exec(self.code_string, globals(), loc)
-        result = loc[name]
-
-        str(result) # Raise Time out error for error hanlding
-        
-        try:
-            if int(result) != self.to_float(result): # float
-                result = '{:.2f}'.format(round(result+1e-10, 2))
-                if str(result)[-3:] == ".00":
-                    result = int(result[:-3])
-                    self.code_string += "print(int(eval('{:.2f}'.format(round(%s+1e-10,2)))))"%name
-                else:
-                    self.code_string += "print('{:.2f}'.format(round(%s+1e-10,2)))"% name 
-            else: # int
-                result = int(result)
-                self.code_string += 'print(int({}))'.format(name)
-        except: # string
-            name = name.replace('(', '')
-            name = name.replace(')', '')
-            self.code_string += 'print({})'.format(name)
-
-        return result, self.code_string
-
+        {intermediate_list}.append(i)\n".format(intermediate_list=new_list_name, a=a_name, b=b_name, temp_list=self.stream_code(temp_list, temp_lname))
+        self.list_stack.push(temp_list, temp_lname)
+        self.list_stack.push(intermediate_list, new_list_name)
+
+    def _op_list_cond_big_small(self, operator, deadline):
+        target_list, target_name = self.list_stack.pop()
+        condition_list, condition_name = self.list_stack.pop()
+        entity_list, entity_name = self.list_stack.pop()
+        new_list_name = next(self.list_names)
+
+        intermediate_list = ordering.order_pair_by_conditions(entity_list, condition_list, target_list)
+        self.list_stack.push(intermediate_list, new_list_name)
+        if 'def order_pair_by_conditions(' not in self.code_string:
+            self.code_string += ORDER_PAIR_CODE
+        self.code_string += '{} = order_pair_by_conditions({}, {}, {})\n'.format(new_list_name, entity_name,
+                                                                             condition_name, target_name)
+
+    # Exact arithmetic mode: handlers replacing those above for PostfixConverter(arithmetic='exact')
+
+    def _op_exact(self, operator, deadline):
+        # Arithmetic on ints and Fractions. A whole Fraction result (1/2 + 1/2, 6 / 3) becomes an int, in the
+        # generated code too, so it still works as a list index or a count.
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        var_name = next(self.operand_names)
+        intermediate = operator.evaluate(a, b)
+        self.code_string += operator.emit([var_name], [a_name, b_name])
+        if isinstance(intermediate, Fraction) and intermediate.denominator == 1:
+            intermediate = int(intermediate)
+            self.code_string += '{var} = int({var})\n'.format(var=var_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_list_eol_exact(self, operator, deadline):
+        # The elements are numbers already, fractions included, so they go into the list as they are
+        new_list = []
+        names = []
+        while True:
+            element, var_name = self.operand_stack.pop()
+            if isinstance(element, str) and element == 'SOL':
+                break
+            new_list.append(element)
+            names.append(var_name)
+        new_list.reverse()
+        names.reverse()
+        list_name = next(self.list_names)
+        self.code_string += '{} = [{}]\n'.format(list_name, ', '.join(names))
+        self.list_stack.push(new_list, list_name)
+
+    def _op_ceil_exact(self, operator, deadline):
+        # The formula of _op_ceil, computed on the numbers instead of eval() of their text
+        top = self.operand_stack.peek(2)
+        if top is None or not isinstance(top[0], (int, Fraction)):
+            return self._op_ceil(operator, deadline)
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        b = int(b)
+        a, a_name = self.operand_stack.pop()
+        intermediate = int(((a+9*Fraction(10)**(b-2))//(Fraction(10)**(b-1)))*Fraction(10)**(b-1))
+        self.code_string += '{var} = int((({a}+9*Fraction(10)**({b}-2))//(Fraction(10)**({b}-1)))*Fraction(10)**({b}-1))\n'\
+            .format(var=var_name, a=a_name, b=b_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_floor_exact(self, operator, deadline):
+        top = self.operand_stack.peek(2)
+        if top is None or not isinstance(top[0], (int, Fraction)):
+            return self._op_floor(operator, deadline)
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        b = int(b)
+        a, a_name = self.operand_stack.pop()
+        intermediate = int((a//(Fraction(10)**(b-1)))*Fraction(10)**(b-1))
+        self.code_string += '{var} = int(({a}//(Fraction(10)**({b}-1)))*Fraction(10)**({b}-1))\n'\
+            .format(var=var_name, a=a_name, b=b_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_round_exact(self, operator, deadline):
+        # A Fraction is rounded half up exactly, without the +1e-10 of the float mode; other numbers as there
+        top = self.operand_stack.peek(2)
+        if top is None or not isinstance(top[0], Fraction):
+            return self._op_round(operator, deadline)
+        var_name = next(self.operand_names)
+        b, b_name = self.operand_stack.pop()
+        a, a_name = self.operand_stack.pop()
+        intermediate = rational.round_half_up(a, int(b))
+        if 'def round_half_up(' not in self.code_string:
+            self.code_string += ROUND_HALF_UP_CODE
+        self.code_string += '{} = round_half_up({}, {})\n'.format(var_name, a_name, b_name)
+        self.operand_stack.push(intermediate, var_name)
+
+    def _op_decimal_text_exact(self, operator, deadline):
+        # Operators that write numbers as text (digit cards, [OP_LIST2NUM], [OP_LIST_FIND_UNK]) write a Fraction
+        # as the float mode does, 2.5 instead of 5/2, so the digits and the numbers read back are the same
+        if 'def decimal_text(' not in self.code_string:
+            self.code_string += DECIMAL_TEXT_CODE
+        return TEXT_HANDLERS[operator.name](self, operator, deadline, text=rational.decimal_text)
+
+
+# Operator registry: token -> Operator. A converter copies it when it is created.
+OPERATORS = {}
+
+
+def register_operator(operator):
+    # Make an extra operator (or a replacement) available to every converter created afterwards
+    OPERATORS[operator.name] = operator
+    return operator
+
+
+def infix_operator(name, symbol):
+    # + - * / // % ** evaluated on the string forms of the operands, like the generated code sees them
+    return Operator(name, ('scalar', 'scalar'), ('scalar',), symbol,
+                    evaluate=lambda a, b: eval(str(a) + symbol + str(b)),
+                    emit=lambda outputs, inputs: '{} = {} {} {}\n'.format(outputs[0], inputs[0], symbol, inputs[1]))
+
+
+def set_operator(name, symbol, combine):
+    # list(set(a) | set(b)) etc.; combine(set(a), set(b)) computes the same
+    return Operator(name, ('list', 'list'), ('list',), symbol,
+                    evaluate=lambda a, b: list(combine(set(a), set(b))),
+                    emit=lambda outputs, inputs: '{} = list(set({}) {} set({}))\n'.format(outputs[0], inputs[0], symbol,
+                                                                                    inputs[1]))
+
+
+S, L, ANY = 'scalar', 'list', 'any'
+for operator in [
+    infix_operator('[OP_ADD]', '+'),
+    infix_operator('[OP_SUB]', '-'),
+    infix_operator('[OP_DIV]', '/'),
+    infix_operator('[OP_MUL]', '*'),
+    infix_operator('[OP_FDIV]', '//'),
+    infix_operator('[OP_MOD]', '%'),
+    infix_operator('[OP_POW]', '**'),
+    Operator('[OP_CEIL]', (S, S), (S,), 'int', handler=PostfixConverter._op_ceil),
+    Operator('[OP_FLOOR]', (S, S), (S,), 'int', handler=PostfixConverter._op_floor),
+    Operator('[OP_ROUND]', (S, S), (S,), 'round', handler=PostfixConverter._op_round),
+    Operator('[OP_ABS]', (S,), (S,), 'abs', evaluate=lambda a: eval('abs(' + str(a) + ')'),
+             emit=lambda outputs, inputs: '{} = abs({})\n'.format(outputs[0], inputs[0])),
+    Operator('[OP_COMB]', (S, S), (S,), 'math.comb', handler=PostfixConverter._op_comb),
+    Operator('[OP_PERM]', (S, S), (S,), 'math.perm', handler=PostfixConverter._op_perm),
+    Operator('[OP_GCD]', (S, S), (S,), 'math.gcd', handler=PostfixConverter._op_gcd),
+    Operator('[OP_LCM]', (S, S), (S,), handler=PostfixConverter._op_lcm),
+    Operator('[OP_LIST_SOL]', (), (S,), handler=PostfixConverter._op_list_sol), # pushes the start marker
+    Operator('[OP_LIST_EOL]', (), (L,), handler=PostfixConverter._op_list_eol), # takes the operands back to the marker
+    Operator('[OP_LIST_POP]', (L,), (), handler=PostfixConverter._op_list_pop),
+    Operator('[OP_LIST_ARANGE]', (S, S, S), (L,), handler=PostfixConverter._op_list_arange),
+    Operator('[OP_LIST_ODD]', (S, S), (L,), handler=PostfixConverter._op_list_odd),
+    Operator('[OP_LIST_EVEN]', (S, S), (L,), handler=PostfixConverter._op_list_even),
+    Operator('[OP_LIST_GET_PERM]', (L, S), (L, L), handler=PostfixConverter._op_list_get_perm),
+    Operator('[OP_LIST_GET_PRODUCT]', (L, S), (L, L), handler=PostfixConverter._op_list_get_product),
+    Operator('[OP_GEN_POSSIBLE_LIST]', (S,), (S, L), handler=PostfixConverter._op_gen_possible_list),
+    Operator('[OP_LIST_MAX]', (L, S), (L, S), 'max', handler=PostfixConverter._op_list_max),
+    Operator('[OP_LIST_MIN]', (L, S), (L, S), 'min', handler=PostfixConverter._op_list_min),
+    Operator('[OP_LIST_SUM]', (L,), (L, S), 'sum', handler=PostfixConverter._op_list_sum),
+    Operator('[OP_LIST_LEN]', (L,), (L, S), 'len', handler=PostfixConverter._op_list_len),
+    Operator('[OP_LIST_GET]', (L, S), (L, S), handler=PostfixConverter._op_list_get),
+    Operator('[OP_LIST_INDEX]', (L, S), (L, S), handler=PostfixConverter._op_list_index),
+    Operator('[OP_LIST_FIND_NUM]', (L, S), (L, S), handler=PostfixConverter._op_list_find_num),
+    Operator('[OP_LIST_MORE]', (L, S), (L, L), '>', evaluate=lambda x, a: x > a,
+             handler=PostfixConverter._op_list_compare),
+    Operator('[OP_LIST_LESS]', (L, S), (L, L), '<', evaluate=lambda x, a: x < a,
+             handler=PostfixConverter._op_list_compare),
+    Operator('[OP_LIST_MORE_EQUAL]', (L, S), (L, L), '>=', evaluate=lambda x, a: x >= a,
+             handler=PostfixConverter._op_list_compare),
+    Operator('[OP_LIST_LESS_EQUAL]', (L, S), (L, L), '<=', evaluate=lambda x, a: x <= a,
+             handler=PostfixConverter._op_list_compare),
+    set_operator('[OP_SET_UNION]', '|', lambda a, b: a | b),
+    set_operator('[OP_SET_DIFFERENCE]', '-', lambda a, b: a - b),
+    set_operator('[OP_SET_INTERSECT]', '&', lambda a, b: a & b),
+    Operator('[OP_LIST_DIVISIBLE]', (L, S), (L, L), handler=PostfixConverter._op_list_divisible),
+    Operator('[OP_LIST_DIVIDE_AND_REMAIN]', (L, S, S), (L, L), handler=PostfixConverter._op_list_divide_and_remain),
+    Operator('[OP_LIST_GET_DIVISOR]', (S,), (L,), handler=PostfixConverter._op_list_get_divisor),
+    Operator('[OP_LIST_COND_MAX_MIN]', (L, L), (L, L, L), handler=PostfixConverter._op_list_cond_max_min),
+    Operator('[OP_LIST_COND_BIG_SMALL]', (L, L, L), (L,), handler=PostfixConverter._op_list_cond_big_small),
+    Operator('[OP_LIST2NUM]', (L,), (L, S), handler=PostfixConverter._op_list2num),
+    Operator('[OP_NUM2LIST]', (S,), (L,), handler=PostfixConverter._op_num2list),
+    Operator('[OP_LIST_NUM2SUM]', (L,), (L,), handler=PostfixConverter._op_list_num2sum),
+    Operator('[OP_LIST_SEARCH_FIXED_DIGIT]', (L, S, S), (L, L), handler=PostfixConverter._op_list_search_fixed_digit),
+    Operator('[OP_DIGIT_UNK_SOLVER]', (S, S), (ANY,), handler=PostfixConverter._op_digit_unk_solver),
+    Operator('[OP_LIST_FIND_UNK]', (L, S, S), (L, ANY), handler=PostfixConverter._op_list_find_unk),
+    Operator('[OP_NUM_UNK_SOLVER]', (S, S), (ANY,), handler=PostfixConverter._op_num_unk_solver),
+    Operator('[OP_LIST_MEAN]', (L,), (L, S), 'average', handler=PostfixConverter._op_list_mean),
+]:
+    register_operator(operator)
+
+
+def exact_infix_operator(name, symbol, function, code='{a} {symbol} {b}'):
+    # infix_operator of the exact arithmetic mode: function is applied to the numbers themselves, and / and **
+    # start from a Fraction, so 1/3 stays 1/3
+    return Operator(name, (S, S), (S,), symbol, evaluate=function,
+                    emit=lambda outputs, inputs: '{} = {}\n'.format(
+                        outputs[0], code.format(a=inputs[0], symbol=symbol, b=inputs[1])),
+                    handler=PostfixConverter._op_exact)
+
+
+# The handlers that write numbers as text, run by _op_decimal_text_exact with text=rational.decimal_text
+TEXT_HANDLERS = {
+    '[OP_LIST_GET_PERM]': PostfixConverter._op_list_get_perm,
+    '[OP_LIST_GET_PRODUCT]': PostfixConverter._op_list_get_product,
+    '[OP_LIST2NUM]': PostfixConverter._op_list2num,
+    '[OP_LIST_FIND_UNK]': PostfixConverter._op_list_find_unk,
+}
+
+# Operators of PostfixConverter(arithmetic='exact'), in place of those above
+EXACT_OPERATORS = {}
+for operator in [
+    exact_infix_operator('[OP_ADD]', '+', lambda a, b: a + b),
+    exact_infix_operator('[OP_SUB]', '-', lambda a, b: a - b),
+    exact_infix_operator('[OP_DIV]', '/', lambda a, b: Fraction(a) / b, 'Fraction({a}) / {b}'),
+    exact_infix_operator('[OP_MUL]', '*', lambda a, b: a * b),
+    exact_infix_operator('[OP_FDIV]', '//', lambda a, b: a // b),
+    exact_infix_operator('[OP_MOD]', '%', lambda a, b: a % b),
+    exact_infix_operator('[OP_POW]', '**', lambda a, b: Fraction(a) ** b, 'Fraction({a}) ** {b}'),
+    Operator('[OP_ABS]', (S,), (S,), 'abs', evaluate=abs,
+             emit=lambda outputs, inputs: '{} = abs({})\n'.format(outputs[0], inputs[0])),
+    Operator('[OP_CEIL]', (S, S), (S,), 'int', handler=PostfixConverter._op_ceil_exact),
+    Operator('[OP_FLOOR]', (S, S), (S,), 'int', handler=PostfixConverter._op_floor_exact),
+    Operator('[OP_ROUND]', (S, S), (S,), 'round', handler=PostfixConverter._op_round_exact),
+    Operator('[OP_LIST_EOL]', (), (L,), handler=PostfixConverter._op_list_eol_exact),
+    Operator('[OP_LIST_GET_PERM]', (L, S), (L, L), handler=PostfixConverter._op_decimal_text_exact),
+    Operator('[OP_LIST_GET_PRODUCT]', (L, S), (L, L), handler=PostfixConverter._op_decimal_text_exact),
+    Operator('[OP_LIST2NUM]', (L,), (L, S), handler=PostfixConverter._op_decimal_text_exact),
+    Operator('[OP_LIST_FIND_UNK]', (L, S, S), (L, ANY), handler=PostfixConverter._op_decimal_text_exact),
+]:
+    EXACT_OPERATORS[operator.name] = operator
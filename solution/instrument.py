@@ -0,0 +1,183 @@
+import json
+import time
+
+import lazy
+from converter import Operator, TimeoutError
+
+# Instrumentation of PostfixConverter.convert(), enabled by giving the converter sinks:
+#   converter = PostfixConverter(sinks=[Aggregator()])  or  converter.add_sink(JSONLSink('events.jsonl'))
+# Every conversion then produces one event, a dict handed to each sink's record():
+#   postfix    - the postfix expression
+#   status     - 'ok', 'cached' (answered from the result cache), 'timeout' or 'error: <exception type>'
+#   seconds    - time spent in convert()
+#   phases     - seconds per phase: 'setup' (cache lookup, per-call state), 'tokenize', 'operators' (operator
+#                handlers, see below), 'operands' (the rest of the token loop), 'optimize', 'compile', 'exec',
+#                'format' (answer and print line); only the phases that ran are present
+#   code_chars - length of the generated code
+#   operators  - one entry per operator token in order: {'name', 'seconds', 'code_chars' (characters it added to
+#                the generated code), 'list_sizes' (lengths of the lists it produced; None for a lazy list whose
+#                length is not known without generating it)}
+# Without sinks the converter runs its plain operator table and only tests `self.probe is None` once per phase.
+# With deadline='process' the conversion runs in a child process, so only status and seconds are recorded.
+
+PHASES = ('setup', 'tokenize', 'operators', 'operands', 'optimize', 'compile', 'exec', 'format')
+
+
+def list_size(item):
+    # Length of a list operand, without generating a lazy list that does not know it
+    if isinstance(item, lazy.LazyList):
+        if item.items is not None:
+            return len(item.items)
+        if type(item).__len__ is lazy.LazyList.__len__:
+            return None
+    try:
+        return len(item)
+    except TypeError:
+        return None
+
+
+class Probe():
+    # Collects the event of the conversion in progress for a converter and hands it to the sinks
+    def __init__(self, converter, sinks):
+        self.converter = converter
+        self.sinks = list(sinks)
+        self.event = None
+        self.last = None
+        self.overhead = 0
+        self.source = None # operator table the wrapped table was built from
+        self.wrapped = None
+
+    def observe(self, convert, postfix_eq, mode, verify, timeout):
+        # Runs convert(postfix_eq, mode, verify, timeout) and records its event, whatever the outcome
+        self.event = {'postfix': postfix_eq, 'status': 'ok', 'seconds': None, 'phases': {}, 'code_chars': 0,
+                      'operators': []}
+        self.overhead = 0 # time the timed handlers spent on their own bookkeeping, inside the token loop
+        hits = self.converter.cache_hits
+        start = self.last = time.perf_counter()
+        try:
+            return convert(postfix_eq, mode, verify, timeout)
+        except TimeoutError:
+            self.event['status'] = 'timeout'
+            raise
+        except BaseException as e:
+            self.event['status'] = 'error: ' + type(e).__name__
+            raise
+        finally:
+            event, self.event = self.event, None
+            event['seconds'] = time.perf_counter() - start
+            if self.converter.cache_hits != hits:
+                event['status'] = 'cached'
+            event['code_chars'] = len(self.converter.code_string)
+            phases = event['phases']
+            if 'operators' in phases or 'operands' in phases:
+                operator_time = sum(operator['seconds'] for operator in event['operators'])
+                phases['operands'] = phases.get('operands', 0) - operator_time - self.overhead
+                phases['operators'] = operator_time
+            for sink in self.sinks:
+                sink.record(event)
+
+    def mark(self, phase):
+        # The time since the previous mark was spent in `phase`
+        now = time.perf_counter()
+        if self.event is not None:
+            phases = self.event['phases']
+            phases[phase] = phases.get(phase, 0) + now - self.last
+        self.last = now
+
+    def table(self, operators):
+        # The converter's operator table with every operator timed; rebuilt when the table changes
+        if self.source != operators:
+            self.source = dict(operators)
+            self.wrapped = {name: self.timed(operator) for name, operator in operators.items()}
+        return self.wrapped
+
+    def timed(self, original):
+        def handler(converter, operator, deadline):
+            entered = time.perf_counter()
+            lists = converter.list_stack.content_stack
+            before = set(map(id, lists))
+            code_chars = len(converter.code_string)
+            start = time.perf_counter()
+            try:
+                if original.handler is None:
+                    return converter._apply(original)
+                return original.handler(converter, original, deadline)
+            finally:
+                seconds = time.perf_counter() - start
+                if self.event is not None:
+                    self.event['operators'].append({
+                        'name': original.name, 'seconds': seconds,
+                        'code_chars': len(converter.code_string) - code_chars,
+                        'list_sizes': [list_size(item) for item in lists if id(item) not in before]})
+                    self.overhead += time.perf_counter() - entered - seconds
+        return Operator(original.name, original.inputs, original.outputs, original.symbol, original.evaluate,
+                        original.emit, handler=handler)
+
+
+class Aggregator():
+    # In-memory sink: totals per status, per phase and per operator over all the events it has seen
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.conversions = 0
+        self.seconds = 0
+        self.statuses = {}
+        self.phases = {}
+        self.operators = {}
+
+    def record(self, event):
+        self.conversions += 1
+        self.seconds += event['seconds']
+        self.statuses[event['status']] = self.statuses.get(event['status'], 0) + 1
+        for phase, seconds in event['phases'].items():
+            self.phases[phase] = self.phases.get(phase, 0) + seconds
+        for call in event['operators']:
+            stats = self.operators.get(call['name'])
+            if stats is None:
+                stats = self.operators[call['name']] = {'calls': 0, 'seconds': 0, 'code_chars': 0, 'lists': 0,
+                                                        'list_items': 0, 'max_list': 0}
+            stats['calls'] += 1
+            stats['seconds'] += call['seconds']
+            stats['code_chars'] += call['code_chars']
+            for size in call['list_sizes']:
+                stats['lists'] += 1
+                if size is not None:
+                    stats['list_items'] += size
+                    stats['max_list'] = max(stats['max_list'], size)
+
+    def summary(self):
+        # Totals as a dict; operators sorted by cumulative time, slowest first
+        return {
+            'conversions': self.conversions,
+            'seconds': self.seconds,
+            'statuses': dict(self.statuses),
+            'phases': {phase: self.phases[phase] for phase in PHASES if phase in self.phases},
+            'operators': dict(sorted(self.operators.items(), key=lambda item: item[1]['seconds'], reverse=True)),
+        }
+
+
+class JSONLSink():
+    # Writes every event as one JSON line to a path (appended to) or to an open text file
+    def __init__(self, target):
+        if isinstance(target, str):
+            self.file = open(target, 'a', encoding='utf-8')
+            self.owned = True
+        else:
+            self.file = target
+            self.owned = False
+
+    def record(self, event):
+        self.file.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
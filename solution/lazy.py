@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import math
+
+VARIABLE_CANDI = set('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+
+class LazyList():
+    # A list operand whose elements are generated on demand.
+    # List operators that only need to scan their input (filters, len, max/min, sum/mean) consume it as a stream,
+    # so their memory use stays constant; any other operator gets a real list through materialize(), which is
+    # built once and kept.
+    def __init__(self):
+        self.items = None
+        # Generator expression body that produces the elements in the generated code, or None when the generated
+        # code holds the whole list under the list's name
+        self.code = None
+
+    def generate(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        if self.items is not None:
+            return iter(self.items)
+        return self.generate()
+
+    def materialize(self):
+        if self.items is None:
+            self.items = list(self.generate())
+        return self.items
+
+    def materialize_code(self, name):
+        # Line of generated code that builds the real list under its name
+        if self.code is None:
+            return ''
+        return '{} = [{}]\n'.format(name, self.code)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def sorted_item(self, index):
+        # sorted(self)[index], keeping only |index|+1 elements in memory
+        if isinstance(index, int) and index >= 0:
+            smallest = heapq.nsmallest(index+1, self)
+            if len(smallest) > index:
+                return smallest[index]
+            raise IndexError('list index out of range')
+        if isinstance(index, int):
+            largest = heapq.nlargest(-index, self)
+            if len(largest) == -index:
+                return largest[-1]
+            raise IndexError('list index out of range')
+        return sorted(self)[index]
+
+    def __str__(self):
+        return str(self.materialize())
+
+    __repr__ = __str__
+
+
+class DigitCandidates(LazyList):
+    # The numbers matching a digit pattern such as 'AB3C5D', where each letter stands for one digit
+    # (the same letter always for the same digit) and the number has no leading zero.
+    # Every distinct character contributes place * digit, so the candidates are built arithmetically,
+    # and with the characters taken in order of first appearance they come out in ascending order.
+    def __init__(self, pattern, places, digits):
+        super().__init__()
+        self.pattern = pattern
+        self.places = places # [place value of each distinct character]
+        self.digits = digits # [range of digits the character can take]
+
+    @classmethod
+    def from_pattern(cls, pattern):
+        # Returns None for patterns with characters other than digits and capital letters
+        if not pattern or any(c not in VARIABLE_CANDI and c not in '0123456789' for c in pattern):
+            return None
+        places = dict.fromkeys(pattern, 0)
+        for i, c in enumerate(reversed(pattern)):
+            places[c] += 10**i
+        digits = []
+        for c in places:
+            if c in VARIABLE_CANDI:
+                digits.append(range(10))
+            else:
+                digits.append(range(int(c), int(c)+1))
+        if len(pattern) > 1: # no leading zero
+            digits[0] = range(max(digits[0].start, 1), digits[0].stop)
+        return cls(pattern, list(places.values()), digits)
+
+    def generate(self):
+        # The last character varies fastest, so each run of candidates is a range
+        last_place, last_digits = self.places[-1], self.digits[-1]
+        offsets = [[place * d for d in digits] for place, digits in zip(self.places[:-1], self.digits[:-1])]
+        for combo in itertools.product(*offsets):
+            base = sum(combo)
+            yield from range(base + last_place*last_digits.start, base + last_place*last_digits.stop, last_place)
+
+    def __len__(self):
+        n = 1
+        for digits in self.digits:
+            n *= len(digits)
+        return n
+
+    def __getitem__(self, index):
+        # index-th smallest candidate, computed in mixed radix without generating the others
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('list index out of range')
+        value = 0
+        for place, digits in zip(reversed(self.places), reversed(self.digits)):
+            index, d = divmod(index, len(digits))
+            value += place * digits[d]
+        return value
+
+    sorted_item = __getitem__ # generated in ascending order
+
+
+class Arrangements(LazyList):
+    # The numbers made by joining `length` of the digit strings in cards, as float, leaving out those that start
+    # with 0: [OP_LIST_GET_PERM] (each card used at most once) or [OP_LIST_GET_PRODUCT] (repeat=True).
+    def __init__(self, cards, length, repeat=False):
+        super().__init__()
+        self.cards = cards
+        self.length = length
+        self.repeat = repeat
+
+    @classmethod
+    def from_cards(cls, cards, length, repeat=False):
+        # Returns None unless every card is a non-empty string of digits and length >= 1
+        if not isinstance(length, int) or length < 1:
+            return None
+        if any(not card or any(c not in '0123456789' for c in card) for card in cards):
+            return None
+        return cls(cards, length, repeat)
+
+    def generate(self):
+        if self.repeat:
+            source = itertools.product(self.cards, repeat=self.length)
+        else:
+            source = itertools.permutations(self.cards, self.length)
+        return (float(''.join(p)) for p in source if p[0][0] != '0')
+
+    def __len__(self):
+        n = len(self.cards)
+        zeros = sum(1 for card in self.cards if card[0] == '0')
+        if self.repeat:
+            total = n**self.length
+            return total - zeros * n**(self.length-1) if zeros else total
+        total = math.perm(n, self.length)
+        return total - zeros * math.perm(n-1, self.length-1) if zeros else total
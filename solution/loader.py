@@ -0,0 +1,105 @@
+import json
+
+# Streaming reader for the dataset files: one top-level JSON object {id: record, ...} such as dataset/test.json.
+# The file is read in chunks and the records are decoded one at a time, so memory holds one record and one chunk
+# whatever the size of the file.
+
+CHUNK_SIZE = 1 << 16 # characters read at a time
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader():
+    # Text buffer over a file: values are decoded from the buffer, which is refilled when a value runs past its end
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.offset = 0 # characters of the file before the buffer, for error messages
+
+    def fill(self, size=None):
+        # Read more of the file into the buffer, dropping what has been consumed; False at the end of the file
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        # Next character that is not whitespace, without consuming it; '' at the end of the file
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            self.error('expected {!r}'.format(char))
+        self.pos += 1
+
+    def value(self):
+        # Decode the next JSON value; a value that ends at the end of the buffer may continue in the file
+        # (a number, or an object cut in the middle), so more is read until it is decoded whole
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self.fill(size):
+                continue # end of file reached: decode once more, raising if the value is incomplete
+            size *= 2 # a long value: read ahead more at a time, so it is not decoded over and over
+
+    def error(self, message):
+        raise ValueError('{} at character {} of the dataset file'.format(message, self.offset + self.pos))
+
+
+def iter_records(path_or_file, fields=None, categories=None, chunk_size=CHUNK_SIZE):
+    # Yields (id, record) pairs of a dataset file in file order.
+    # fields: keep only these fields of each record (e.g. ('solution_abst_en', 'category')); None keeps them all
+    # categories: yield only the records whose 'category' is one of these; None yields every record
+    if isinstance(path_or_file, str):
+        with open(path_or_file, encoding='utf-8') as f:
+            yield from iter_records(f, fields, categories, chunk_size)
+        return
+    if categories is not None:
+        categories = set(categories)
+    reader = _Reader(path_or_file, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        if reader.peek() != '"':
+            reader.error('expected a record id')
+        key = reader.value()
+        reader.expect(':')
+        record = reader.value()
+        if not isinstance(record, dict):
+            reader.error('record {!r} is not an object'.format(key))
+        if categories is None or record.get('category') in categories:
+            if fields is not None:
+                record = {name: record[name] for name in fields if name in record}
+            yield key, record
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == '}':
+            return
+        if separator != ',':
+            reader.pos -= 1
+            reader.error("expected ',' or '}'")
@@ -0,0 +1,251 @@
+import numpy as np
+
+import converter
+import lazy
+from converter import Operator
+
+# Operators of PostfixConverter(backend='numpy'). [OP_LIST_ARANGE], [OP_LIST_ODD], [OP_LIST_EVEN] and the filters
+# [OP_LIST_DIVISIBLE], [OP_LIST_MORE]/[OP_LIST_LESS]/..., [OP_LIST_DIVIDE_AND_REMAIN] and
+# [OP_LIST_SEARCH_FIXED_DIGIT] build NumPy arrays, and [OP_LIST_MEAN] sums one, both in convert() and in the
+# generated code. Lists that are not all ints or all floats (strings, fractions, mixed) go through the Python
+# operators, so the answers are the same as with the default backend.
+
+# Largest magnitude handled as an array: int64 arithmetic does not overflow, and ints convert to float64 exactly,
+# so comparisons and divisions give the same results as with Python numbers
+LIMIT = 2**53
+
+PYTHON_OPERATORS = dict(converter.OPERATORS)
+
+
+class ArrayList(lazy.LazyList):
+    # A list operand held as a NumPy array, in the generated code too. The Python list operators read it as
+    # a stream of Python numbers, or turn it into a list (.tolist() in the generated code).
+    def __init__(self, array):
+        super().__init__()
+        self.array = array
+        self.listed = False # the generated code has turned it into a list
+
+    def generate(self):
+        return iter(self.array.tolist())
+
+    def materialize(self):
+        if self.items is None:
+            self.items = self.array.tolist()
+        return self.items
+
+    def materialize_code(self, name):
+        if self.listed:
+            return ''
+        self.listed = True
+        return '{name} = {name}.tolist()\n'.format(name=name)
+
+    def __len__(self):
+        return len(self.array)
+
+
+def array_of(item, name):
+    # (array, expression for it in the generated code) for a list of ints or a list of floats, else (None, None)
+    if isinstance(item, ArrayList):
+        if item.listed:
+            return item.array, 'np.array({}, dtype={!r})'.format(name, str(item.array.dtype))
+        return item.array, name
+    if isinstance(item, lazy.LazyList) or not item:
+        return None, None
+    if all(type(i) is int for i in item):
+        if max(map(abs, item)) >= LIMIT:
+            return None, None
+        return np.array(item, dtype=np.int64), 'np.array({}, dtype=np.int64)'.format(name)
+    if all(type(i) is float for i in item):
+        return np.array(item, dtype=np.float64), 'np.array({}, dtype=np.float64)'.format(name)
+    return None, None
+
+
+def int_array(item, name):
+    # Like array_of, with the elements passed through int() as the Python operators do
+    array, code = array_of(item, name)
+    if array is None or array.dtype.kind != 'f':
+        return array, code
+    if not (np.isfinite(array).all() and (np.abs(array) < LIMIT).all()):
+        return None, None
+    return array.astype(np.int64), '{}.astype(np.int64)'.format(code)
+
+
+def peek_numbers(converter, count, convert):
+    # The top `count` operands (bottom first) passed through convert, or None if that fails or one of them
+    # is not a number within LIMIT
+    values = []
+    for depth in range(count, 0, -1):
+        top = converter.operand_stack.peek(depth)
+        if top is None:
+            return None
+        try:
+            value = convert(top[0])
+        except Exception:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not abs(value) < LIMIT:
+            return None
+        values.append(value)
+    return values
+
+
+def whole(converter):
+    # intifint() that only accepts whole numbers, as range() does
+    def convert(value):
+        value = converter.intifint(value)
+        if not isinstance(value, int):
+            raise TypeError('not an integer')
+        return value
+    return convert
+
+
+def fallback(converter, operator, deadline):
+    return PYTHON_OPERATORS[operator.name].handler(converter, operator, deadline)
+
+
+def new_array(converter, code):
+    # Name of a new array operand, assigned code in the generated code
+    name = next(converter.list_names)
+    converter.code_string += '{} = {}\n'.format(name, code)
+    return name
+
+
+def list_arange(converter, operator, deadline):
+    numbers = peek_numbers(converter, 3, whole(converter))
+    if numbers is None or numbers[2] == 0:
+        return fallback(converter, operator, deadline)
+    a, b, c = numbers
+    c_name = converter.operand_stack.pop()[1]
+    b_name = converter.operand_stack.pop()[1]
+    a_name = converter.operand_stack.pop()[1]
+    list_name = new_array(converter, 'np.arange({}, {} + 1, {})'.format(a_name, b_name, c_name))
+    converter.list_stack.push(ArrayList(np.arange(a, b + 1, c, dtype=np.int64)), list_name)
+
+
+def list_odd_even(converter, operator, deadline):
+    # [OP_LIST_ODD]: start at a if a is odd, else at a+1; [OP_LIST_EVEN] the other way round
+    numbers = peek_numbers(converter, 2, whole(converter))
+    if numbers is None:
+        return fallback(converter, operator, deadline)
+    a, b = numbers
+    b_name = converter.operand_stack.pop()[1]
+    a_name = converter.operand_stack.pop()[1]
+    if operator.name == '[OP_LIST_ODD]':
+        start, start_code = a + 1 - a % 2, '{a} + 1 - {a} % 2'.format(a=a_name)
+    else:
+        start, start_code = a + a % 2, '{a} + {a} % 2'.format(a=a_name)
+    list_name = new_array(converter, 'np.arange({}, {} + 1, 2)'.format(start_code, b_name))
+    converter.list_stack.push(ArrayList(np.arange(start, b + 1, 2, dtype=np.int64)), list_name)
+
+
+def list_divisible(converter, operator, deadline):
+    top = converter.list_stack.peek()
+    numbers = peek_numbers(converter, 1, int)
+    array, code = int_array(*top) if top is not None else (None, None)
+    if array is None or numbers is None or numbers[0] == 0:
+        return fallback(converter, operator, deadline)
+    a = numbers[0]
+    a_name = converter.operand_stack.pop()[1]
+    temp_list, temp_lname = converter.list_stack.pop(stream=True)
+    converter.code_string += '{a} = int({a})\n'.format(a=a_name)
+    intermediate = array[array % a == 0]
+    new_list_name = new_array(converter, code)
+    converter.code_string += '{new} = {new}[{new} % {a} == 0]\n'.format(new=new_list_name, a=a_name)
+    converter.list_stack.push(temp_list, temp_lname)
+    converter.list_stack.push(ArrayList(intermediate), new_list_name)
+
+
+def list_compare(converter, operator, deadline):
+    # [OP_LIST_MORE], [OP_LIST_LESS], [OP_LIST_MORE_EQUAL], [OP_LIST_LESS_EQUAL]
+    top = converter.list_stack.peek()
+    numbers = peek_numbers(converter, 1, lambda a: converter.intifint(converter.to_float(a)))
+    array, code = array_of(*top) if top is not None else (None, None)
+    if array is None or numbers is None:
+        return fallback(converter, operator, deadline)
+    temp_list, temp_lname, a, a_name = converter._pop_list_and_scalar(stream=True)
+    intermediate = array[operator.evaluate(array, a)]
+    new_list_name = new_array(converter, code)
+    converter.code_string += '{new} = {new}[{new} {symbol} {a}]\n'.format(new=new_list_name, symbol=operator.symbol,
+                                                                         a=a_name)
+    converter.list_stack.push(temp_list, temp_lname)
+    converter.list_stack.push(ArrayList(intermediate), new_list_name)
+
+
+def list_divide_and_remain(converter, operator, deadline):
+    # Elements whose remainder divided by a is b (b < 0 counts from a)
+    top = converter.list_stack.peek()
+    numbers = peek_numbers(converter, 2, lambda value: int(converter.intifint(value)))
+    array, code = int_array(*top) if top is not None else (None, None)
+    if array is None or numbers is None or numbers[0] == 0:
+        return fallback(converter, operator, deadline)
+    a, b = numbers
+    if b < 0:
+        b = b + a
+    b_name = converter.operand_stack.pop()[1]
+    a_name = converter.operand_stack.pop()[1]
+    temp_list, temp_lname = converter.list_stack.pop(stream=True)
+    converter.code_string += '{a} = int({a})\n{b} = int({b})\nif {b} < 0:\n    {b} = {b} + {a}\n'.format(a=a_name,
+                                                                                                     b=b_name)
+    intermediate = array[array % a == b]
+    new_list_name = new_array(converter, code)
+    converter.code_string += '{new} = {new}[{new} % {a} == {b}]\n'.format(new=new_list_name, a=a_name, b=b_name)
+    converter.list_stack.push(temp_list, temp_lname)
+    converter.list_stack.push(ArrayList(intermediate), new_list_name)
+
+
+def list_search_fixed_digit(converter, operator, deadline):
+    # Elements whose digit at place value a is b
+    top = converter.list_stack.peek()
+    numbers = peek_numbers(converter, 2, lambda value: int(converter.intifint(value)))
+    array, code = int_array(*top) if top is not None else (None, None)
+    if array is None or numbers is None or numbers[0] == 0:
+        return fallback(converter, operator, deadline)
+    a, b = numbers
+    b_name = converter.operand_stack.pop()[1]
+    a_name = converter.operand_stack.pop()[1]
+    temp_list, temp_lname = converter.list_stack.pop(stream=True)
+    converter.code_string += '{a} = int({a})\n{b} = int({b})\n'.format(a=a_name, b=b_name)
+    intermediate = array[array // a % 10 == b]
+    new_list_name = new_array(converter, code)
+    converter.code_string += '{new} = {new}[{new} // {a} % 10 == {b}]\n'.format(new=new_list_name, a=a_name, b=b_name)
+    converter.list_stack.push(temp_list, temp_lname)
+    converter.list_stack.push(ArrayList(intermediate), new_list_name)
+
+
+def list_mean(converter, operator, deadline):
+    # Only for ints whose sum is exact in a float: the Python operator sums floats one by one, and the same
+    # answer needs the same rounding. Like the Python operator, the list holds floats afterwards.
+    top = converter.list_stack.peek()
+    array, code = array_of(*top) if top is not None else (None, None)
+    # An empty list goes to the Python operator too, which raises the same ZeroDivisionError as without NumPy
+    if array is None or len(array) == 0 or array.dtype.kind != 'i' or int(np.abs(array).max()) * len(array) >= LIMIT:
+        return fallback(converter, operator, deadline)
+    temp_list, temp_lname = converter.list_stack.pop(stream=True)
+    new_var_name = next(converter.operand_names)
+    if code != temp_lname:
+        converter.code_string += '{} = {}\n'.format(temp_lname, code)
+    converter.code_string += '{var} = {name}.sum() / len({name})\n{name} = {name}.astype(np.float64)\n'.format(
+        var=new_var_name, name=temp_lname)
+    converter.operand_stack.push(int(array.sum()) / len(array), new_var_name)
+    converter.list_stack.push(ArrayList(array.astype(np.float64)), temp_lname)
+
+
+def vectorized(name, handler):
+    base = PYTHON_OPERATORS[name]
+    return Operator(name, base.inputs, base.outputs, base.symbol, base.evaluate, base.emit, handler=handler)
+
+
+OPERATORS = {}
+for operator in [
+    vectorized('[OP_LIST_ARANGE]', list_arange),
+    vectorized('[OP_LIST_ODD]', list_odd_even),
+    vectorized('[OP_LIST_EVEN]', list_odd_even),
+    vectorized('[OP_LIST_DIVISIBLE]', list_divisible),
+    vectorized('[OP_LIST_MORE]', list_compare),
+    vectorized('[OP_LIST_LESS]', list_compare),
+    vectorized('[OP_LIST_MORE_EQUAL]', list_compare),
+    vectorized('[OP_LIST_LESS_EQUAL]', list_compare),
+    vectorized('[OP_LIST_DIVIDE_AND_REMAIN]', list_divide_and_remain),
+    vectorized('[OP_LIST_SEARCH_FIXED_DIGIT]', list_search_fixed_digit),
+    vectorized('[OP_LIST_MEAN]', list_mean),
+]:
+    OPERATORS[operator.name] = operator
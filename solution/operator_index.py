@@ -0,0 +1,346 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import time
+
+from converter import OPERATORS
+from loader import iter_records
+
+# Inverted index over the solution_abst_* expressions of a dataset: for each language, which records use an
+# operator token, belong to a category, have a given expression length (tokens) or a given stack depth (the most
+# values on the operand and list stacks at once). Each of these keys maps to a bitmap of record numbers, held as
+# a Python int, so an AND or OR of filters is one big-int operation:
+#   index = OperatorIndex.build(iter_records('../dataset/test.json'))
+#   index.query(Op('[OP_LIST_GET_PERM]') & Op('[OP_LIST2NUM]') & Category('Possibility'))
+# update() re-indexes only the records whose expressions or category changed.
+
+FORMAT = 1
+LANGS = ('en', 'ko')
+
+
+def tokens_of(postfix_eq):
+    return postfix_eq.split()
+
+
+def stack_depth(tokens, operators=OPERATORS):
+    # Most values on the stacks at once while the expression is evaluated, from the operators' declared inputs
+    # and outputs. [OP_LIST_SOL] pushes a marker that [OP_LIST_EOL] replaces, together with the elements, by a list.
+    depth = 0
+    deepest = 0
+    starts = [] # depth below each open [OP_LIST_SOL]
+    for token in tokens:
+        operator = operators.get(token)
+        if operator is None:
+            depth += 1
+        elif token == '[OP_LIST_SOL]':
+            starts.append(depth)
+            depth += 1
+        elif token == '[OP_LIST_EOL]':
+            depth = (starts.pop() if starts else max(depth - 1, 0)) + 1
+        else:
+            depth = max(depth - operator.arity, 0) + len(operator.outputs)
+        deepest = max(deepest, depth)
+    return deepest
+
+
+def record_hash(record, langs=LANGS):
+    fields = {name: record.get(name) for name in ['category'] + ['solution_abst_' + lang for lang in langs]}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def bits(bitmap):
+    # Positions of the set bits of a bitmap, ascending
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+def popcount(bitmap):
+    return bin(bitmap).count('1')
+
+
+class Filter():
+    # A query: filters combine with & (and), | (or) and ~ (not)
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Key(Filter):
+    def __init__(self, kind, *values):
+        self.kind = kind
+        self.values = values
+
+    def bitmap(self, index, lang):
+        result = 0
+        for value in self.values:
+            result |= index.postings.get((lang, self.kind, value), 0)
+        return result
+
+    def __repr__(self):
+        return '{}({})'.format(self.kind.capitalize(), ', '.join(map(repr, self.values)))
+
+
+def Op(*tokens):
+    # Records using one of these operator tokens
+    return Key('op', *tokens)
+
+
+def Category(*names):
+    # Records of one of these categories
+    return Key('category', *names)
+
+
+class Range(Filter):
+    # Records whose expression length or stack depth is within low..high (inclusive; None for no bound)
+    def __init__(self, kind, low=None, high=None):
+        self.kind = kind
+        self.low = low
+        self.high = high
+
+    def bitmap(self, index, lang):
+        result = 0
+        for value in index.values.get((lang, self.kind), ()):
+            if (self.low is None or value >= self.low) and (self.high is None or value <= self.high):
+                result |= index.postings[(lang, self.kind, value)]
+        return result
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(self.kind.capitalize(), self.low, self.high)
+
+
+def Length(low=None, high=None):
+    return Range('length', low, high)
+
+
+def Depth(low=None, high=None):
+    return Range('depth', low, high)
+
+
+class And(Filter):
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def bitmap(self, index, lang):
+        result = index.live
+        for query in self.filters:
+            result &= query.bitmap(index, lang)
+            if not result:
+                break
+        return result
+
+    def __repr__(self):
+        return '(' + ' & '.join(map(repr, self.filters)) + ')'
+
+
+class Or(Filter):
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def bitmap(self, index, lang):
+        result = 0
+        for query in self.filters:
+            result |= query.bitmap(index, lang)
+        return result
+
+    def __repr__(self):
+        return '(' + ' | '.join(map(repr, self.filters)) + ')'
+
+
+class Not(Filter):
+    def __init__(self, query):
+        self.query = query
+
+    def bitmap(self, index, lang):
+        return index.live & ~self.query.bitmap(index, lang)
+
+    def __repr__(self):
+        return '~' + repr(self.query)
+
+
+class OperatorIndex():
+    def __init__(self):
+        self.ids = [] # record number -> id (None once the record is removed)
+        self.hashes = [] # record number -> record_hash() of the indexed record
+        self.numbers = {} # id -> record number
+        self.live = 0 # bitmap of the records that are not removed
+        self.postings = {} # (lang, kind, value) -> bitmap
+        self.values = {} # (lang, 'length' or 'depth') -> set of the values that have postings
+
+    @classmethod
+    def build(cls, records):
+        # Index (id, record) pairs, e.g. loader.iter_records(path, fields=INDEXED_FIELDS)
+        index = cls()
+        index.update(records, remove_missing=False)
+        return index
+
+    def keys(self, record):
+        # (lang, kind, value) keys of a record
+        if record.get('category') is not None:
+            for lang in LANGS:
+                if record.get('solution_abst_' + lang) is not None:
+                    yield lang, 'category', record['category']
+        for lang in LANGS:
+            postfix_eq = record.get('solution_abst_' + lang)
+            if postfix_eq is None:
+                continue
+            tokens = tokens_of(postfix_eq)
+            for token in set(tokens):
+                if token in OPERATORS:
+                    yield lang, 'op', token
+            yield lang, 'length', len(tokens)
+            yield lang, 'depth', stack_depth(tokens)
+
+    def _add(self, number, record):
+        bit = 1 << number
+        for key in self.keys(record):
+            self.postings[key] = self.postings.get(key, 0) | bit
+            if key[1] in ('length', 'depth'):
+                self.values.setdefault(key[:2], set()).add(key[2])
+        self.live |= bit
+
+    def _remove(self, number):
+        mask = ~(1 << number)
+        for key in [key for key, bitmap in self.postings.items() if bitmap >> number & 1]:
+            bitmap = self.postings[key] & mask
+            if bitmap:
+                self.postings[key] = bitmap
+            else:
+                del self.postings[key]
+                if key[1] in ('length', 'depth'):
+                    self.values[key[:2]].discard(key[2])
+        self.live &= mask
+
+    def update(self, records, remove_missing=True):
+        # Brings the index up to date with (id, record) pairs: new and changed records are (re)indexed, unchanged
+        # ones are skipped, and with remove_missing the indexed ids that are not among the records are removed.
+        # Returns (added, changed, removed) counts.
+        added = changed = removed = 0
+        seen = set()
+        for key, record in records:
+            key = str(key)
+            seen.add(key)
+            digest = record_hash(record)
+            number = self.numbers.get(key)
+            if number is None:
+                number = self.numbers[key] = len(self.ids)
+                self.ids.append(key)
+                self.hashes.append(digest)
+                self._add(number, record)
+                added += 1
+            elif self.hashes[number] != digest:
+                self._remove(number)
+                self.hashes[number] = digest
+                self._add(number, record)
+                changed += 1
+        if remove_missing:
+            for key in [key for key in self.numbers if key not in seen]:
+                number = self.numbers.pop(key)
+                self._remove(number)
+                self.ids[number] = None
+                self.hashes[number] = None
+                removed += 1
+        return added, changed, removed
+
+    def bitmap(self, query, lang='en'):
+        return query.bitmap(self, lang)
+
+    def query(self, query, lang='en'):
+        # Ids of the records matching query, in the order they were indexed
+        return [self.ids[number] for number in bits(self.bitmap(query, lang))]
+
+    def count(self, query, lang='en'):
+        return popcount(self.bitmap(query, lang))
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def save(self, path):
+        # JSON file with the bitmaps as base64; written to a temporary file first, then moved into place
+        postings = [[lang, kind, value, base64.b64encode(bitmap.to_bytes((bitmap.bit_length() + 7) // 8,
+                                                                            'little')).decode('ascii')]
+                    for (lang, kind, value), bitmap in self.postings.items()]
+        data = {'format': FORMAT, 'ids': self.ids, 'hashes': self.hashes, 'postings': postings}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != FORMAT:
+            raise ValueError('{} is not an operator index of format {}'.format(path, FORMAT))
+        index = cls()
+        index.ids = data['ids']
+        index.hashes = data['hashes']
+        index.numbers = {key: number for number, key in enumerate(index.ids) if key is not None}
+        for number in index.numbers.values():
+            index.live |= 1 << number
+        for lang, kind, value, encoded in data['postings']:
+            index.postings[(lang, kind, value)] = int.from_bytes(base64.b64decode(encoded), 'little')
+            if kind in ('length', 'depth'):
+                index.values.setdefault((lang, kind), set()).add(value)
+        return index
+
+
+# Fields the index reads; pass them to loader.iter_records() to skip the others
+INDEXED_FIELDS = ['category'] + ['solution_abst_' + lang for lang in LANGS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query the operator index of a DMath dataset file.')
+    parser.add_argument('--index', default='operator_index.json', help='index file')
+    parser.add_argument('--input', help='dataset JSON file to index; the index is updated if it exists')
+    parser.add_argument('--all', nargs='+', default=[], metavar='TOKEN', help='records using all these operators')
+    parser.add_argument('--any', nargs='+', default=[], metavar='TOKEN', help='records using any of these operators')
+    parser.add_argument('--none', nargs='+', default=[], metavar='TOKEN', help='records using none of these')
+    parser.add_argument('--category', nargs='+', default=[], help='records of any of these categories')
+    parser.add_argument('--length', nargs=2, type=int, metavar=('MIN', 'MAX'), help='expression length in tokens')
+    parser.add_argument('--depth', nargs=2, type=int, metavar=('MIN', 'MAX'), help='stack depth')
+    parser.add_argument('--lang', default='en', choices=LANGS)
+    args = parser.parse_args()
+
+    if args.input is not None:
+        start = time.perf_counter()
+        index = OperatorIndex.load(args.index) if os.path.exists(args.index) else OperatorIndex()
+        added, changed, removed = index.update(iter_records(args.input, fields=INDEXED_FIELDS))
+        index.save(args.index)
+        print('{} records indexed ({} added, {} changed, {} removed) in {:.2f}s'.format(
+            len(index), added, changed, removed, time.perf_counter() - start), file=sys.stderr)
+    else:
+        index = OperatorIndex.load(args.index)
+
+    filters = [Op(token) for token in args.all]
+    if args.none:
+        filters.append(~Op(*args.none))
+    if args.any:
+        filters.append(Op(*args.any))
+    if args.category:
+        filters.append(Category(*args.category))
+    if args.length:
+        filters.append(Length(*args.length))
+    if args.depth:
+        filters.append(Depth(*args.depth))
+    if not filters:
+        return
+    query = And(*filters)
+    start = time.perf_counter()
+    ids = index.query(query, args.lang)
+    elapsed = time.perf_counter() - start
+    print(' '.join(ids))
+    print('{} records match {} ({:.0f} us)'.format(len(ids), query, elapsed * 1e6), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,634 @@
+import ast
+import itertools
+import math
+import operator
+import re
+from collections import Counter, deque
+
+# Optimization pass over the generated code, used by PostfixConverter(optimize=True).
+# The generated program is straight-line code at the top level (loops, ifs and a few function definitions in
+# between), run with exec() and separate locals. The passes work on the top-level statements:
+#   constant folding   - names assigned small constants are substituted and constant expressions are computed,
+#                        which also decides the `if "/" in str(x)` fraction checks of [OP_LIST_EOL]
+#   list literals      - `x = []` followed by x.append(...) and x.reverse() becomes one list display
+#   inlining           - a temporary used once, in a place evaluated once, is replaced by its expression
+#   dead stores        - statements whose results are never read are dropped
+# Moving an expression changes when it is evaluated, and dropping a statement skips it. Values computed while the
+# code was generated do not show that the generated code cannot raise there: in exec mode it runs by itself, and
+# '1' + 1 fails in it where the eager eval() of the text succeeded. So only expressions that cannot raise
+# (constants, names, list and tuple displays of them; see may_raise) are inlined, and only statements that cannot
+# raise are dropped; anything else stays where it is, so an error is raised as it would be without the pass.
+# The passes repeat until none of them changes anything. What each top-level statement reads, assigns and changes
+# (its Summary) is computed once and kept until a pass rewrites that statement, so a round over code that no
+# longer changes is one walk of the tree.
+
+SAFE_BUILTINS = {'int': int, 'float': float, 'str': str, 'abs': abs, 'round': round, 'len': len, 'bool': bool,
+                 'min': min, 'max': max}
+# Calls without side effects, besides SAFE_BUILTINS and the math functions
+PURE_FUNCTIONS = set(SAFE_BUILTINS) | {'sum', 'sorted', 'list', 'set', 'tuple', 'range', 'enumerate', 'zip', 'divmod',
+                                       'pow', 'reversed', 'any', 'all', 'dict'}
+PURE_ITERTOOLS = {'permutations', 'product', 'combinations', 'combinations_with_replacement'}
+PURE_METHODS = {'join', 'format', 'replace', 'split', 'count', 'index', 'isdigit', 'upper', 'lower', 'strip',
+                'startswith', 'endswith', 'copy', 'keys', 'values', 'items', 'get'}
+FOLD_METHODS = {'format', 'replace'} # methods computed on constant strings
+MUTATING_METHODS = {'append', 'extend', 'insert', 'remove', 'pop', 'reverse', 'sort', 'clear', 'update', 'add',
+                    'discard', 'setdefault'}
+ARITHMETIC = re.compile(r'[0-9.eE+\-*/() ]+$') # strings eval() may compute at compile time
+MAX_SUBSTITUTED = 16 # longest repr of a constant that is copied into the places where its name is used
+# Arithmetic, comparisons and calls on constants are computed directly; other constant expressions are compiled
+BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+                    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow}
+UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+COMPARE_OPERATORS = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+                     ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Is: operator.is_, ast.IsNot: operator.is_not,
+                     ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b}
+
+
+def optimize(code, keep):
+    # code: generated program; keep: name whose value is read after the program ran
+    body = ast.parse(code).body
+    summaries = Summaries()
+    for _ in range(8): # until nothing changes
+        body, folded = fold_constants(body, summaries)
+        body, merged = build_list_displays(body, summaries)
+        body, inlined = inline_temporaries(body, keep, summaries)
+        body, removed = eliminate_dead_stores(body, keep, summaries)
+        if not (folded or merged or inlined or removed):
+            break
+    return ast.unparse(ast.Module(body, [])) + '\n' # unparse() needs no line numbers
+
+
+# Names and effects
+
+def comprehension_targets(node):
+    names = set()
+    for generator in node.generators:
+        names |= {n.id for n in ast.walk(generator.target) if isinstance(n, ast.Name)}
+    return names
+
+
+def free_loads(node, bound=frozenset()):
+    # Names read by node from the scope of the generated code. Function bodies can't see that scope, and
+    # comprehension variables are local to the comprehension.
+    names = set()
+    if isinstance(node, ast.Name):
+        if isinstance(node.ctx, ast.Load) and node.id not in bound:
+            names.add(node.id)
+    elif isinstance(node, (ast.FunctionDef, ast.Lambda)):
+        pass
+    elif isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        names |= free_loads(node.generators[0].iter, bound)
+        inner = bound | comprehension_targets(node)
+        for i, generator in enumerate(node.generators):
+            if i:
+                names |= free_loads(generator.iter, inner)
+            for condition in generator.ifs:
+                names |= free_loads(condition, inner)
+        for child in ([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]):
+            names |= free_loads(child, inner)
+    elif isinstance(node, ast.For):
+        names |= free_loads(node.iter, bound)
+        inner = bound | stored_names(node.target)
+        for statement in node.body + node.orelse:
+            names |= free_loads(statement, inner)
+    else:
+        for child in ast.iter_child_nodes(node):
+            names |= free_loads(child, bound)
+    return names
+
+
+def stored_names(node):
+    # Names node assigns in the scope of the generated code
+    names = set()
+    if isinstance(node, ast.Name):
+        if not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+    elif isinstance(node, ast.FunctionDef):
+        names.add(node.name)
+    elif isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        pass
+    else:
+        for child in ast.iter_child_nodes(node):
+            names |= stored_names(child)
+    return names
+
+
+def call_kind(call):
+    # 'pure', 'mutating' (a list/dict/set method changing its receiver) or 'impure'
+    function = call.func
+    if isinstance(function, ast.Name):
+        return 'pure' if function.id in PURE_FUNCTIONS else 'impure'
+    if isinstance(function, ast.Attribute):
+        if isinstance(function.value, ast.Name) and function.value.id == 'math':
+            return 'pure'
+        if isinstance(function.value, ast.Name) and function.value.id == 'itertools':
+            return 'pure' if function.attr in PURE_ITERTOOLS else 'impure'
+        if function.attr in PURE_METHODS:
+            return 'pure'
+        if function.attr in MUTATING_METHODS:
+            return 'mutating'
+    return 'impure'
+
+
+# Nodes that cannot raise by themselves: constants, names (the generated code assigns a name before reading it),
+# displays, function definitions without defaults, assignments to names
+SAFE_NODES = (ast.Constant, ast.Name, ast.List, ast.Tuple, ast.Assign, ast.Expr, ast.Pass, ast.FunctionDef,
+              ast.expr_context)
+
+
+def node_may_raise(node):
+    # Whether node itself (not its children) may raise
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return not isinstance(node.ctx, ast.Load) # unpacking
+    if isinstance(node, ast.FunctionDef):
+        return bool(node.args.defaults or node.args.kw_defaults or node.decorator_list)
+    return not isinstance(node, SAFE_NODES)
+
+
+def may_raise(node):
+    # Whether evaluating node may raise; a function body counts too, though it only runs when called
+    return any(node_may_raise(child) for child in ast.walk(node))
+
+
+IMPURE_STATEMENTS = (ast.While, ast.Try, ast.With, ast.Raise, ast.Assert, ast.Return, ast.Break, ast.Continue,
+                     ast.Delete, ast.Global, ast.Nonlocal, ast.Import, ast.ImportFrom)
+
+
+def effects(node):
+    # (names whose objects node changes in place, whether node has other side effects)
+    mutated = set()
+    if isinstance(node, ast.FunctionDef):
+        return mutated, False
+    impure = isinstance(node, IMPURE_STATEMENTS)
+    for child in ast.walk(node):
+        impure = node_effects(child, mutated) or impure
+    return mutated, impure
+
+
+def node_effects(node, mutated):
+    # Adds the names whose objects node itself (not its children) changes in place to mutated; returns whether
+    # it has other side effects
+    if isinstance(node, ast.Call):
+        kind = call_kind(node)
+        if kind == 'mutating' and isinstance(node.func.value, ast.Name):
+            mutated.add(node.func.value.id)
+        elif kind != 'pure':
+            return True
+    elif isinstance(node, (ast.Subscript, ast.Attribute)) and not isinstance(node.ctx, ast.Load):
+        if isinstance(node.value, ast.Name):
+            mutated.add(node.value.id)
+        else:
+            return True
+    elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+        mutated.add(node.target.id) # += extends a list in place
+    elif isinstance(node, (ast.Yield, ast.YieldFrom, ast.Await, ast.NamedExpr)):
+        return True
+    return False
+
+
+SCOPES = (ast.For, ast.FunctionDef, ast.Lambda, ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)
+
+
+class Summary():
+    # What a top-level statement reads, assigns and changes, from one walk of it
+    def __init__(self, statement):
+        self.statement = statement
+        self.mutated = set() # see effects()
+        self.impure = isinstance(statement, IMPURE_STATEMENTS)
+        self.raises = False # see may_raise()
+        self.reads = {} # name -> Name nodes reading it, anywhere in the statement
+        self.stores = {}
+        # names that may share their object with another name (x = y), so changing one in place changes the other
+        self.aliased = set()
+        function = isinstance(statement, ast.FunctionDef) # runs when called: no effects here
+        scoped = function # binds names of its own (see free_loads)
+        for node in ast.walk(statement):
+            if isinstance(node, SCOPES):
+                scoped = True
+            elif isinstance(node, ast.Name):
+                counts = self.reads if isinstance(node.ctx, ast.Load) else self.stores
+                counts[node.id] = counts.get(node.id, 0) + 1
+                continue
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Name):
+                self.aliased.add(node.value.id)
+                for target in node.targets:
+                    self.aliased |= stored_names(target)
+            if not function:
+                self.raises = self.raises or node_may_raise(node)
+                self.impure = node_effects(node, self.mutated) or self.impure
+        if function:
+            self.raises = node_may_raise(statement)
+        if scoped:
+            self.loads = free_loads(statement)
+            self.stored = stored_names(statement)
+        else: # every name is in the scope of the generated code
+            self.loads = set(self.reads)
+            self.stored = set(self.stores)
+        self.folded = {} # part of the statement (None: all of it) -> constants it was last folded against
+
+    def constants(self, env, numeric):
+        # The constants and numeric names the statement reads (repr: 1, 1.0 and True fold differently)
+        return {name: repr(env[name]) for name in self.loads if name in env}, self.loads & numeric
+
+
+class Summaries(dict):
+    # id(statement) -> Summary; a pass that rewrites a statement in place calls forget()
+    def of(self, statement):
+        summary = self.get(id(statement))
+        if summary is None or summary.statement is not statement:
+            summary = self[id(statement)] = Summary(statement)
+        return summary
+
+    def cached(self, statement):
+        summary = self.get(id(statement))
+        return summary if summary is not None and summary.statement is statement else None
+
+    def forget(self, statement):
+        self.pop(id(statement), None)
+
+
+# Constant folding
+
+def is_small(value):
+    return isinstance(value, (bool, int, float, str)) and len(repr(value)) <= MAX_SUBSTITUTED
+
+
+def constant(value):
+    # AST for value; negative numbers as unary minus, so they keep their precedence (-3 ** 2 is not (-3) ** 2)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and \
+            (value < 0 or (value == 0 and math.copysign(1, value) < 0)):
+        return ast.UnaryOp(ast.USub(), ast.Constant(-value))
+    return ast.Constant(value)
+
+
+def constant_value(node):
+    # (True, value) if node is a constant, else (False, None)
+    if isinstance(node, ast.Constant):
+        return True, node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant) \
+            and isinstance(node.operand.value, (int, float)):
+        return True, -node.operand.value
+    return False, None
+
+
+def is_numeric(node, numeric):
+    # node surely evaluates to an int or a float; numeric: names known to hold one
+    found, value = constant_value(node)
+    if found:
+        return isinstance(value, (int, float))
+    if isinstance(node, ast.Name):
+        return node.id in numeric
+    if isinstance(node, ast.BinOp):
+        return is_numeric(node.left, numeric) and is_numeric(node.right, numeric)
+    if isinstance(node, ast.UnaryOp):
+        return is_numeric(node.operand, numeric)
+    if isinstance(node, ast.Call):
+        function = node.func
+        if isinstance(function, ast.Name):
+            return function.id in ('int', 'float', 'len', 'abs', 'round')
+        return isinstance(function, ast.Attribute) and isinstance(function.value, ast.Name) and \
+            function.value.id == 'math'
+    return False
+
+
+def foldable(node):
+    # Whether computing node at compile time is safe: no huge powers or repeated strings
+    if isinstance(node, ast.BinOp):
+        left = constant_value(node.left)[1]
+        right = constant_value(node.right)[1]
+        if isinstance(node.op, ast.Pow):
+            return isinstance(right, (int, float)) and abs(right) <= 64 and \
+                isinstance(left, (int, float)) and abs(left) <= 10**6
+        if isinstance(node.op, ast.Mult):
+            return not (isinstance(left, str) or isinstance(right, str))
+        return not isinstance(node.op, (ast.LShift, ast.MatMult))
+    if isinstance(node, (ast.UnaryOp, ast.Compare, ast.BoolOp, ast.IfExp)):
+        return True
+    if isinstance(node, ast.Call):
+        if node.keywords:
+            return False
+        function = node.func
+        if isinstance(function, ast.Name):
+            return function.id in SAFE_BUILTINS or function.id == 'eval'
+        if isinstance(function, ast.Attribute) and isinstance(function.value, ast.Name):
+            return function.value.id == 'math' and callable(getattr(math, function.attr, None))
+        if isinstance(function, ast.Attribute) and isinstance(function.value, ast.Constant):
+            return isinstance(function.value.value, str) and function.attr in FOLD_METHODS
+    if isinstance(node, ast.Subscript):
+        return isinstance(node.ctx, ast.Load)
+    return False
+
+
+class Folder(ast.NodeTransformer):
+    # Substitutes the known constants and computes constant expressions, innermost first
+    def __init__(self, env, numeric):
+        self.env = env
+        self.numeric = numeric
+        self.changed = False
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load) and node.id in self.env:
+            self.changed = True
+            return constant(self.env[node.id])
+        return node
+
+    def visit_FunctionDef(self, node):
+        return node # the function body runs in its own scope
+
+    visit_Lambda = visit_FunctionDef
+
+    def visit_comprehension_node(self, node):
+        # Names bound by the comprehension hide the constants of the same name inside it
+        shadowed = comprehension_targets(node)
+        node.generators[0].iter = self.visit(node.generators[0].iter)
+        folder = Folder({k: v for k, v in self.env.items() if k not in shadowed}, self.numeric - shadowed)
+        for i, generator in enumerate(node.generators):
+            if i:
+                generator.iter = folder.visit(generator.iter)
+            generator.ifs = [folder.visit(condition) for condition in generator.ifs]
+        if isinstance(node, ast.DictComp):
+            node.key = folder.visit(node.key)
+            node.value = folder.visit(node.value)
+        else:
+            node.elt = folder.visit(node.elt)
+        self.changed = self.changed or folder.changed
+        return node
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = visit_comprehension_node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        # `"/" in str(x)` is False for numbers: the fraction check of [OP_LIST_EOL]
+        if len(node.ops) == 1 and isinstance(node.ops[0], (ast.In, ast.NotIn)) and \
+                constant_value(node.left) == (True, '/') and isinstance(node.comparators[0], ast.Call) and \
+                isinstance(node.comparators[0].func, ast.Name) and node.comparators[0].func.id == 'str' and \
+                len(node.comparators[0].args) == 1 and is_numeric(node.comparators[0].args[0], self.numeric):
+            self.changed = True
+            return ast.Constant(isinstance(node.ops[0], ast.NotIn))
+        return self.fold(node)
+
+    def generic_fold(self, node):
+        self.generic_visit(node)
+        return self.fold(node)
+
+    visit_BinOp = visit_UnaryOp = visit_BoolOp = visit_IfExp = visit_Call = visit_Subscript = generic_fold
+
+    def fold(self, node):
+        if not foldable(node) or constant_value(node)[0]: # already a constant (-3)
+            return node
+        if not all(constant_value(child)[0] for child in ast.iter_child_nodes(node)
+                   if not isinstance(child, (ast.operator, ast.unaryop, ast.cmpop, ast.boolop, ast.expr_context))
+                   and child is not getattr(node, 'func', None)):
+            return node
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and \
+                not constant_value(node.func.value)[0] and node.func.value.id != 'math':
+            return node
+        try:
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'eval':
+                argument = constant_value(node.args[0])[1] if len(node.args) == 1 else None
+                if not isinstance(argument, str) or not ARITHMETIC.match(argument) or '**' in argument:
+                    return node
+                value = eval(argument, {'__builtins__': {}})
+            elif isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+                value = BINARY_OPERATORS[type(node.op)](constant_value(node.left)[1], constant_value(node.right)[1])
+            elif isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+                value = UNARY_OPERATORS[type(node.op)](constant_value(node.operand)[1])
+            elif isinstance(node, ast.Compare) and len(node.ops) == 1:
+                value = COMPARE_OPERATORS[type(node.ops[0])](constant_value(node.left)[1],
+                                                             constant_value(node.comparators[0])[1])
+            elif isinstance(node, ast.Call):
+                args = [constant_value(arg)[1] for arg in node.args]
+                if isinstance(node.func, ast.Name):
+                    value = SAFE_BUILTINS[node.func.id](*args)
+                elif constant_value(node.func.value)[0]: # a method of a constant string
+                    value = getattr(constant_value(node.func.value)[1], node.func.attr)(*args)
+                else:
+                    value = getattr(math, node.func.attr)(*args)
+            else:
+                code = compile(ast.fix_missing_locations(ast.Expression(node)), '<fold>', 'eval')
+                value = eval(code, {'__builtins__': SAFE_BUILTINS, 'math': math})
+        except Exception:
+            return node # left to the generated code
+        if isinstance(value, bool) or isinstance(value, str) and len(value) <= 1000 or \
+                isinstance(value, int) and abs(value) < 10**50 or isinstance(value, float) and math.isfinite(value):
+            self.changed = True
+            return ast.copy_location(constant(value), node)
+        return node
+
+
+def fold_constants(body, summaries):
+    # Returns (body, whether anything changed)
+    env = {} # name -> constant it holds
+    numeric = set() # names that hold an int or a float
+    out = []
+    changed = False
+
+    def fold(statement, field=None):
+        # Folds the statement, or one field of it; True if that changed it. A statement already folded against
+        # the same constants, and not rewritten since, stays as it is.
+        summary = summaries.cached(statement)
+        if summary is not None and summary.folded.get(field) == summary.constants(env, numeric):
+            return False
+        folder = Folder(env, numeric)
+        if field is None:
+            folder.visit(statement)
+        else:
+            setattr(statement, field, folder.visit(getattr(statement, field)))
+        if folder.changed:
+            summaries.forget(statement)
+            return True
+        summary = summaries.of(statement)
+        summary.folded[field] = summary.constants(env, numeric)
+        return False
+
+    pending = deque(body)
+    while pending:
+        statement = pending.popleft()
+        if isinstance(statement, ast.If):
+            changed = fold(statement, 'test') or changed
+            found, value = constant_value(statement.test)
+            if found: # only one branch can run
+                pending.extendleft(reversed(statement.body if value else statement.orelse))
+                changed = True
+                continue
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 and \
+                isinstance(statement.targets[0], ast.Name):
+            name = statement.targets[0].id
+            changed = fold(statement, 'value') or changed
+            env.pop(name, None)
+            numeric.discard(name)
+            found, value = constant_value(statement.value)
+            if found and is_small(value):
+                env[name] = value
+            if is_numeric(statement.value, numeric):
+                numeric.add(name)
+            out.append(statement)
+            continue
+        summary = summaries.of(statement)
+        stored = summary.stored | summary.mutated
+        if isinstance(statement, (ast.For, ast.While, ast.If, ast.Try, ast.With)):
+            # assigned somewhere inside: not constant anywhere inside
+            for name in stored:
+                env.pop(name, None)
+                numeric.discard(name)
+            changed = fold(statement) or changed
+        else:
+            changed = fold(statement) or changed
+            for name in stored:
+                env.pop(name, None)
+                numeric.discard(name)
+        out.append(statement)
+    return out, changed
+
+
+# List displays
+
+def build_list_displays(body, summaries):
+    # Returns (body, whether anything changed)
+    out = []
+    changed = False
+    for statement in body:
+        previous = out[-1] if out else None
+        if previous is not None and isinstance(previous, ast.Assign) and isinstance(previous.value, ast.List) and \
+                len(previous.targets) == 1 and isinstance(previous.targets[0], ast.Name) and \
+                isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call) and \
+                isinstance(statement.value.func, ast.Attribute) and \
+                isinstance(statement.value.func.value, ast.Name) and \
+                statement.value.func.value.id == previous.targets[0].id and not statement.value.keywords:
+            name = previous.targets[0].id
+            method = statement.value.func.attr
+            args = statement.value.args
+            if method == 'append' and len(args) == 1 and name not in free_loads(args[0]) and \
+                    not effects(args[0])[1] and not effects(args[0])[0]:
+                previous.value.elts.append(args[0])
+                summaries.forget(previous)
+                changed = True
+                continue
+            if method == 'reverse' and not args:
+                previous.value.elts.reverse()
+                summaries.forget(previous)
+                changed = True
+                continue
+        out.append(statement)
+    return out, changed
+
+
+# Inlining
+
+class Inliner(ast.NodeTransformer):
+    # Replaces the one read of a name by its expression; only in places evaluated once, in the scope of the
+    # generated code: not in loop bodies, functions, or comprehension bodies
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+        self.done = False
+        self.blocked = False
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load) and node.id == self.name:
+            self.done = True
+            return self.expression
+        return node
+
+    def visit_comprehension_node(self, node):
+        node.generators[0].iter = self.visit(node.generators[0].iter)
+        if self.name in free_loads(ast.Module(node.generators[1:], [])) or \
+                any(self.name in free_loads(child) for generator in node.generators for child in generator.ifs) or \
+                self.name in free_loads(node.key if isinstance(node, ast.DictComp) else node.elt) or \
+                isinstance(node, ast.DictComp) and self.name in free_loads(node.value):
+            self.blocked = True
+        return node
+
+    visit_ListComp = visit_SetComp = visit_GeneratorExp = visit_DictComp = visit_comprehension_node
+
+    def visit_Lambda(self, node):
+        return node
+
+
+def inline_positions(statement):
+    # The expressions of a top-level statement that run once, when the statement runs
+    if isinstance(statement, (ast.Assign, ast.Expr, ast.AugAssign)):
+        return [(statement, 'value')]
+    if isinstance(statement, ast.For):
+        return [(statement, 'iter')]
+    if isinstance(statement, ast.If):
+        return [(statement, 'test')]
+    return []
+
+
+def inline_temporaries(body, keep, summaries):
+    # Returns (body, whether anything changed)
+    reads = Counter()
+    stores = Counter()
+    for statement in body:
+        summary = summaries.of(statement)
+        reads.update(summary.reads)
+        stores.update(summary.stores)
+
+    out = []
+    changed = False
+    for i, statement in enumerate(body):
+        if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1 and
+                isinstance(statement.targets[0], ast.Name)):
+            out.append(statement)
+            continue
+        name = statement.targets[0].id
+        expression = statement.value
+        if name == keep or stores[name] != 1 or reads[name] != 1:
+            out.append(statement)
+            continue
+        mutated, impure = effects(expression)
+        if mutated or impure or may_raise(expression):
+            out.append(statement)
+            continue
+        # The statement that reads the name; nothing in between may change what the expression reads
+        inputs = free_loads(expression)
+        use = None
+        for j in range(i+1, len(body)):
+            summary = summaries.of(body[j])
+            if name in summary.loads:
+                use = j
+                break
+            if summary.impure or (summary.stored | summary.mutated) & inputs:
+                break
+        inliner = Inliner(name, expression)
+        if use is not None:
+            for parent, field in inline_positions(body[use]):
+                if not inliner.blocked and name in free_loads(getattr(parent, field)):
+                    setattr(parent, field, inliner.visit(getattr(parent, field)))
+        if inliner.done:
+            # The reads and stores of the expression move to the statement that used the name: the totals
+            # of the other names stay the same
+            summaries.forget(body[use])
+            summaries.forget(statement)
+            changed = True
+        else:
+            out.append(statement)
+    return out, changed
+
+
+# Dead stores
+
+def eliminate_dead_stores(body, keep, summaries):
+    # Returns (body, whether anything changed)
+    aliased = set()
+    for statement in body:
+        aliased |= summaries.of(statement).aliased
+    live = {keep}
+    out = []
+    for statement in reversed(body):
+        summary = summaries.of(statement)
+        if not summary.impure and not summary.raises and not (summary.stored | summary.mutated) & live and \
+                not summary.mutated & aliased:
+            summaries.forget(statement)
+            continue
+        if isinstance(statement, ast.Assign):
+            for target in statement.targets:
+                if isinstance(target, (ast.Name, ast.Tuple, ast.List)):
+                    live -= stored_names(target)
+        elif isinstance(statement, ast.FunctionDef):
+            live.discard(statement.name)
+        live |= summary.loads | summary.mutated
+        out.append(statement)
+    out.reverse()
+    return out, len(out) != len(body)
@@ -0,0 +1,147 @@
+def order_by_conditions(items, conditions):
+    # Engine of [OP_LIST_COND_MAX_MIN]. Gives the items the ranks 1..n so that every postfix condition holds
+    # (e.g. ['A', 'B', '<', 'C', '2', '=']: A ranks below B, and C has rank 2), and returns the items from the
+    # highest rank down.
+    # Of all valid rankings it takes the one the permutation search over itertools.permutations(range(1, n+1))
+    # used to find first, i.e. the lexicographically smallest rank tuple. The conditions are parsed once into a
+    # comparison graph (rank bounds from the numbers, edges between items), and every rank is chosen greedily
+    # with an earliest-deadline-first feasibility check instead of trying permutations.
+    # This function is also copied into the generated code, so it must only use builtins.
+    from heapq import heappop, heappush
+
+    n = len(items)
+    position = {} # item -> position whose rank it takes (the last one, like dict(zip(items, perm)))
+    for i, item in enumerate(items):
+        position[item] = i
+    lo = [1] * n
+    hi = [n] * n
+    above = [[] for _ in range(n)] # above[p]: positions that must rank higher than p
+    possible = True
+
+    operands = []
+    for index_, cond_ in enumerate(map(str, conditions)):
+        if cond_ in ('<', '>', '='):
+            if len(operands) < 2:
+                raise AssertionError(f"error while processing {cond_} at {index_}:"
+                                     f"expected an operand from stack")
+            right = operands.pop()
+            left = operands.pop()
+            if cond_ == '>':
+                left, right = right, left
+            (left_is_item, a), (right_is_item, b) = left, right
+            if left_is_item and right_is_item:
+                if cond_ == '=':
+                    possible = possible and a == b # two different items never share a rank
+                elif a == b:
+                    possible = False
+                else:
+                    above[a].append(b)
+            elif left_is_item:
+                hi[a] = min(hi[a], b if cond_ == '=' else b-1)
+                if cond_ == '=':
+                    lo[a] = max(lo[a], b)
+            elif right_is_item:
+                lo[b] = max(lo[b], a if cond_ == '=' else a+1)
+                if cond_ == '=':
+                    hi[b] = min(hi[b], a)
+            else:
+                possible = possible and (a == b if cond_ == '=' else a < b)
+        elif cond_.isdigit():
+            operands.append((False, int(cond_)))
+        else:
+            operands.append((True, position[cond_]))
+    assert len(operands) == 0, f"temp_stack({operands}) is not empty" \
+                               f"after processing all condition inputs"
+
+    # Topological order of the comparison graph; a cycle means no ranking exists
+    below_count = [0] * n
+    for p in range(n):
+        for q in above[p]:
+            below_count[q] += 1
+    topo = [p for p in range(n) if below_count[p] == 0]
+    for p in topo:
+        for q in above[p]:
+            below_count[q] -= 1
+            if below_count[q] == 0:
+                topo.append(q)
+    possible = possible and len(topo) == n
+
+    def schedule(lo, hi):
+        # Ranks for all positions within their bounds, or None. Bounds are first tightened along the edges,
+        # after which handing out the ranks 1..n by earliest deadline is exact and respects the edges.
+        lo = lo.copy()
+        hi = hi.copy()
+        for p in topo:
+            for q in above[p]:
+                lo[q] = max(lo[q], lo[p]+1)
+        for p in reversed(topo):
+            for q in above[p]:
+                hi[p] = min(hi[p], hi[q]-1)
+        release = sorted(range(n), key=lo.__getitem__)
+        ranks = [0] * n
+        ready = []
+        j = 0
+        for t in range(1, n+1):
+            while j < n and lo[release[j]] <= t:
+                heappush(ready, (hi[release[j]], release[j]))
+                j += 1
+            if not ready:
+                return None
+            deadline, p = heappop(ready)
+            if deadline < t:
+                return None
+            ranks[p] = t
+        return ranks
+
+    ranks = schedule(lo, hi) if possible else None
+    assert ranks is not None, f"no combination found"
+    used = set()
+    for p in range(n):
+        # ranks[p] is known to work; look for a smaller one
+        for r in range(lo[p], ranks[p]):
+            if r in used:
+                continue
+            trial_lo = lo.copy()
+            trial_hi = hi.copy()
+            trial_lo[p] = trial_hi[p] = r
+            trial = schedule(trial_lo, trial_hi)
+            if trial is not None:
+                ranks = trial
+                break
+        lo[p] = hi[p] = ranks[p]
+        used.add(ranks[p])
+
+    return sorted(position, key=lambda item: ranks[position[item]], reverse=True)
+
+
+def order_pair_by_conditions(entities, conditions, target):
+    # Engine of [OP_LIST_COND_BIG_SMALL]. conditions holds triples like ['A', 'B', '>', 'C', 'A', '<'] (A is bigger
+    # than B, C is smaller than A), and target two entities [x, y]. Returns [y, x] if y is known to be bigger
+    # than x through any chain of conditions, otherwise [x, y].
+    # The transitive closure is kept as one integer bitset per entity (bit j of smaller[i] set: i > j), so the
+    # closure costs O(n^2) big-integer operations and hundreds of entities take milliseconds.
+    # This function is also copied into the generated code, so it must only use builtins.
+    index = {}
+    for i, entity in enumerate(entities):
+        index[entity] = i
+    smaller = [0] * len(entities)
+    for i in range(len(conditions)//3):
+        big = index[conditions[i*3]]
+        small = index[conditions[i*3+1]]
+        operator = conditions[i*3+2]
+        if operator == '<':
+            big, small = small, big
+        elif operator != '>':
+            continue
+        smaller[big] |= 1 << small
+
+    for k in range(len(entities)): # Floyd-Warshall over bitsets
+        bit = 1 << k
+        for i in range(len(entities)):
+            if smaller[i] & bit:
+                smaller[i] |= smaller[k]
+
+    x, y = target[0], target[1]
+    if smaller[index[y]] >> index[x] & 1:
+        return [y, x]
+    return [x, y]
@@ -0,0 +1,47 @@
+from fractions import Fraction
+import math
+
+# Helpers of the exact arithmetic mode, PostfixConverter(arithmetic='exact'): numbers are ints, or Fractions
+# when they are not whole, so 1/3 stays 1/3 instead of 0.333... and no value goes through a string and eval().
+# round_half_up() and decimal_text() are also copied into the generated code, so they must only use Fraction and math.
+
+
+def parse_number(token):
+    # The number a token stands for: '3' -> 3, '1.5' -> Fraction(3, 2), '1/3' -> Fraction(1, 3); None if the
+    # token is not a number Fraction can read (inf, nan)
+    try:
+        return int(token) # the common case, without the regular expression of Fraction()
+    except ValueError:
+        pass
+    try:
+        return exact(Fraction(token))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def exact(value):
+    # Whole Fractions become ints, so they still work as list indices, counts and range() bounds
+    if isinstance(value, Fraction) and value.denominator == 1:
+        return int(value)
+    return value
+
+
+def round_half_up(value, digits):
+    # round(value, digits) without the float error, halves rounded up: 1.7325 -> 1.733 for digits=3
+    if isinstance(value, float): # inexact already (e.g. a square root): as in the float mode
+        return round(value + 1e-10, digits)
+    scale = Fraction(10) ** int(digits)
+    result = Fraction(math.floor(Fraction(value) * scale + Fraction(1, 2))) / scale
+    return int(result) if result.denominator == 1 else result
+
+
+def decimal_text(value):
+    # str(value), but a Fraction that is not whole is written as the float mode writes it: 5/2 -> '2.5'
+    if isinstance(value, Fraction) and value.denominator != 1:
+        return str(float(value))
+    return str(value)
+
+
+def two_decimals(value):
+    # value rounded half up to hundredths, as a whole number of hundredths
+    return math.floor(Fraction(value) * 100 + Fraction(1, 2))
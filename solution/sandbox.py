@@ -0,0 +1,354 @@
+import itertools
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+try:
+    import resource # POSIX only
+except ImportError:
+    resource = None
+
+from converter import PostfixConverter, TimeoutError
+
+# Prefork pool of worker processes that run conversions, generated code included, under resource limits.
+# The workers stay up between jobs, each with its own converter (and result cache). Before every job a worker
+# lowers its own rlimits:
+#   RLIMIT_CPU - the CPU time used so far plus cpu_time, rounded up to whole seconds; past it the kernel
+#                sends SIGXCPU, which ends the worker. A CPU-time timer (ITIMER_PROF, whose SIGPROF also ends
+#                the worker) holds the job to cpu_time itself; the rlimit stays as the backstop.
+#   RLIMIT_AS  - the address space in use plus memory bytes; past it allocations fail, and the worker reports
+#                the job and exits
+# The pool also kills a worker whose job runs longer than wall_time (a job that waits without using the CPU).
+# A worker that ended for any reason is replaced by a new one, and its queued jobs go to the new worker, so one
+# runaway expression costs one job and one fork, and never the calling process.
+#   with SandboxPool(workers=4, cpu_time=2, memory=256 << 20) as pool:
+#       ans, code = pool.convert(solution)             # raises TimeoutError / MemoryError at the limits
+#       for result in pool.imap(solutions): ...        # {'answer', 'code', 'status', 'elapsed'}, in order
+
+FLUSH_INTERVAL = 0.005 # seconds a worker holds results before sending them during a chunk
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _address_space(statm):
+    # Bytes of address space of this process, from /proc/self/statm; 0 where there is none, which makes memory
+    # a bound on the whole address space of the worker
+    if statm is None:
+        return 0
+    return int(os.pread(statm, 64, 0).split()[0]) * _PAGE_SIZE
+
+
+def _soft_limit(value, hard):
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+def _send(conn, results):
+    try:
+        conn.send(results)
+    except Exception: # an answer or exception that does not pickle
+        for seq, kind, value, elapsed in results:
+            try:
+                conn.send([(seq, kind, value, elapsed)])
+            except Exception:
+                conn.send([(seq, 'error', RuntimeError(repr(value)), elapsed)])
+
+
+def _worker_main(conn, state, options, cpu_time, memory):
+    # Runs chunks of (seq, postfix_eq, mode) jobs and sends back lists of (seq, kind, value, elapsed), where kind
+    # is 'ok' (value: (answer, code)), 'error' (value: the exception) or 'memory' (the worker exits after it).
+    # Results go back at the end of each chunk, or every FLUSH_INTERVAL during a long one, so the pool is not
+    # woken for every job. state[0] is the job being run (-1 between jobs) and state[1] when it started, so
+    # the pool knows which job a worker was running when it ended.
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # interrupting the pool is up to the parent
+    statm = None
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0)) # no core file when SIGXCPU ends the worker
+        cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        as_soft, as_hard = resource.getrlimit(resource.RLIMIT_AS)
+        try:
+            statm = os.open('/proc/self/statm', os.O_RDONLY)
+        except OSError:
+            pass
+    converter = PostfixConverter(timeout=None, **options) # the limits and the pool stand in for the deadline
+    while True:
+        try:
+            chunk = conn.recv()
+        except EOFError:
+            return
+        if chunk is None:
+            return
+        results = []
+        flushed = time.perf_counter()
+        for seq, postfix_eq, mode in chunk:
+            if resource is not None:
+                if cpu_time is not None:
+                    usage = resource.getrusage(resource.RUSAGE_SELF)
+                    resource.setrlimit(resource.RLIMIT_CPU, (
+                        _soft_limit(math.ceil(usage.ru_utime + usage.ru_stime + cpu_time), cpu_hard), cpu_hard))
+                    signal.setitimer(signal.ITIMER_PROF, cpu_time)
+                if memory is not None:
+                    resource.setrlimit(resource.RLIMIT_AS, (
+                        _soft_limit(_address_space(statm) + memory, as_hard), as_hard))
+            state[1] = time.monotonic()
+            state[0] = seq
+            start = time.perf_counter()
+            try:
+                kind, value = 'ok', converter.convert(postfix_eq, mode)
+            except MemoryError:
+                kind, value = 'memory', None
+            except Exception as e:
+                kind, value = 'error', e
+            elapsed = time.perf_counter() - start
+            state[0] = -1
+            if resource is not None and cpu_time is not None:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+            results.append((seq, kind, value, elapsed))
+            if kind == 'memory':
+                converter = None
+                if resource is not None:
+                    resource.setrlimit(resource.RLIMIT_AS, (as_soft, as_hard))
+                _send(conn, results)
+                return # the heap may be left in any state: the pool starts a new worker
+            if start + elapsed - flushed >= FLUSH_INTERVAL:
+                _send(conn, results)
+                results = []
+                flushed = time.perf_counter()
+        if results:
+            _send(conn, results)
+
+
+class _Worker():
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.state = multiprocessing.RawArray('d', [-1, 0])
+        self.process = multiprocessing.Process(target=_worker_main, daemon=True,
+                                               args=(child_conn, self.state, pool.options, pool.cpu_time,
+                                                     pool.memory))
+        self.process.start()
+        child_conn.close()
+        self.outstanding = deque() # (seq, postfix_eq, mode) sent and not answered yet, in order
+        self.sent = None # when jobs were last sent to an idle worker
+
+    def send(self, jobs):
+        if not self.outstanding:
+            self.sent = time.monotonic()
+        self.outstanding.extend(jobs)
+        self.conn.send(jobs)
+
+    def running(self):
+        # (seq, start time) of the job being run, as far as the pool can tell
+        seq, started = self.state[0], self.state[1]
+        if seq < 0 or started < self.sent:
+            return None, self.sent
+        return int(seq), started
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+
+class SandboxPool():
+    def __init__(self, workers=None, mode='exec', cpu_time=10, memory=1 << 30, wall_time=None, chunksize=8,
+                 cache_size=1024, optimize=False, backend='python', arithmetic='float'):
+        # cpu_time: CPU seconds per job (None: no limit)
+        # memory: bytes of address space a job may add to its worker (None: no limit)
+        # wall_time: seconds per job before the pool kills the worker (default: twice cpu_time; None with it)
+        # chunksize: jobs sent to a worker at a time by imap()
+        # cache_size, optimize, backend, arithmetic: options of each worker's PostfixConverter
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.cpu_time = cpu_time
+        self.memory = memory
+        self.wall_time = wall_time if wall_time is not None or cpu_time is None else 2 * cpu_time
+        self.chunksize = chunksize
+        self.options = {'cache_size': cache_size, 'optimize': optimize, 'backend': backend,
+                        'arithmetic': arithmetic}
+        self.idle = None # queue of the workers not in use
+        self.pool = []
+        self.replaced = 0 # workers that ended and were replaced
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.idle is not None:
+            return
+        self.pool = [_Worker(self) for _ in range(self.workers)]
+        self.idle = queue.Queue()
+        for worker in self.pool:
+            self.idle.put(worker)
+
+    def close(self):
+        if self.idle is None:
+            return
+        for worker in self.pool:
+            worker.stop()
+        self.pool = []
+        self.idle = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _replace(self, worker):
+        worker.kill()
+        new = _Worker(self)
+        with self.lock:
+            self.pool[self.pool.index(worker)] = new
+            self.replaced += 1
+        return new
+
+    def _results(self, workers, wall_time):
+        # Waits for the results of the jobs sent to workers; returns the (seq, kind, value, elapsed) that came in
+        # and the workers, with the replacements of those that ended. A worker that ended leaves the job it was
+        # running as 'timeout' (CPU time or wall time), 'memory' or 'crash', and its other jobs, including any
+        # whose results had not been sent, go to its replacement.
+        busy = [worker for worker in workers if worker.outstanding]
+        delay = None
+        if wall_time is not None:
+            delay = max(0.0, min(worker.running()[1] for worker in busy) + wall_time - time.monotonic())
+        ready = wait([worker.conn for worker in busy], delay)
+        results = []
+        for index, worker in enumerate(workers):
+            if not worker.outstanding:
+                continue
+            ended = value = None
+            if worker.conn in ready:
+                try:
+                    for result in worker.conn.recv():
+                        worker.outstanding.popleft()
+                        results.append(result)
+                        if result[1] == 'memory': # reported by the worker, which is exiting
+                            ended = 'memory'
+                    if ended is None and not worker.outstanding:
+                        continue
+                    if worker.state[0] < 0:
+                        worker.sent = time.monotonic() # the rest of the jobs are yet to start
+                except (EOFError, OSError):
+                    worker.process.join()
+                    code = worker.process.exitcode
+                    if resource is not None and code in (-signal.SIGXCPU, -signal.SIGPROF):
+                        ended = 'timeout'
+                    elif code == -signal.SIGKILL: # e.g. the kernel's out-of-memory killer
+                        ended = 'memory'
+                    else:
+                        ended = 'crash'
+                        value = RuntimeError('sandbox worker exited with code {}'.format(code))
+            seq, started = worker.running()
+            if ended is None and wall_time is not None and time.monotonic() - started >= wall_time:
+                ended = 'timeout'
+            if ended is None:
+                continue
+            jobs = list(worker.outstanding)
+            if results and results[-1][1] == 'memory' and ended == 'memory':
+                pass # the job is already among the results
+            elif jobs:
+                # The job that was running ends with the worker; if the pool could not tell which it was, the
+                # first one not answered does, so a job that always ends its worker cannot come back forever
+                culprit = next((job for job in jobs if job[0] == seq), jobs[0])
+                jobs.remove(culprit)
+                results.append((culprit[0], ended, value, time.monotonic() - started))
+            workers[index] = self._replace(worker)
+            if jobs:
+                workers[index].send(jobs)
+        return results, workers
+
+    def convert(self, postfix_eq, mode=None, timeout=None):
+        # Like PostfixConverter.convert(), in a worker: returns (answer, code); raises TimeoutError past the CPU
+        # time or the wall time (timeout: wall time of this call), MemoryError past the memory limit, and the
+        # conversion's own exceptions. Safe to call from several threads, each using one worker at a time.
+        self.start()
+        worker = self.idle.get()
+        try:
+            worker.send([(0, postfix_eq, mode or self.mode)])
+            workers = [worker]
+            results = []
+            while not results:
+                results, workers = self._results(workers, self.wall_time if timeout is None else timeout)
+            worker = workers[0]
+        finally:
+            self.idle.put(worker)
+        _, kind, value, elapsed = results[0]
+        if kind == 'ok':
+            return value
+        if kind == 'timeout':
+            raise TimeoutError('conversion exceeded its time limit ({:.1f}s)'.format(elapsed))
+        if kind == 'memory':
+            raise MemoryError('conversion exceeded its memory limit of {} bytes'.format(self.memory))
+        raise value
+
+    def imap(self, expressions, mode=None):
+        # Converts postfix expressions over all the workers, yielding {'answer', 'code', 'status', 'elapsed'} in
+        # order, with the statuses of batch.py ('ok', 'timeout' or 'error: ...'), 'memory' and 'crash: ...' (the
+        # worker ended otherwise). An expression that is None is not converted: None is yielded in its place.
+        # At most a window of jobs is read ahead of the results, so expressions can be a stream.
+        self.start()
+        mode = mode or self.mode
+        workers = [self.idle.get() for _ in range(self.workers)]
+        try:
+            expressions = iter(expressions)
+            window = self.workers * self.chunksize * 8
+            next_seq = sent = 0 # job numbers of this run
+            done = {}
+            exhausted = False
+            while True:
+                # Keep up to two chunks queued in each worker, so it never waits for the next one
+                for worker in workers:
+                    while not exhausted and len(worker.outstanding) <= self.chunksize and sent - next_seq < window:
+                        chunk = [(seq, postfix_eq, mode) for seq, postfix_eq in
+                                 zip(itertools.count(sent), itertools.islice(expressions, self.chunksize))]
+                        if not chunk:
+                            exhausted = True
+                            break
+                        sent += len(chunk)
+                        for seq, postfix_eq, _ in chunk:
+                            if postfix_eq is None:
+                                done[seq] = None
+                        chunk = [job for job in chunk if job[1] is not None]
+                        if chunk:
+                            worker.send(chunk)
+                while next_seq in done:
+                    yield done.pop(next_seq)
+                    next_seq += 1
+                if next_seq == sent and exhausted:
+                    return
+                if next_seq < sent: # the next result is still in a worker
+                    results, workers = self._results(workers, self.wall_time)
+                    for seq, kind, value, elapsed in results:
+                        done[seq] = _record(kind, value, elapsed)
+        finally:
+            # An abandoned run leaves jobs in the workers: those workers are replaced, the others are put back
+            for index, worker in enumerate(workers):
+                if worker.outstanding:
+                    workers[index] = self._replace(worker)
+            if self.idle is not None: # not closed meanwhile
+                for worker in workers:
+                    self.idle.put(worker)
+
+
+def _record(kind, value, elapsed):
+    answer, code = value if kind == 'ok' else (None, None)
+    if kind == 'error':
+        status = 'error: {}: {}'.format(type(value).__name__, value)
+    elif kind == 'crash':
+        status = 'crash: {}'.format(value)
+    else:
+        status = kind
+    return {'answer': answer, 'code': code, 'status': status, 'elapsed': elapsed}
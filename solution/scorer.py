@@ -0,0 +1,185 @@
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+
+from batch import LANGS, convert_jobs
+from columnar import ColumnarDataset, is_columnar
+from converter import OPERATORS
+from loader import iter_records
+from verify import normalize_answer
+
+# Scores model predictions against a dataset file. Predictions are JSON lines with an 'id', a 'lang' (default:
+# --lang) and either a 'postfix' (a predicted expression, converted to its answer), an 'answer', or a
+# 'prediction' that is taken as an expression if it has an operator token and as an answer otherwise:
+#   {"id": "1", "lang": "en", "prediction": "36 42 [OP_ADD] 48 [OP_ADD] 97 [OP_SUB] 3 1 [OP_SUB] [OP_DIV]"}
+#   {"id": "2", "answer": "14.5"}
+# Each distinct expression is converted once, over the worker pool of batch.py, each with its own deadline.
+# Answers are compared after the normalization of convert() (verify.normalize_answer()). Every problem of a
+# scored language counts: one without a prediction is wrong, and predictions of other ids are not scored.
+# Accuracy is reported in total and by language, category, operator (of the gold expression) and form of the
+# prediction (expression or answer).
+
+GOLD_FIELDS = ['category'] + ['answer_' + lang for lang in LANGS] + ['solution_abst_' + lang for lang in LANGS]
+
+
+def prediction_form(prediction):
+    # 'postfix' if the prediction has an operator token, else 'answer'
+    if any(token.startswith('[OP_') for token in str(prediction).split()):
+        return 'postfix'
+    return 'answer'
+
+
+def read_predictions(path_or_file, lang='en'):
+    # {(id, lang): (form, prediction)} of a JSONL file of predictions; later lines replace earlier ones
+    if isinstance(path_or_file, str):
+        with open(path_or_file, encoding='utf-8') as f:
+            return read_predictions(f, lang)
+    predictions = {}
+    for number, line in enumerate(path_or_file, 1):
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if 'id' not in item:
+            raise ValueError('prediction on line {} has no id'.format(number))
+        if item.get('postfix') is not None:
+            form, prediction = 'postfix', item['postfix']
+        elif item.get('answer') is not None:
+            form, prediction = 'answer', item['answer']
+        elif item.get('prediction') is not None:
+            prediction = item['prediction']
+            form = prediction_form(prediction)
+        else:
+            raise ValueError("prediction on line {} has no 'postfix', 'answer' or 'prediction'".format(number))
+        predictions[(str(item['id']), item.get('lang', lang))] = (form, str(prediction))
+    return predictions
+
+
+def load_gold(path, categories=None):
+    # {id: record} with the fields the scorer reads, from a dataset file (JSON or columnar)
+    if is_columnar(path):
+        with ColumnarDataset(path) as columns:
+            return dict(columns.records([name for name in GOLD_FIELDS if name in columns.fields], categories))
+    return dict(iter_records(path, fields=GOLD_FIELDS, categories=categories))
+
+
+def gold_operators(record, lang):
+    postfix_eq = record.get('solution_abst_' + lang) or ''
+    return sorted(set(token for token in postfix_eq.split() if token in OPERATORS))
+
+
+def score(predictions, gold, langs=None, workers=None, chunksize=16, mode='exec', timeout=10, store=None,
+          sandbox=False, memory=1 << 30):
+    # Returns (report, items): the accuracy report, and one item per scored problem with its prediction,
+    # predicted and expected answers, conversion status and whether it is correct.
+    # langs: languages scored (default: those of the predictions)
+    if langs is None:
+        langs = sorted(set(lang for _, lang in predictions))
+    expressions = sorted(set(prediction for form, prediction in predictions.values() if form == 'postfix'))
+    jobs = ((index, None, postfix_eq) for index, postfix_eq in enumerate(expressions))
+    converted = {}
+    for result in convert_jobs(jobs, workers, chunksize, mode, timeout, store, sandbox, memory):
+        converted[expressions[result['id']]] = result
+
+    items = []
+    groups = defaultdict(Counter) # (breakdown, name) -> Counter(correct, total)
+    statuses = Counter()
+    for key, record in gold.items():
+        for lang in langs:
+            expected = record.get('answer_' + lang)
+            if expected is None:
+                continue
+            form, prediction = predictions.get((str(key), lang), (None, None))
+            if form is None:
+                answer, status = None, 'missing'
+            elif form == 'postfix':
+                result = converted[prediction]
+                answer, status = result['answer'], result['status'].split(':')[0]
+            else:
+                answer, status = prediction, 'ok'
+            correct = status == 'ok' and normalize_answer(answer) == normalize_answer(expected)
+            statuses[status] += 1
+            names = [('total', ''), ('by_lang', lang), ('by_category', record.get('category', '')),
+                     ('by_form', form or 'missing')]
+            names += [('by_operator', token) for token in gold_operators(record, lang)]
+            for name in names:
+                groups[name]['total'] += 1
+                groups[name]['correct'] += correct
+            items.append({'id': key, 'lang': lang, 'category': record.get('category', ''), 'form': form,
+                          'prediction': prediction, 'answer': normalize_answer(answer),
+                          'expected': normalize_answer(expected), 'status': status, 'correct': correct})
+
+    unscored = sum(1 for key, lang in predictions if key not in gold or lang not in langs)
+    report = {'total': accuracy(groups[('total', '')]), 'statuses': dict(statuses), 'unscored': unscored,
+              'converted': len(expressions)}
+    for breakdown in ('by_lang', 'by_category', 'by_operator', 'by_form'):
+        report[breakdown] = {name: accuracy(counts) for (kind, name), counts in sorted(groups.items())
+                             if kind == breakdown}
+    return report, items
+
+
+def accuracy(counts):
+    total = counts['total']
+    return {'correct': counts['correct'], 'total': total,
+            'accuracy': round(counts['correct'] / total, 4) if total else None}
+
+
+def format_report(report):
+    lines = ['{:<34} {:>7} {:>7} {:>8}'.format('', 'correct', 'total', 'accuracy')]
+
+    def row(name, entry):
+        lines.append('{:<34} {:>7} {:>7} {:>7.2f}%'.format(name, entry['correct'], entry['total'],
+                                                           100 * (entry['accuracy'] or 0)))
+
+    row('total', report['total'])
+    for breakdown in ('by_lang', 'by_category', 'by_form', 'by_operator'):
+        lines.append(breakdown[3:])
+        for name, entry in report[breakdown].items():
+            row('  ' + name, entry)
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score model predictions (expressions or answers) against a DMath '
+                                                 'dataset file, by language, category and operator.')
+    parser.add_argument('predictions', help='JSONL file of predictions')
+    parser.add_argument('--gold', default='../dataset/test.json', help='dataset file: JSON or columnar')
+    parser.add_argument('--lang', default='en', choices=LANGS, help='language of predictions without a lang')
+    parser.add_argument('--langs', nargs='+', default=None, choices=LANGS,
+                        help='languages to score (default: those of the predictions)')
+    parser.add_argument('--categories', nargs='+', default=None, help='score only these categories')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--details', help='write one JSON line per scored problem to this file')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=16, help='expressions sent to a worker at a time')
+    parser.add_argument('--mode', default='exec', choices=('exec', 'eager'))
+    parser.add_argument('--timeout', type=float, default=10, help='time budget per expression in seconds')
+    parser.add_argument('--store', default=None, help='result store file (see store.py), created if missing')
+    parser.add_argument('--sandbox', action='store_true', help='convert in sandboxed workers (see sandbox.py)')
+    parser.add_argument('--memory', type=int, default=1024, help='memory per sandboxed conversion in MB')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    predictions = read_predictions(args.predictions, args.lang)
+    gold = load_gold(args.gold, args.categories)
+    report, items = score(predictions, gold, args.langs, args.workers, args.chunksize, args.mode, args.timeout,
+                          args.store, args.sandbox, args.memory << 20)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            json.dump(report, out, ensure_ascii=False, indent=1)
+    if args.details:
+        with open(args.details, 'w', encoding='utf-8') as out:
+            for item in items:
+                out.write(json.dumps(item, ensure_ascii=False) + '\n')
+
+    print(format_report(report), file=sys.stderr)
+    print('{} predictions, {} expressions converted in {:.1f}s: {}{}'.format(
+        len(predictions), report['converted'], time.perf_counter() - start, report['statuses'],
+        ', {} not scored (id or language not in the scored set)'.format(report['unscored'])
+        if report['unscored'] else ''),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
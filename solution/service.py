@@ -0,0 +1,125 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from converter import PostfixConverter, TimeoutError
+
+# One converter per worker process (or per executor, for thread pools)
+_converter = None
+
+
+def _convert_in_worker(postfix_eq, mode, timeout):
+    global _converter
+    if _converter is None:
+        _converter = PostfixConverter()
+    return _converter.convert(postfix_eq, mode=mode, timeout=timeout)
+
+
+class AsyncConverter():
+    # asyncio front end for PostfixConverter.
+    # Requests wait in a bounded queue (await convert() blocks when it is full), and a fixed number of
+    # dispatcher tasks hand them to the executor, so thousands of in-flight requests share a few workers.
+    #
+    #     async with AsyncConverter(workers=4) as service:
+    #         ans, code = await service.convert(solution, timeout=2)
+    #
+    # With sandbox (a sandbox.SandboxPool), the conversions run in its workers, under its CPU time and memory
+    # limits: a runaway expression ends one worker, which the pool replaces, and the request fails with
+    # TimeoutError or MemoryError.
+    def __init__(self, workers=None, max_pending=1024, timeout=10, mode='exec', executor=None, sandbox=None):
+        self.sandbox = sandbox
+        self.workers = workers or (sandbox.workers if sandbox is not None else None) or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.mode = mode
+        self.executor = executor
+        self.own_executor = executor is None
+        self.queue = None
+        self.dispatchers = []
+
+    async def start(self):
+        if self.queue is not None:
+            return
+        if self.executor is None:
+            if self.sandbox is not None: # threads that wait on the sandbox workers
+                self.sandbox.start()
+                self.executor = ThreadPoolExecutor(self.workers)
+            else:
+                self.executor = ProcessPoolExecutor(self.workers)
+        self.queue = asyncio.Queue(self.max_pending)
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self):
+        # Stop the dispatchers; requests still waiting in the queue are cancelled
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.dispatchers = []
+        if self.queue is not None:
+            while not self.queue.empty():
+                _, _, future = self.queue.get_nowait()
+                future.cancel()
+            self.queue = None
+        if self.own_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def pending(self):
+        return 0 if self.queue is None else self.queue.qsize()
+
+    async def convert(self, postfix_eq, timeout=None):
+        # Returns (answer, code). The deadline covers the time spent waiting in the queue; cancelling
+        # the calling task drops the request if it has not reached a worker yet.
+        if self.queue is None:
+            await self.start()
+        seconds = self.timeout if timeout is None else timeout
+        expires = None if seconds is None else time.monotonic() + seconds
+        future = asyncio.get_running_loop().create_future()
+
+        async def submit():
+            await self.queue.put((postfix_eq, expires, future))
+            return await future
+
+        try:
+            return await asyncio.wait_for(submit(), seconds)
+        except asyncio.TimeoutError:
+            raise TimeoutError('conversion exceeded its {}s deadline'.format(seconds))
+        finally:
+            future.cancel()
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            postfix_eq, expires, future = await self.queue.get()
+            try:
+                if future.done(): # cancelled or timed out while queued
+                    continue
+                remaining = None
+                if expires is not None:
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        future.set_exception(TimeoutError('conversion deadline passed while queued'))
+                        continue
+                try:
+                    if self.sandbox is not None:
+                        result = await loop.run_in_executor(self.executor, self.sandbox.convert, postfix_eq,
+                                                            self.mode, remaining)
+                    else:
+                        result = await loop.run_in_executor(self.executor, _convert_in_worker, postfix_eq,
+                                                            self.mode, remaining)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,424 @@
+import ast
+import itertools
+import math
+from fractions import Fraction
+from string import ascii_uppercase, digits
+
+# Search engines behind the brute-force operators of PostfixConverter.
+# Each engine returns exactly what the original per-candidate `eval` loop returned.
+
+VARIABLE_CANDI = frozenset(ascii_uppercase)
+OPERATOR_CHARS = '+-*/=><().'
+CHUNK_SIZE = 4096
+
+
+def normalize_equation(eq):
+    eq = str(eq)
+    eq = eq.replace('×','*')
+    eq = eq.replace('x','*')
+    eq = eq.replace('÷','/')
+    return eq
+
+
+def split_equation(eq):
+    # 'AB+3=C5' -> (['AB', '3', 'C5'], ['+', '='])
+    term_list = []
+    op_list = []
+    temp_c = ''
+    for tc in eq:
+        if tc not in OPERATOR_CHARS:
+            temp_c += tc
+        else:
+            op_list.append(tc)
+            term_list.append(temp_c)
+            temp_c = ''
+    term_list.append(temp_c)
+    return term_list, op_list
+
+
+def to_comparison(eq):
+    eq = eq.replace('=', '==')
+    eq = eq.replace('>==', '>=')
+    eq = eq.replace('<==', '<=')
+    return eq
+
+
+def compile_digit_equation(eq):
+    # Compile an equation over single-digit unknowns into one function of those digits.
+    # Returns (variables, domains, func), or None when the equation needs the legacy string search
+    # (parentheses, decimal points, empty terms or characters that are neither digits nor unknowns).
+    # func is None when no candidate can satisfy the equation.
+    if '(' in eq or ')' in eq or '.' in eq:
+        return None
+    variables = list(set(eq) & VARIABLE_CANDI)
+    term_list, op_list = split_equation(eq)
+    domains = {v: range(10) for v in variables}
+    impossible = False
+    expr = ''
+    for i, term in enumerate(term_list):
+        if term == '' or any(c not in digits and c not in VARIABLE_CANDI for c in term):
+            return None
+        if len(term) > 1:
+            # A term written with a leading zero is never a valid number
+            if term[0] in VARIABLE_CANDI:
+                domains[term[0]] = range(1, 10)
+            elif term[0] == '0':
+                impossible = True
+        if term.isdigit():
+            expr += term
+        else:
+            expr += '(' + '+'.join('{}*{}'.format(c, 10 ** (len(term) - 1 - j)) for j, c in enumerate(term)) + ')'
+        if i < len(op_list):
+            expr += op_list[i]
+    if impossible:
+        return variables, domains, None
+    try:
+        func = eval('lambda {}: {}'.format(', '.join(variables), to_comparison(expr)))
+    except SyntaxError:
+        func = None
+    return variables, domains, func
+
+
+def solve_compiled(variables, domains, func, deadline=None):
+    ans_dict = {v: [] for v in variables}
+    if func is None:
+        return ans_dict
+    candidates = itertools.product(*(domains[v] for v in variables))
+    values = [ans_dict[v] for v in variables]
+    while True:
+        chunk = list(itertools.islice(candidates, CHUNK_SIZE))
+        if not chunk:
+            break
+        if deadline is not None:
+            deadline.check()
+        try:
+            found = list(itertools.compress(chunk, itertools.starmap(func, chunk)))
+        except Exception:
+            # Some candidate raised (e.g. division by zero); such candidates count as not satisfying
+            found = []
+            for c in chunk:
+                try:
+                    if func(*c):
+                        found.append(c)
+                except Exception:
+                    pass
+        for c in found:
+            for value, d in zip(values, c):
+                value.append(d)
+    return ans_dict
+
+
+def solve_digit_legacy(eq, deadline=None):
+    ans_dict = {v: [] for v in set(eq) & VARIABLE_CANDI}
+    candi = list(itertools.product('0123456789', repeat=len(ans_dict)))
+    for c in candi:
+        if deadline is not None:
+            deadline.check()
+        temp = eq
+        for i, (k, _) in enumerate(ans_dict.items()):
+            temp = temp.replace(k, str(c[i]))
+        term_list, op_list = split_equation(temp)
+        new_eq = ''
+        for i in range(len(op_list)):
+            new_eq += str(int(term_list[i]))+op_list[i]
+        new_eq += str(int(term_list[-1]))
+        if len(new_eq) == len(eq):
+            new_eq = to_comparison(new_eq)
+            eval_result = False
+            try:
+                eval_result = eval(new_eq)
+            except:
+                pass
+            if eval_result:
+                for i, (k, _) in enumerate(ans_dict.items()):
+                    ans_dict[k].append(int(c[i]))
+    return ans_dict
+
+
+def solve_digit_unknowns(eq, deadline=None):
+    # [OP_DIGIT_UNK_SOLVER]: every unknown (A-Z) is one digit, and multi-digit terms have no leading zero.
+    # eq must already be normalized. Returns {unknown: [its value in each satisfying assignment]}.
+    compiled = compile_digit_equation(eq)
+    if compiled is None:
+        return solve_digit_legacy(eq, deadline)
+    return solve_compiled(*compiled, deadline=deadline)
+
+
+NUM_CANDIDATES = range(51)
+
+
+class Linear():
+    # c_1*X_1 + ... + c_n*X_n + const with exact rational coefficients
+    def __init__(self, coef=None, const=0):
+        self.coef = coef or {}
+        self.const = Fraction(const)
+
+    def __add__(self, other):
+        coef = dict(self.coef)
+        for v, c in other.coef.items():
+            coef[v] = coef.get(v, 0) + c
+        return Linear({v: c for v, c in coef.items() if c != 0}, self.const + other.const)
+
+    def scale(self, k):
+        return Linear({v: c * k for v, c in self.coef.items() if c * k != 0}, self.const * k)
+
+    def substitute(self, values):
+        coef = {v: c for v, c in self.coef.items() if v not in values}
+        const = self.const + sum(c * values[v] for v, c in self.coef.items() if v in values)
+        return Linear(coef, const)
+
+
+def linear_form(node):
+    # ast expression -> Linear, or None when it is not linear in the unknowns
+    if isinstance(node, ast.Expression):
+        return linear_form(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return Linear(const=Fraction(node.value))
+    if isinstance(node, ast.Name) and node.id in VARIABLE_CANDI:
+        return Linear({node.id: Fraction(1)})
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        form = linear_form(node.operand)
+        if form is None:
+            return None
+        return form if isinstance(node.op, ast.UAdd) else form.scale(-1)
+    if isinstance(node, ast.BinOp):
+        left, right = linear_form(node.left), linear_form(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left + right.scale(-1)
+        if isinstance(node.op, ast.Mult):
+            if not left.coef:
+                return right.scale(left.const)
+            if not right.coef:
+                return left.scale(right.const)
+        if isinstance(node.op, ast.Div) and not right.coef and right.const != 0:
+            return left.scale(1 / right.const)
+    return None
+
+
+class NumConstraint():
+    # One comparison `left op right` of a [OP_NUM_UNK_SOLVER] equation, with op in '=', '<', '<=', '>', '>='.
+    # '=' stands for math.isclose, as in the original solver.
+    def __init__(self, left, op, right):
+        self.diff = left + right.scale(-1)
+        self.op = op
+        self.scale = max(abs(left.const), abs(right.const)) + sum(abs(c) for c in left.coef.values()) * 50 \
+            + sum(abs(c) for c in right.coef.values()) * 50 # bound of |left|, |right| over the candidates
+
+    def variables(self):
+        return set(self.diff.coef)
+
+    def narrow(self, var, domains):
+        # Candidates of `var` that can satisfy the constraint for some values of the other unknowns in their
+        # domains (interval bounds). Bounds are widened by one so that float rounding in the real evaluation
+        # never loses a solution.
+        domain = domains[var]
+        c = self.diff.coef[var]
+        rest_lo = rest_hi = self.diff.const # range of the rest of the difference
+        for v, cv in self.diff.coef.items():
+            if v != var:
+                if not domains[v]:
+                    return []
+                ends = (cv * domains[v][0], cv * domains[v][-1])
+                rest_lo += min(ends)
+                rest_hi += max(ends)
+        # c*var + rest (op) 0
+        if self.op == '=':
+            tol = Fraction(1e-9) * self.scale # math.isclose relative tolerance
+            lo, hi = -rest_hi - tol, -rest_lo + tol
+        elif self.op in ('<', '<='):
+            lo, hi = None, -rest_lo
+        else:
+            lo, hi = -rest_hi, None
+        if c < 0:
+            lo, hi = (None if hi is None else hi / c), (None if lo is None else lo / c)
+        else:
+            lo, hi = (None if lo is None else lo / c), (None if hi is None else hi / c)
+        return [d for d in domain if (lo is None or d >= math.floor(lo) - 1) and (hi is None or d <= math.ceil(hi) + 1)]
+
+
+COMPARE_OPS = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '='}
+
+
+def parse_constraints(parts, chained):
+    # Linear constraints implied by the equation; constraints that are not linear are left to enumeration
+    constraints = []
+    if chained:
+        forms = [linear_form(ast.parse(p, mode='eval')) for p in parts]
+        for left, right in zip(forms, forms[1:]):
+            if left is not None and right is not None:
+                constraints.append(NumConstraint(left, '=', right))
+        return constraints
+    node = ast.parse(parts[0], mode='eval').body
+    if isinstance(node, ast.Compare):
+        operands = [node.left] + node.comparators
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            left, right = linear_form(left), linear_form(right)
+            if type(op) in COMPARE_OPS and left is not None and right is not None:
+                constraints.append(NumConstraint(left, COMPARE_OPS[type(op)], right))
+    return constraints
+
+
+def propagate(variables, domains, constraints):
+    # Narrow the domains with every linear constraint until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for constraint in constraints:
+            for var in constraint.variables():
+                narrowed = constraint.narrow(var, domains)
+                if len(narrowed) < len(domains[var]):
+                    domains[var] = narrowed
+                    changed = True
+                if not narrowed:
+                    return domains
+    return domains
+
+
+def compile_num_equation(eq):
+    # Compile an equation over integer unknowns (0..50) into a predicate of those unknowns.
+    # Returns (variables, domains, linear constraints, predicate), or None when the equation needs the legacy
+    # string search. The domains are already narrowed by the constraints.
+    # Terms are rebuilt exactly as the legacy search does: str(int(term)) after substitution.
+    variables = list(set(eq) & VARIABLE_CANDI)
+    term_list, op_list = split_equation(eq)
+    if term_list[-1] == '':
+        return None
+    expr = ''
+    for i, term in enumerate(term_list):
+        if any(c not in digits and c not in VARIABLE_CANDI for c in term):
+            return None
+        has_var = any(c in VARIABLE_CANDI for c in term)
+        if has_var and ((i > 0 and op_list[i-1] == '.') or (i < len(op_list) and op_list[i] == '.')):
+            return None
+        if term == '':
+            pass
+        elif not has_var:
+            expr += str(int(term))
+        elif len(term) == 1:
+            expr += term
+        else:
+            expr += 'int(' + '+'.join(repr(c) if c in digits else 'str({})'.format(c) for c in term) + ')'
+        if i < len(op_list):
+            expr += op_list[i]
+    expr = to_comparison(expr)
+    params = ', '.join(variables)
+    chained = '=' in expr and '>' not in expr and '<' not in expr
+    if chained:
+        parts = expr.replace('==', '=').split('=')
+    else:
+        parts = [expr]
+    try:
+        funcs = [eval('lambda {}: {}'.format(params, p)) for p in parts]
+    except SyntaxError:
+        return variables, {v: [] for v in variables}, [], None
+    if chained:
+        def predicate(*c):
+            values = [f(*c) for f in funcs]
+            return all(math.isclose(a, b) for a, b in zip(values, values[1:]))
+    else:
+        predicate = funcs[0]
+    domains = {v: list(NUM_CANDIDATES) for v in variables}
+    try:
+        constraints = parse_constraints(parts, chained)
+    except (SyntaxError, ValueError, ZeroDivisionError):
+        constraints = []
+    return variables, propagate(variables, domains, constraints), constraints, predicate
+
+
+def solve_num_legacy(eq, deadline=None):
+    ans_dict = {v: [] for v in set(eq) & VARIABLE_CANDI}
+    candi = list(itertools.product(NUM_CANDIDATES, repeat=len(ans_dict)))
+    for c in candi:
+        if deadline is not None:
+            deadline.check()
+        temp = eq
+        for i, (k, _) in enumerate(ans_dict.items()):
+            temp = temp.replace(k, str(c[i]))
+        term_list, op_list = split_equation(temp)
+        new_eq = ''
+        for i in range(len(op_list)):
+            if term_list[i] == '':
+                new_eq += str(term_list[i])+op_list[i]
+            else:
+                new_eq += str(int(term_list[i]))+op_list[i]
+        new_eq += str(int(term_list[-1]))
+        new_eq = to_comparison(new_eq)
+        eval_result = False
+        try:
+            if '=' in new_eq and '>' not in new_eq and '<' not in new_eq:
+                new_eq=new_eq.replace('==','=')
+                new_eq=new_eq.split('=')
+                for i in range(len(new_eq)-1):
+                    eval_result = math.isclose(eval(new_eq[i]), eval(new_eq[i+1]))
+                    if not eval_result:
+                        break
+            else:
+                eval_result = eval(new_eq)
+        except:
+            eval_result = False
+        if eval_result:
+            for i, (k, _) in enumerate(ans_dict.items()):
+                ans_dict[k].append(int(c[i]))
+    return ans_dict, len(candi)
+
+
+def pruned_search(variables, domains, constraints, predicate, deadline=None):
+    # Assign the unknowns one at a time, re-narrowing the remaining domains after each assignment,
+    # and evaluate the predicate only on the assignments that survive.
+    # Returns ({unknown: [its value in each satisfying assignment]}, number of candidates evaluated).
+    ans_dict = {v: [] for v in variables}
+    evaluated = 0
+
+    def visit(i, domains):
+        nonlocal evaluated
+        if deadline is not None:
+            deadline.check()
+        var = variables[i]
+        if i == len(variables) - 1:
+            prefix = tuple(domains[v][0] for v in variables[:-1])
+            for d in domains[var]:
+                evaluated += 1
+                c = prefix + (d,)
+                try:
+                    if not predicate(*c):
+                        continue
+                except Exception:
+                    continue
+                for v, value in zip(variables, c):
+                    ans_dict[v].append(value)
+            return
+        for d in domains[var]:
+            sub = dict(domains)
+            sub[var] = [d]
+            sub = propagate(variables, sub, constraints)
+            if all(sub[v] for v in variables):
+                visit(i + 1, sub)
+
+    if all(domains[v] for v in variables):
+        visit(0, domains)
+    return ans_dict, evaluated
+
+
+def solve_num_compiled(variables, domains, constraints, predicate, deadline=None):
+    # Returns ({unknown: [its value in each satisfying assignment]}, number of candidates evaluated)
+    if predicate is None:
+        return {v: [] for v in variables}, 0
+    if constraints and len(variables) > 1:
+        return pruned_search(variables, domains, constraints, predicate, deadline)
+    evaluated = 1
+    for v in variables:
+        evaluated *= len(domains[v])
+    return solve_compiled(variables, domains, predicate, deadline), evaluated
+
+
+def solve_num_unknowns(eq, deadline=None):
+    # [OP_NUM_UNK_SOLVER]: every unknown (A-Z) is an integer in 0..50. eq must already be normalized.
+    # Returns ({unknown: [its value in each satisfying assignment]}, number of candidates evaluated).
+    compiled = compile_num_equation(eq)
+    if compiled is None:
+        return solve_num_legacy(eq, deadline)
+    return solve_num_compiled(*compiled, deadline=deadline)
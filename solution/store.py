@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from verify import converter_version
+
+# On-disk store of conversion results, in one SQLite file. A result is found by the hash of the postfix
+# expression, the converter version (verify.converter_version(): a hash of the converter source files) and the
+# evaluation mode and options; it holds the answer, the generated code, the status and the conversion time.
+# Any number of processes can read and write the same file at once (SQLite's write-ahead log). When the entries
+# exceed max_bytes, the least recently used are evicted; compact() also drops the entries of other converter
+# versions and gives the freed space back to the file system.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    answer TEXT,
+    code TEXT,
+    status TEXT NOT NULL,
+    elapsed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+'''
+
+# Statuses of the results that are stored: those that only depend on the expression and the converter. Timeouts
+# and the statuses of sandbox.py ('memory', 'crash: ...') depend on the limits and the load of the run, and so do
+# the errors of UNSTORED_ERRORS when the converter raises them.
+STORED_STATUSES = ('ok', 'error')
+UNSTORED_ERRORS = ('MemoryError', 'RecursionError', 'TimeoutError')
+
+
+def storable(status):
+    # 'ok', or 'error: <type>: <message>' of an error that is not in UNSTORED_ERRORS
+    parts = status.split(':')
+    if parts[0] not in STORED_STATUSES:
+        return False
+    return len(parts) < 2 or parts[1].strip() not in UNSTORED_ERRORS
+
+
+class ResultStore():
+    def __init__(self, path, max_bytes=None, version=None, check_every=256, touch_every=256):
+        # max_bytes: bound on the stored answers and code (None: unbounded); checked every check_every writes
+        # version: converter version the keys are made with (default: the current converter_version())
+        # touch_every: hits whose last use is written at once; reads take no write lock in between
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version or converter_version()
+        self.check_every = check_every
+        self.writes = 0
+        self.touch_every = touch_every
+        self.touched = {} # key -> time of the last hit, not written yet
+        self.unwritten_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None) # autocommit
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+
+    def key(self, postfix_eq, mode='exec', options=None):
+        # Content address of a conversion: hash of the expression, converter version, mode and converter options
+        text = json.dumps([postfix_eq, self.version, mode, options or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, postfix_eq, mode='exec', options=None):
+        # {'answer', 'code', 'status', 'elapsed'} of a stored conversion, or None
+        key = self.key(postfix_eq, mode, options)
+        row = self.connection.execute('SELECT answer, code, status, elapsed FROM results WHERE key = ?',
+                                      (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched[key] = time.time()
+        self.unwritten_hits += 1
+        if self.unwritten_hits >= self.touch_every:
+            self.flush()
+        return {'answer': json.loads(row[0]), 'code': row[1], 'status': row[2], 'elapsed': row[3]}
+
+    def put(self, postfix_eq, answer, code, status, elapsed, mode='exec', options=None):
+        # Store a conversion result; results whose status is not storable() (timeouts, limits) are skipped
+        if not storable(status):
+            return False
+        answer = json.dumps(answer, ensure_ascii=False)
+        size = len(answer) + len(code or '') + len(postfix_eq)
+        self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (self.key(postfix_eq, mode, options), self.version, answer, code, status, elapsed,
+                                 size, time.time()))
+        self.writes += 1
+        if self.max_bytes is not None and self.writes % self.check_every == 0:
+            self.evict()
+        return True
+
+    def flush(self):
+        # Write the last use of the entries hit since the last flush, in one transaction
+        if not self.touched:
+            return
+        touched = [(used, key) for key, used in self.touched.items()]
+        self.touched = {}
+        self.unwritten_hits = 0
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.executemany('UPDATE results SET used = MAX(used, ?) WHERE key = ?', touched)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def size(self):
+        return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        # Delete the least recently used entries until they take at most 90% of max_bytes; returns the number
+        # deleted. The margin keeps the next writes from evicting again right away.
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+        self.flush()
+        total = self.size()
+        if total <= max_bytes:
+            return 0
+        excess = total - int(max_bytes * 0.9)
+        deleted = 0
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            keys = []
+            for key, size in cursor.execute('SELECT key, size FROM results ORDER BY used').fetchall():
+                if excess <= 0:
+                    break
+                keys.append((key,))
+                excess -= size
+            cursor.executemany('DELETE FROM results WHERE key = ?', keys)
+            deleted = len(keys)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return deleted
+
+    def compact(self, max_bytes=None, keep_versions=False):
+        # Drop the entries of other converter versions (unless keep_versions), evict down to max_bytes and
+        # rewrite the file without its free pages; returns the number of entries deleted
+        deleted = 0
+        if not keep_versions:
+            deleted += self.connection.execute('DELETE FROM results WHERE version != ?', (self.version,)).rowcount
+        deleted += self.evict(max_bytes)
+        self.connection.execute('VACUUM')
+        self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)') # the vacuumed pages go from the log to the file
+        return deleted
+
+    def stats(self):
+        entries, total = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        current = self.connection.execute('SELECT COUNT(*) FROM results WHERE version = ?',
+                                          (self.version,)).fetchone()[0]
+        return {'entries': entries, 'current_version': current, 'bytes': total, 'max_bytes': self.max_bytes,
+                'file_bytes': os.path.getsize(self.path), 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or compact a result store.')
+    parser.add_argument('command', choices=('stats', 'compact'))
+    parser.add_argument('path', help='result store file')
+    parser.add_argument('--max-bytes', type=int, default=None, help='evict down to this size (compact)')
+    parser.add_argument('--keep-versions', action='store_true', help='keep entries of other converter versions')
+    args = parser.parse_args()
+
+    with ResultStore(args.path) as store:
+        if args.command == 'compact':
+            start = time.perf_counter()
+            deleted = store.compact(args.max_bytes, args.keep_versions)
+            print('{} entries deleted in {:.2f}s'.format(deleted, time.perf_counter() - start), file=sys.stderr)
+        print(json.dumps(store.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+import pytest
+
+from batch import convert_jobs
+
+
+@pytest.mark.parametrize('sandbox', [False, True])
+def test_convert_jobs_reads_a_bounded_window_ahead(sandbox):
+    read = []
+
+    def jobs():
+        for i in range(300):
+            read.append(i)
+            yield i, 'en', '{} 2 [OP_MUL]'.format(i)
+
+    results = []
+    for result in convert_jobs(jobs(), workers=2, chunksize=2, sandbox=sandbox):
+        results.append(result)
+        # 2 workers * 2 jobs per chunk * 8 chunks, plus the job read before a slot is free
+        assert len(read) - len(results) <= 2 * 2 * 8 + 2
+    assert [result['id'] for result in results] == list(range(300))
+    assert [result['answer'] for result in results] == [2 * i for i in range(300)]
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from string import ascii_lowercase, ascii_uppercase
+
+import pytest
+
+from converter import NameSequence, PostfixConverter, TimeoutError
+
+# Run with: python -m pytest -q (from this directory)
+
+
+def test_cache_is_keyed_on_mode():
+    # exec and eager round this expression differently; the answer cached for one mode must not leak into the other
+    solution = '1 2 [OP_DIV] 3 [OP_LCM]'
+    expected = {mode: PostfixConverter(cache_size=0).convert(solution, mode=mode)[0] for mode in ('exec', 'eager')}
+    assert expected['exec'] != expected['eager']
+
+    converter = PostfixConverter()
+    for mode in ('exec', 'eager', 'exec', 'eager'):
+        assert converter.convert(solution, mode=mode)[0] == expected[mode]
+    info = converter.cache_info()
+    assert (info['hits'], info['misses'], info['size']) == (2, 2, 2)
+
+
+def test_cache_hit_returns_code():
+    converter = PostfixConverter()
+    first = converter.convert('36 42 [OP_ADD] 48 [OP_ADD] 97 [OP_SUB] 3 1 [OP_SUB] [OP_DIV]')
+    second = converter.convert('36 42 [OP_ADD] 48 [OP_ADD] 97 [OP_SUB] 3 1 [OP_SUB] [OP_DIV]')
+    assert first == second == ('14.50', converter.code_string)
+    assert converter.cache_info()['hits'] == 1
+
+
+@pytest.mark.parametrize('deadline', ['cooperative', 'process'])
+def test_candidates_evaluated_is_per_call(deadline):
+    converter = PostfixConverter(deadline=deadline)
+    solver = '3×7=7×A=B A [OP_NUM_UNK_SOLVER]'
+    converter.convert(solver)
+    assert converter.candidates_evaluated > 0
+    converter.convert(solver) # a cache hit solves nothing
+    assert converter.candidates_evaluated == 0
+    converter.convert('3×7=7×A=B B [OP_NUM_UNK_SOLVER]')
+    assert converter.candidates_evaluated > 0
+    converter.convert('1 2 [OP_ADD]')
+    assert converter.candidates_evaluated == 0
+
+
+def test_name_sequence_continues_past_single_letters():
+    names = NameSequence('list_', ascii_lowercase)
+    first = [next(names) for _ in range(26 + 26**2 + 1)]
+    assert first[:2] == ['list_a', 'list_b'] and first[25] == 'list_z'
+    assert first[26:28] == ['list_aa', 'list_ab'] and first[-2:] == ['list_zz', 'list_aaa']
+    assert len(set(first)) == len(first)
+
+    operands = NameSequence('var_', ascii_lowercase + ascii_uppercase + '0123456789')
+    first = [next(operands) for _ in range(63)]
+    assert first[61:] == ['var_9', 'var_aa']
+
+
+def test_more_lists_than_letters():
+    # 30 lists: the names go on from list_z to list_aa, ...
+    solution = ' '.join(['1 3 1 [OP_LIST_ARANGE] [OP_LIST_SUM]'] * 30) + ' [OP_ADD]' * 29
+    answer, code = PostfixConverter(cache_size=0).convert(solution)
+    assert answer == 180
+    assert 'list_z =' in code and 'list_ad =' in code
+
+
+def test_deadline_from_many_threads():
+    # Timeouts of a few milliseconds in 4 threads at once: each conversion gives its answer or raises
+    # TimeoutError, no thread hangs, and no TimeoutError turns up after convert() returned
+    solutions = ['1 20000 1 [OP_LIST_ARANGE] [OP_LIST_SUM]',
+                 '1 3000 1 [OP_LIST_ARANGE] 7 [OP_LIST_DIVISIBLE] [OP_LIST_LEN]',
+                 '[OP_LIST_SOL] 1 2 3 4 5 6 [OP_LIST_EOL] 4 [OP_LIST_GET_PERM] [OP_LIST_LEN]',
+                 '36 42 [OP_ADD] 48 [OP_ADD] 97 [OP_SUB] 3 1 [OP_SUB] [OP_DIV]']
+    expected = {solution: PostfixConverter(cache_size=0).convert(solution)[0] for solution in solutions}
+    errors = []
+
+    def work(seed):
+        rng = random.Random(seed)
+        converter = PostfixConverter(cache_size=0)
+        try:
+            for _ in range(150):
+                solution = rng.choice(solutions)
+                try:
+                    assert converter.convert(solution, timeout=rng.uniform(0.0005, 0.004))[0] == expected[solution]
+                except TimeoutError:
+                    pass
+                sum(i for i in range(2000))
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(seed,), daemon=True) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors
+
+
+def test_deadline_bounds_eager_list_operators():
+    # Operators whose lists take long to build check the deadline while building them, in both modes
+    for solution in ('9999999999999999 [OP_LIST_GET_DIVISOR] [OP_LIST_LEN]',
+                     '1 60000000 [OP_LIST_ODD] [OP_LIST_LEN]'):
+        for mode in ('exec', 'eager'):
+            start = time.monotonic()
+            with pytest.raises(TimeoutError):
+                PostfixConverter(cache_size=0).convert(solution, mode=mode, timeout=0.2)
+            assert time.monotonic() - start < 2
+
+
+@pytest.mark.parametrize('mode', ['exec', 'eager'])
+@pytest.mark.parametrize('solution', [
+    '[OP_LIST_SOL] 0 1 2.5 6 [OP_LIST_EOL] 3 [OP_LIST_GET_PERM] 13 0 [OP_LIST_SEARCH_FIXED_DIGIT] 1 [OP_LIST_MAX]',
+    '[OP_LIST_SOL] 1.25 2 3/4 [OP_LIST_EOL] 1 [OP_LIST_GET_PERM] 1 [OP_LIST_MIN]',
+    '[OP_LIST_SOL] 1 2 3 [OP_LIST_EOL] 2 [OP_LIST_GET_PERM] 1 [OP_LIST_MAX]',
+    '[OP_LIST_SOL] 0.5 1 [OP_LIST_EOL] 2 [OP_LIST_GET_PRODUCT] 1 [OP_LIST_MIN]',
+    '[OP_LIST_SOL] 1.25 2 3/4 12 [OP_LIST_EOL] 1 [OP_LIST_GET_PRODUCT] 1 [OP_LIST_GET]',
+    '[OP_LIST_SOL] 1 2.5 [OP_LIST_EOL] [OP_LIST2NUM]',
+    '[OP_LIST_SOL] 1 2 [OP_LIST_EOL] [OP_LIST2NUM]',
+    '[OP_LIST_SOL] 1.25 3.5 [OP_LIST_EOL] 1A 1 [OP_LIST_FIND_UNK] [OP_LIST_SUM]',
+    '[OP_LIST_SOL] 1.25 2.75 [OP_LIST_EOL] A.B5 B [OP_LIST_FIND_UNK] [OP_LIST_SUM]',
+])
+def test_exact_writes_numbers_as_float_mode_does(solution, mode):
+    # Operators building text from numbers write a Fraction as its decimal, so both modes build the same text
+    expected = PostfixConverter(cache_size=0).convert(solution, mode=mode)[0]
+    assert PostfixConverter(cache_size=0, arithmetic='exact').convert(solution, mode=mode)[0] == expected
+
+
+@pytest.mark.parametrize('solution', [
+    '[OP_LIST_SOL] 1 2 0 [OP_LIST_EOL] 0.5 [OP_LIST_LEN] 3 [OP_LIST_SOL] 1 2 0 [OP_LIST_EOL] [OP_LIST_SUM] [OP_LIST_GET] 1 2.5',
+    '0.5 [OP_LIST_SOL] 1 2.5 [OP_LIST_EOL] [OP_LIST2NUM] [OP_POW] [OP_LIST_LEN] [OP_LIST_SOL] 1 2.5 [OP_LIST_EOL] [OP_SUB] 3 0',
+    '[OP_LIST_SOL] 1 2.5 [OP_LIST_EOL] 0 [OP_LIST_GET] 2.5 [OP_MOD] [OP_LIST_MAX] [OP_LIST_SOL] 1 2 0 [OP_LIST_EOL] [OP_ABS] '
+    '[OP_LIST2NUM]',
+])
+def test_optimizer_keeps_errors_of_the_generated_code(solution):
+    # The generated code fails on an unused value ('1' ** 0.5 and the like); the optimized code must not drop it
+    for optimize in (False, True):
+        with pytest.raises(TypeError):
+            PostfixConverter(cache_size=0, optimize=optimize).convert(solution, mode='exec')
+
+
+def test_optimizer_runs_once_per_expression(monkeypatch):
+    import optimizer
+    calls = []
+    optimize = optimizer.optimize
+    monkeypatch.setattr(optimizer, 'optimize', lambda code, keep: calls.append(keep) or optimize(code, keep))
+    converter = PostfixConverter(optimize=True)
+    solution = '[OP_LIST_SOL] 3 1 2 [OP_LIST_EOL] 2 [OP_LIST_GET] 7 [OP_MUL]'
+    answers = [converter.convert(solution, mode=mode, verify=verify)
+               for mode, verify in (('exec', False), ('eager', False), ('exec', True), ('exec', False))]
+    assert len(set(answers)) == 1 and answers[0][0] == 7
+    assert len(calls) == 1
@@ -0,0 +1,42 @@
+import pytest
+
+from converter import PostfixConverter
+
+pytest.importorskip('numpy')
+
+# Lists the vectorized operators make or read, empty ones included: the NumPy backend must give the same answer,
+# or raise the same exception type, as the Python operators
+SOLUTIONS = [
+    '5 1 1 [OP_LIST_ARANGE] [OP_LIST_MEAN]',
+    '1 5 1 [OP_LIST_ARANGE] 9 [OP_LIST_MORE] [OP_LIST_MEAN]',
+    '5 1 [OP_LIST_ODD] [OP_LIST_MEAN]',
+    '5 1 [OP_LIST_EVEN] [OP_LIST_MEAN]',
+    '2 2 [OP_LIST_ODD] [OP_LIST_MEAN]',
+    '3 3 [OP_LIST_EVEN] [OP_LIST_MEAN]',
+    '5 1 [OP_LIST_ODD] [OP_LIST_LEN]',
+    '5 1 1 [OP_LIST_ARANGE] [OP_LIST_MAX]',
+    '5 1 1 [OP_LIST_ARANGE] 2 [OP_LIST_DIVISIBLE] [OP_LIST_LEN]',
+    '5 1 1 [OP_LIST_ARANGE] 3 2 [OP_LIST_DIVIDE_AND_REMAIN] [OP_LIST_LEN]',
+    '5 1 1 [OP_LIST_ARANGE] 10 1 [OP_LIST_SEARCH_FIXED_DIGIT] [OP_LIST_LEN]',
+    '12 53 1 [OP_LIST_ARANGE] 2 [OP_LIST_DIVISIBLE] [OP_SET_DIFFERENCE] [OP_LIST_MEAN]',
+    '1 100 [OP_LIST_ODD] [OP_LIST_MEAN]',
+    '10 99 1 [OP_LIST_ARANGE] 10 3 [OP_LIST_SEARCH_FIXED_DIGIT] [OP_LIST_SUM]',
+]
+
+
+def outcome(backend, solution, mode):
+    try:
+        return PostfixConverter(backend=backend, cache_size=0).convert(solution, mode=mode)[0]
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize('mode', ['exec', 'eager'])
+@pytest.mark.parametrize('solution', SOLUTIONS)
+def test_numpy_backend_matches_python(solution, mode):
+    assert outcome('numpy', solution, mode) == outcome('python', solution, mode)
+
+
+def test_empty_mean_raises_zero_division():
+    with pytest.raises(ZeroDivisionError):
+        PostfixConverter(backend='numpy').convert('5 1 1 [OP_LIST_ARANGE] [OP_LIST_MEAN]')
@@ -0,0 +1,94 @@
+import itertools
+import random
+
+import pytest
+
+from ordering import order_by_conditions, order_pair_by_conditions
+
+# The ordering engines against permutation brute force, on small random condition sets
+
+
+def brute_order(items, conditions):
+    # The permutation search [OP_LIST_COND_MAX_MIN] used to run: the first rank tuple satisfying every condition
+    comparisons = []
+    operands = []
+    for cond in map(str, conditions):
+        if cond in ('<', '>', '='):
+            right = operands.pop()
+            left = operands.pop()
+            comparisons.append((left, cond, right))
+        else:
+            operands.append(cond)
+    for perm in itertools.permutations(range(1, len(items) + 1)):
+        rank = dict(zip(items, perm))
+        value = lambda operand: int(operand) if operand.isdigit() else rank[operand]
+        if all(value(left) < value(right) if cond == '<' else value(left) > value(right) if cond == '>'
+               else value(left) == value(right) for left, cond, right in comparisons):
+            return sorted(rank, key=rank.get, reverse=True)
+    return None
+
+
+def random_conditions(rng, items):
+    conditions = []
+    for _ in range(rng.randint(0, 4)):
+        for _ in range(2):
+            conditions.append(rng.choice(items) if rng.random() < 0.7 else str(rng.randint(0, len(items) + 1)))
+        conditions.append(rng.choice('<>='))
+    return conditions
+
+
+def test_order_by_conditions_matches_permutation_search():
+    rng = random.Random(9)
+    for _ in range(500):
+        items = list('ABCDEF'[:rng.randint(1, 6)])
+        if rng.random() < 0.1:
+            items.append(rng.choice(items)) # a repeated name takes the rank of its last position
+        conditions = random_conditions(rng, items)
+        expected = brute_order(items, conditions)
+        if expected is None:
+            with pytest.raises(AssertionError):
+                order_by_conditions(items, conditions)
+        else:
+            assert order_by_conditions(items, conditions) == expected, (items, conditions)
+
+
+def test_order_by_conditions_rejects_incomplete_conditions():
+    with pytest.raises(AssertionError):
+        order_by_conditions(['A', 'B'], ['A', '<'])
+    with pytest.raises(AssertionError):
+        order_by_conditions(['A', 'B'], ['A', 'B'])
+
+
+def brute_bigger(entities, conditions, x, y):
+    # y is known to be bigger than x: y ranks above x in every ranking that satisfies the conditions
+    rankings = []
+    for perm in itertools.permutations(range(len(entities))):
+        rank = dict(zip(entities, perm))
+        if all(rank[conditions[i]] > rank[conditions[i+1]] if conditions[i+2] == '>' else
+               rank[conditions[i]] < rank[conditions[i+1]] for i in range(0, len(conditions), 3)):
+            rankings.append(rank)
+    return all(rank[y] > rank[x] for rank in rankings)
+
+
+def test_order_pair_by_conditions_matches_permutation_search():
+    rng = random.Random(10)
+    for _ in range(300):
+        entities = list('ABCDEFG'[:rng.randint(2, 7)])
+        hidden = entities.copy()
+        rng.shuffle(hidden) # conditions drawn from one hidden order are never contradictory
+        conditions = []
+        for _ in range(rng.randint(0, 6)):
+            a, b = rng.sample(entities, 2)
+            conditions += [a, b, '>' if hidden.index(a) > hidden.index(b) else '<']
+        x, y = rng.sample(entities, 2)
+        expected = [y, x] if brute_bigger(entities, conditions, x, y) else [x, y]
+        assert order_pair_by_conditions(entities, conditions, [x, y]) == expected, (conditions, x, y)
+
+
+def test_order_pair_by_conditions_follows_long_chains():
+    entities = ['e{}'.format(i) for i in range(300)]
+    conditions = []
+    for i in range(299):
+        conditions += [entities[i+1], entities[i], '>']
+    assert order_pair_by_conditions(entities, conditions, ['e0', 'e299']) == ['e299', 'e0']
+    assert order_pair_by_conditions(entities, conditions, ['e299', 'e0']) == ['e299', 'e0']
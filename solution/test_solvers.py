@@ -0,0 +1,81 @@
+import json
+import os
+import random
+
+import pytest
+
+import solvers
+
+# The compiled solvers must find exactly the assignments of the original per-candidate eval loops
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dataset', 'test.json')
+
+
+def dataset_equations(token):
+    # The literal equations the dataset passes to a solver operator
+    if not os.path.exists(DATASET):
+        pytest.skip('dataset/test.json not found')
+    with open(DATASET, encoding='utf-8') as f:
+        records = json.load(f)
+    equations = set()
+    for record in records.values():
+        for lang in ('en', 'ko'):
+            tokens = (record.get('solution_abst_' + lang) or '').split()
+            for i, t in enumerate(tokens):
+                if t == token and i >= 2 and not tokens[i-2].startswith('[OP_'):
+                    equations.add(tokens[i-2])
+    return sorted(equations)
+
+
+def assignments(ans_dict):
+    # The satisfying assignments as sorted tuples of (unknown, value) pairs
+    names = sorted(ans_dict)
+    return sorted(tuple(zip(names, values)) for values in zip(*(ans_dict[v] for v in names)))
+
+
+def outcome(solve, eq):
+    try:
+        result = solve(solvers.normalize_equation(eq))
+    except Exception as e:
+        return type(e)
+    return assignments(result[0] if isinstance(result, tuple) else result)
+
+
+def random_equation(rng, letters, operators, relations, term_length):
+    def term():
+        return ''.join(rng.choice(letters) if rng.random() < 0.4 else rng.choice('0123456789')
+                       for _ in range(rng.randint(1, term_length)))
+    left = term()
+    for _ in range(rng.randint(0, 2)):
+        left += rng.choice(operators) + term()
+    return left + rng.choice(relations) + term()
+
+
+def test_digit_solver_matches_legacy_on_dataset():
+    equations = dataset_equations('[OP_DIGIT_UNK_SOLVER]')
+    assert equations
+    for eq in equations:
+        assert outcome(solvers.solve_digit_unknowns, eq) == outcome(solvers.solve_digit_legacy, eq), eq
+
+
+def test_digit_solver_matches_legacy_on_random_equations():
+    rng = random.Random(6)
+    for _ in range(300):
+        eq = random_equation(rng, 'ABC', '+-×÷.', ['='] * 4 + ['<', '>'], 3)
+        assert outcome(solvers.solve_digit_unknowns, eq) == outcome(solvers.solve_digit_legacy, eq), eq
+
+
+def test_num_solver_matches_legacy_on_dataset():
+    equations = dataset_equations('[OP_NUM_UNK_SOLVER]')
+    assert equations
+    for eq in equations:
+        assert outcome(solvers.solve_num_unknowns, eq) == outcome(solvers.solve_num_legacy, eq), eq
+
+
+def test_num_solver_matches_legacy_on_random_equations():
+    rng = random.Random(7)
+    for _ in range(60):
+        # two unknowns at most: the legacy search evaluates 51**n candidates
+        eq = random_equation(rng, 'AB', '+-×÷', ['='] * 3 + ['<', '>'], 2)
+        if rng.random() < 0.3:
+            eq += '=' + rng.choice('AB0123456789')
+        assert outcome(solvers.solve_num_unknowns, eq) == outcome(solvers.solve_num_legacy, eq), eq
@@ -0,0 +1,26 @@
+from store import ResultStore, storable
+
+
+def test_only_deterministic_statuses_are_stored(tmp_path):
+    with ResultStore(str(tmp_path / 'results.db'), version='test') as store:
+        assert store.put('1 2 [OP_ADD]', 3, 'code', 'ok', 0.1)
+        assert store.put('1 [OP_ADD]', None, None, 'error: TypeError: cannot unpack', 0.1)
+        for status in ('timeout', 'memory', 'crash: sandbox worker exited with code 1',
+                       'error: MemoryError: ', 'error: RecursionError: maximum recursion depth exceeded'):
+            assert not storable(status)
+            assert not store.put('9 9 9 [OP_POW] [OP_POW]', None, None, status, 10)
+        assert store.get('9 9 9 [OP_POW] [OP_POW]') is None
+        assert store.get('1 2 [OP_ADD]') == {'answer': 3, 'code': 'code', 'status': 'ok', 'elapsed': 0.1}
+        assert store.get('1 [OP_ADD]')['status'].startswith('error')
+
+
+def test_hits_write_their_last_use_in_batches(tmp_path):
+    path = str(tmp_path / 'results.db')
+    with ResultStore(path, version='test', touch_every=3) as store:
+        store.put('1 2 [OP_ADD]', 3, 'code', 'ok', 0.1)
+        used = store.connection.execute('SELECT used FROM results').fetchone()[0]
+        store.get('1 2 [OP_ADD]')
+        store.get('1 2 [OP_ADD]')
+        assert store.connection.execute('SELECT used FROM results').fetchone()[0] == used
+        store.get('1 2 [OP_ADD]')
+        assert store.connection.execute('SELECT used FROM results').fetchone()[0] > used
@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+from batch import LANGS, convert_jobs
+
+# Incremental check that convert(solution_abst_*) reproduces answer_* of a dataset file.
+# The manifest (JSON) stores, per id/lang, a hash of the fields the check depends on and the outcome of the last
+# check. A run only converts the entries whose hash changed or that are new. All entries are converted again when
+# the converter version changes: a hash of the converter's source files and of the settings of the run.
+
+MANIFEST_FORMAT = 1
+
+# Modules whose code decides the answers; changing any of them invalidates the manifest
+CONVERTER_SOURCES = ('converter.py', 'lazy.py', 'numpy_backend.py', 'optimizer.py', 'ordering.py', 'rational.py',
+                     'solvers.py')
+
+
+def converter_version(settings=None):
+    # Hash of the converter source files and of the run settings (mode, timeout)
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in CONVERTER_SOURCES:
+        path = os.path.join(here, name)
+        if os.path.exists(path):
+            digest.update(name.encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    digest.update(json.dumps(settings or {}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def entry_hash(record, lang):
+    # Hash of the fields of a record the check of one language depends on
+    fields = {name: record.get(name) for name in ('solution_abst_' + lang, 'answer_' + lang, 'category')}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def normalize_answer(value):
+    # The normalization of convert(): numbers rounded to two decimals, and whole numbers as ints
+    # ('14.5' and '14.50' -> '14.50', '3.0' and 3 -> '3'); anything else as its stripped text
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    if number != number or number in (float('inf'), float('-inf')):
+        return str(value).strip()
+    text = '{:.2f}'.format(round(number + 1e-10, 2))
+    if text.endswith('.00'):
+        return str(int(float(text)))
+    return text
+
+
+def load_manifest(path):
+    # The manifest at path, or an empty one if there is none yet
+    if path is None or not os.path.exists(path):
+        return {'format': MANIFEST_FORMAT, 'version': None, 'entries': {}}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return {'format': MANIFEST_FORMAT, 'version': None, 'entries': {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    # Written to a temporary file first, so an interrupted run never leaves a truncated manifest
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def check_result(result, expected):
+    # Status of one conversion result against the expected answer
+    if result['status'] != 'ok':
+        return result['status'].split(':')[0] # 'timeout' or 'error'
+    return 'match' if normalize_answer(result['answer']) == normalize_answer(expected) else 'mismatch'
+
+
+def verify_dataset(dataset, manifest, langs=LANGS, workers=None, chunksize=16, mode='exec', timeout=10,
+                   full=False, save=None, save_every=500):
+    # Brings the manifest up to date with the dataset and returns (manifest, number of entries converted).
+    # Entries of ids or languages that are no longer in the dataset are dropped. save(manifest) is called every
+    # save_every results, so an interrupted run keeps most of its work.
+    version = converter_version({'mode': mode, 'timeout': timeout})
+    old_entries = manifest['entries'] if manifest.get('version') == version and not full else {}
+    entries = {}
+    jobs = []
+    for key, record in dataset.items():
+        for lang in langs:
+            postfix_eq = record.get('solution_abst_' + lang)
+            if postfix_eq is None:
+                continue
+            entry_key = '{}/{}'.format(key, lang)
+            digest = entry_hash(record, lang)
+            old = old_entries.get(entry_key)
+            if old is not None and old['hash'] == digest:
+                entries[entry_key] = old
+            else:
+                jobs.append((key, lang, postfix_eq))
+                entries[entry_key] = None # filled in below, keeping dataset order
+
+    manifest = {'format': MANIFEST_FORMAT, 'version': version, 'settings': {'mode': mode, 'timeout': timeout},
+                'entries': entries}
+    done = 0
+    for result in convert_jobs(iter(jobs), workers, chunksize, mode, timeout):
+        record = dataset[result['id']]
+        expected = record.get('answer_' + result['lang'])
+        entries['{}/{}'.format(result['id'], result['lang'])] = {
+            'hash': entry_hash(record, result['lang']),
+            'category': record.get('category', ''),
+            'status': check_result(result, expected),
+            'answer': normalize_answer(result['answer']),
+            'expected': normalize_answer(expected),
+            'detail': result['status'] if result['status'] not in ('ok', 'timeout') else '',
+        }
+        done += 1
+        if save is not None and done % save_every == 0:
+            save({**manifest, 'entries': {k: v for k, v in entries.items() if v is not None}})
+    return manifest, done
+
+
+def report(manifest):
+    # Counts per category and status, and the entries that did not match
+    by_category = defaultdict(Counter)
+    failures = []
+    for entry_key, entry in manifest['entries'].items():
+        by_category[entry['category']][entry['status']] += 1
+        if entry['status'] != 'match':
+            key, lang = entry_key.rsplit('/', 1)
+            failures.append({'id': key, 'lang': lang, **entry})
+    total = Counter()
+    for counts in by_category.values():
+        total.update(counts)
+    return {'total': dict(total), 'by_category': {name: dict(counts) for name, counts in sorted(by_category.items())},
+            'failures': failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the converter reproduces the answers of a DMath '
+                                                 'dataset file, converting only what changed since the last run.')
+    parser.add_argument('input', nargs='?', default='../dataset/test.json', help='dataset JSON file ({id: record})')
+    parser.add_argument('--manifest', default='verify_manifest.json', help='manifest file, created if missing')
+    parser.add_argument('--report', help='write the report to this JSON file')
+    parser.add_argument('--full', action='store_true', help='convert every entry, ignoring the manifest')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=16, help='jobs sent to a worker at a time')
+    parser.add_argument('--langs', nargs='+', default=list(LANGS), choices=LANGS)
+    parser.add_argument('--mode', default='exec', choices=('exec', 'eager'))
+    parser.add_argument('--timeout', type=float, default=10, help='time budget per conversion in seconds')
+    args = parser.parse_args()
+
+    with open(args.input, encoding='utf-8') as f:
+        dataset = json.load(f)
+    start = time.perf_counter()
+    manifest, converted = verify_dataset(dataset, load_manifest(args.manifest), args.langs, args.workers,
+                                         args.chunksize, args.mode, args.timeout, args.full,
+                                         save=lambda partial: save_manifest(partial, args.manifest))
+    save_manifest(manifest, args.manifest)
+    result = report(manifest)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as out:
+            json.dump(result, out, ensure_ascii=False, indent=1)
+
+    print('{} entries, {} converted in {:.1f}s: {}'.format(len(manifest['entries']), converted,
+                                                          time.perf_counter() - start, result['total']),
+          file=sys.stderr)
+    for name, counts in result['by_category'].items():
+        print('  {}: {}'.format(name, counts), file=sys.stderr)
+    for failure in result['failures']:
+        print('  {id} {lang} {category}: {status}, got {answer!r}, expected {expected!r} {detail}'.format(**failure),
+              file=sys.stderr)
+    if result['failures']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()